@@ -1,5 +1,5 @@
 from livekit.agents.llm import function_tool
-from livekit.agents import Agent
+from livekit.agents import Agent, ChatContext
 from prompts import BOOKING_INSTRUCTIONS
 from OEDatabaseDriver import Car
 from typing import Annotated, Any
@@ -7,17 +7,42 @@ from dataclasses import asdict
 from datetime import date
 import logging
 import asyncio
-import sys
-import os
-from pathlib import Path
-from livekit.plugins import openai
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+import time
+from realtimeHandoff import BOOKING_VOICE
+from voiceMode import agent_models, agent_voice
+from fillerSpeech import run_with_filler
+from toolMemo import forget, memoised, recall, remember, shared_ttl, tool_key
+from workerLoad import add_load_source
+from mcpClient import (MCPSessionPool, calendar_is_pushed, current_availability_view, get_availability_view,
+                       get_default_pool, get_tool_catalog, result_tokens, schema_hash)
+from bookings_mcp.registry import compile_schema
 import inspect
 
 logger = logging.getLogger("user-data")
 logger.setLevel(logging.INFO)
 
+add_load_source("mcp", lambda: get_default_pool().load())
+
+# MCP tools that only read, so their results can be remembered for the call
+MEMOISED_TOOLS = {"get_booking", "get_next_available_booking_date", "get_booking_overview"}
+# Of those, the ones reading dates other callers can book, kept for shared_ttl() only
+SHARED_STATE_TOOLS = {"get_next_available_booking_date", "get_booking_overview"}
+
+
+async def fetch_booking_overview(reg: str) -> dict[str, Any]:
+    """
+    The car's booking and the next available dates, in one call to the
+    get_booking_overview tool; raises if the call failed
+    """
+    result = await get_default_pool().call_tool(
+        "get_booking_overview",
+        {"reg": reg, "earliest_date": date.today().isoformat(), "count": 3}
+    )
+    if result.isError or result.structuredContent is None:
+        message = result.content[0].text if result.content else "no structured content"
+        raise RuntimeError(f"get_booking_overview failed: {message}")
+    return result.structuredContent
+
 
 class BookingAssistant(Agent):
     """
@@ -25,91 +50,141 @@ class BookingAssistant(Agent):
     Dynamically discovers and exposes tools from the MCP server - NO HARD-CODED TOOLS!
     """
 
-    def __init__(self, car: Car) -> None:
+    # function_tool wrappers for MCP tools, keyed by the hash of each tool's definition
+    _compiled_tools: dict[str, Any] = {}
+
+    @staticmethod
+    def prewarm() -> None:
+        """
+        Once per worker process, before it has an event loop: discover the MCP
+        tools unless an earlier process saved them to disk
+        """
+        catalog = get_tool_catalog()
+        if catalog.cached() is None:
+            catalog.discover_blocking()
+
+    @staticmethod
+    async def prewarm_job() -> None:
+        """
+        Once per job, on its event loop: open the pooled MCP sessions (for
+        stdio, start the server processes) while the account agent talks,
+        then start watching the availability calendar if the server pushes
+        every booking to it
+        """
+        started = time.perf_counter()
+        await get_default_pool().start()
+        # Refreshes tools loaded from disk in the background
+        get_tool_catalog().cached()
+        logger.info(f"[MCP] Session pool ready in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        if not calendar_is_pushed():
+            # A private stdio server's calendar misses other jobs' bookings,
+            # so get_next_available_booking_date asks the server each time
+            return
+        started = time.perf_counter()
+        try:
+            await get_availability_view()
+        except Exception as e:
+            # get_next_available_booking_date still asks the server
+            logger.warning(f"[MCP] Availability calendar not watched: {e}")
+            return
+        logger.info(f"[MCP] Availability calendar watched in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @staticmethod
+    def prefetch(reg: str) -> asyncio.Task:
+        """
+        Start fetching the booking overview for a reg in the background, so
+        it is ready by the time the agent greets the customer. Cancel the
+        task if the car turns out not to exist.
+        """
+        task = asyncio.create_task(fetch_booking_overview(reg))
+        # Never leave an unread exception behind if the handoff doesn't happen
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def __init__(self, car: Car, prefetched: asyncio.Task | None = None,
+                 chat_ctx: ChatContext | None = None) -> None:
         self.car = car
-        self._mcp_session: ClientSession | None = None
+        self._prefetched = prefetched
+        # The booking as last seen, for context_facts
+        self.booking: str | None = None
+        self.filler_voice = agent_voice("booking", BOOKING_VOICE)
+        self._mcp_pool: MCPSessionPool | None = None
         self._mcp_tools: dict[str, Any] = {}
-        self._server_params = None
-        self._stdio_transport = None
 
-        # CRITICAL: Discover and inject MCP tools BEFORE calling super().__init__()
+        # CRITICAL: Inject the MCP tools BEFORE calling super().__init__()
         # This allows LiveKit to find them during agent initialization
         self._setup_dynamic_tools()
 
         super().__init__(
             instructions=BOOKING_INSTRUCTIONS,
-            llm=openai.realtime.RealtimeModel(
-                voice="echo",
-                temperature=0.8
-            )
+            chat_ctx=chat_ctx,
+            # Realtime or STT -> LLM -> TTS, per BOOKING_VOICE_MODE / VOICE_MODE
+            **agent_models("booking", BOOKING_VOICE)
         )
 
     def _setup_dynamic_tools(self):
         """
-        Discover MCP tools and dynamically create function_tool methods.
+        Create a function_tool method for each MCP tool the process already knows about.
         This is the magic that makes MCP truly powerful!
+
+        Discovery happens once per process (see mcpClient.ToolCatalog), so
+        this never waits on the server. If the tools haven't been discovered
+        yet they are added in on_enter instead.
         """
-        try:
-            # Initialize MCP connection parameters
-            server_path = Path(__file__).parent / "bookings_mcp" / "server.py"
-            self._server_params = StdioServerParameters(
-                command=sys.executable,
-                args=[str(server_path)],
-                env={**os.environ}
-            )
+        catalog = get_tool_catalog()
+        tools = catalog.cached()
 
-            # Connect to MCP and discover tools
-            # Check if we're already in an event loop
+        if tools is None:
             try:
-                loop = asyncio.get_running_loop()
-                # Already in async context - create a task
-                import nest_asyncio
-                nest_asyncio.apply()
-                tools = loop.run_until_complete(self._discover_mcp_tools())
+                asyncio.get_running_loop()
             except RuntimeError:
-                # No running loop - create one
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    tools = loop.run_until_complete(self._discover_mcp_tools())
-                finally:
-                    loop.close()
-
-            logger.info(f"[MCP] Discovered {len(tools)} MCP tools: {[t.name for t in tools]}")
-
-            # Dynamically create a function_tool method for each MCP tool
-            for tool in tools:
-                self._create_dynamic_tool(tool)
-                logger.info(f"[MCP] Dynamically registered: {tool.name}")
-
-        except Exception as e:
-            logger.error(f"Failed to setup dynamic MCP tools: {e}")
-            raise
-
-    async def _discover_mcp_tools(self):
-        """Connect to MCP server and list available tools"""
-        stdio_transport = stdio_client(self._server_params)
-        stdio, write = await stdio_transport.__aenter__()
-        session = ClientSession(stdio, write)
-        await session.__aenter__()
-        await session.initialize()
-
-        # Get tool list
-        tools_result = await session.list_tools()
-
-        # Store for later use
-        self._mcp_tools = {tool.name: tool for tool in tools_result.tools}
-
-        # Clean up this discovery session
-        await session.__aexit__(None, None, None)
-        await stdio_transport.__aexit__(None, None, None)
-
-        return tools_result.tools
-
-    def _create_dynamic_tool(self, mcp_tool):
+                # No event loop to block, e.g. a script: discover now
+                tools = catalog.discover_blocking()
+            else:
+                logger.info("[MCP] Tools not discovered yet, adding them when the agent starts")
+                return
+
+        self._register_mcp_tools(tools)
+        logger.info(f"[MCP] Registered {len(tools)} MCP tools ({catalog.source}): {[t.name for t in tools]}")
+
+    def _register_mcp_tools(self, tools) -> list:
+        """Dynamically create a function_tool method for each MCP tool"""
+        self._mcp_tools = {tool.name: tool for tool in tools}
+        for tool in tools:
+            # Bind the shared wrapper to this instance
+            setattr(self, tool.name, self._compiled_tool(tool).__get__(self, self.__class__))
+        return [getattr(self, tool.name) for tool in tools]
+
+    async def _add_discovered_tools(self) -> None:
+        """Wait for discovery and add the tools to the running agent"""
+        started = time.perf_counter()
+        tools = await get_tool_catalog().get()
+        await self.update_tools(self.tools + self._register_mcp_tools(tools))
+        logger.info(f"[MCP] Added {len(tools)} MCP tools after {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @classmethod
+    def _compiled_tool(cls, mcp_tool) -> Any:
+        """
+        The function_tool for an MCP tool definition, built the first time
+        this exact definition is seen and shared by every instance after that
+        """
+        key = schema_hash([mcp_tool])
+        tool = cls._compiled_tools.get(key)
+        if tool is None:
+            tool = cls._compiled_tools[key] = cls._compile_dynamic_tool(mcp_tool)
+            logger.info(f"[MCP] Compiled tool wrapper: {mcp_tool.name} ({key})")
+        return tool
+
+    @staticmethod
+    def _compile_dynamic_tool(mcp_tool):
         """
         Dynamically create a LiveKit function_tool from an MCP tool definition.
         This is where the dynamic magic happens!
+
+        Everything that depends only on the schema is worked out here, once:
+        the parameter order, whether to inject `reg`, which arguments need
+        converting from dates, and a compiled validator for the arguments.
         """
         tool_name = mcp_tool.name
         tool_description = mcp_tool.description
@@ -117,11 +192,11 @@ class BookingAssistant(Agent):
 
         # Parse parameters from MCP schema
         properties = tool_schema.get("properties", {})
-        required = tool_schema.get("required", [])
 
         # Build function signature dynamically
         params = []
         annotations = {}
+        date_params = []
 
         for param_name, param_info in properties.items():
             param_type = param_info.get("type", "string")
@@ -136,6 +211,7 @@ class BookingAssistant(Agent):
                 # Check if it's a date by parameter name or description
                 if "date" in param_name.lower() or "date" in param_desc.lower():
                     python_type = date
+                    date_params.append(param_name)
                 else:
                     python_type = str
             elif param_type == "integer":
@@ -149,25 +225,35 @@ class BookingAssistant(Agent):
             annotations[param_name] = Annotated[python_type, param_desc]
             params.append(param_name)
 
+        inject_reg = "reg" in properties
+        validator = compile_schema(tool_schema)
+
         # Create the dynamic async function that accepts both positional and keyword args
         async def dynamic_tool_func(self, *args, **kwargs):
             """Dynamically generated function that calls MCP tool"""
-            # Map positional args to parameter names
-            for i, arg_value in enumerate(args):
-                if i < len(params):
-                    kwargs[params[i]] = arg_value
+            arguments = dict(zip(params, args)) if args else {}
+            arguments.update(kwargs)
 
             # Auto-inject reg parameter if tool needs it
-            if "reg" in tool_schema.get("properties", {}):
-                kwargs["reg"] = self.car.reg
+            if inject_reg:
+                arguments["reg"] = self.car.reg
 
             # Convert date objects to ISO strings for MCP
-            for key, value in list(kwargs.items()):
+            for name in date_params:
+                value = arguments.get(name)
                 if isinstance(value, date):
-                    kwargs[key] = value.isoformat()
+                    arguments[name] = value.isoformat()
 
-            logger.info(f"[MCP CALL] {tool_name}({kwargs})")
-            return await self._call_mcp_tool(tool_name, kwargs)
+            # Check against the tool's schema here, so a bad call never reaches the server
+            error = next(validator.iter_errors(arguments), None)
+            if error is not None:
+                where = ".".join(str(p) for p in error.absolute_path)
+                message = f"Invalid arguments for {tool_name}: {where + ': ' if where else ''}{error.message}"
+                logger.warning(f"[MCP] {message}")
+                return message
+
+            logger.info(f"[MCP CALL] {tool_name}({arguments})")
+            return await self._call_mcp_tool(tool_name, arguments)
 
         # Set function metadata
         dynamic_tool_func.__name__ = tool_name
@@ -187,42 +273,80 @@ class BookingAssistant(Agent):
         dynamic_tool_func.__annotations__ = annotations
 
         # Apply the @function_tool decorator
-        decorated_func = function_tool(dynamic_tool_func)
-
-        # Bind to this instance
-        bound_method = decorated_func.__get__(self, self.__class__)
-        setattr(self, tool_name, bound_method)
-
-    async def _get_mcp_session(self) -> ClientSession:
-        """Get or create MCP session for runtime calls"""
-        if self._mcp_session is None:
-            stdio_transport = stdio_client(self._server_params)
-            stdio, write = await stdio_transport.__aenter__()
-            session = ClientSession(stdio, write)
-            await session.__aenter__()
-            await session.initialize()
-
-            self._mcp_session = session
-            self._stdio_transport = stdio_transport
+        return function_tool(dynamic_tool_func)
+
+    async def _get_mcp_pool(self) -> MCPSessionPool:
+        """
+        Get the process-wide pool of sessions for the selected transport: warm
+        stdio servers, the shared HTTP server or the in-process server
+        """
+        if self._mcp_pool is None:
+            self._mcp_pool = get_default_pool()
+            await self._mcp_pool.start()
             logger.info("🔌 MCP runtime session established")
 
-        return self._mcp_session
+        return self._mcp_pool
 
     async def _call_mcp_tool(self, tool_name: str, arguments: dict[str, Any]) -> str:
-        """Call an MCP tool and return the result"""
+        """Call an MCP tool and return the short rendering the model reads"""
+        if tool_name == "get_next_available_booking_date" and (text := self._next_available_from_calendar(arguments)):
+            return text
+
+        key = tool_key(tool_name, kwargs=arguments)
+        if tool_name in MEMOISED_TOOLS and (text := recall(self.session, key)) is not None:
+            return text
+
         try:
-            session = await self._get_mcp_session()
-            result = await session.call_tool(tool_name, arguments)
+            pool = await self._get_mcp_pool()
+            # A holding phrase plays if the server is slow to answer
+            result = await run_with_filler(self.session, tool_name, pool.call_tool(tool_name, arguments), self.filler_voice)
+            if tool_name == "book_appointment" and not result.isError:
+                # Booked, or not booked because someone else has the date: either way it's taken
+                if (result.structuredContent or {}).get("booked"):
+                    self.booking = f"{arguments['date']}: {arguments['description']}"
+                if (view := current_availability_view()) is not None:
+                    view.mark_booked(date.fromisoformat(arguments["date"]))
 
             # Extract text from result
             if result.content and len(result.content) > 0:
-                return result.content[0].text
+                text = result.content[0].text
             else:
-                return "No response from MCP server"
+                text = "No response from MCP server"
+            if tool_name in MEMOISED_TOOLS and not result.isError and result.content:
+                remember(self.session, key, text, ttl=shared_ttl() if tool_name in SHARED_STATE_TOOLS else None)
 
         except Exception as e:
             logger.error(f"❌ MCP tool call failed: {e}")
-            return f"Error calling booking service: {e}"
+            text = f"Error calling booking service: {e}"
+        finally:
+            if tool_name == "book_appointment":
+                # Booked or not, the available dates remembered may no longer be
+                forget(self.session)
+
+        tokens = result_tokens.record(tool_name, text)
+        logger.info(f"[MCP] {tool_name} result: {tokens} tokens")
+        return text
+
+    def _next_available_from_calendar(self, arguments: dict[str, Any]) -> str | None:
+        """
+        The next available date from the watched availability calendar, in
+        the server's words, or None to ask the server (not watched yet, or
+        no free date within the calendar's range)
+        """
+        view = current_availability_view()
+        if view is None:
+            return None
+        found = view.next_available(date.fromisoformat(arguments["earliest_date"]))
+        if not found:
+            return None
+        logger.info(f"[MCP] get_next_available_booking_date answered from the availability calendar (v{view.version})")
+        return f"Next available: {self.date_to_long_string(found[0])}"
+
+    async def on_exit(self) -> None:
+        """Hand back the pool; it stays open for the next agent"""
+        if self._mcp_pool is not None:
+            logger.info(f"[MCP] Session pool: {self._mcp_pool.stats()}")
+        self._mcp_pool = None
 
     def get_car_str(self):
         """Get car details as formatted string"""
@@ -231,36 +355,67 @@ class BookingAssistant(Agent):
             car_str += f"{field}: {value}\n"
         return car_str
 
+    def context_facts(self) -> dict:
+        """What has to survive a trimmed conversation"""
+        return {"Registration": self.car.reg, "Make": self.car.make, "Model": self.car.model,
+                "Year": self.car.year, "Booking": self.booking}
+
+    def date_to_long_string(self, d: date) -> str:
+        day = d.day
+        # Work out suffix
+        if 11 <= day <= 13:
+            suffix = "th"
+        else:
+            suffix = {1: "st", 2: "nd", 3: "rd"}.get(day % 10, "th")
+        return f"{day}{suffix} {d.strftime('%B %Y')}"
+
     async def on_enter(self) -> None:
         """Called when agent becomes active - check existing booking"""
+        # The session's car is now this one, with nothing remembered yet
+        self.session.userdata = self.car
+        if not self._mcp_tools:
+            try:
+                await self._add_discovered_tools()
+            except Exception as e:
+                logger.error(f"Failed to discover MCP tools: {e}")
+
         try:
-            # Get existing booking via dynamically discovered MCP tool
-            result = await self._call_mcp_tool("get_booking", {"reg": self.car.reg})
-
-            car_details = f"""Registration: {self.car.reg},
-                            Make: {self.car.make},
-                            Model: {self.car.model},
-                            Year: {self.car.year}"""
-
-            if "No appointment found" in result:
-                # Get next available date
-                today_iso = date.today().isoformat()
-                next_date_result = await self._call_mcp_tool(
-                    "get_next_available_booking_date",
-                    {"reg": self.car.reg, "earliest_date": today_iso}
-                )
+            # One call gets the existing booking and the next available dates,
+            # as structured content we can branch on
+            # (started by the account agent while it looked the car up, if it could)
+            started = time.perf_counter()
+            if self._prefetched is not None:
+                overview = await self._prefetched
+                self._prefetched = None
+                source = "prefetched"
+            else:
+                overview = await fetch_booking_overview(self.car.reg)
+                source = "fetched"
+            logger.info(f"[MCP] Booking overview {source}, waited {(time.perf_counter() - started) * 1000:.0f} ms")
 
+            car_details = f"{self.car.year} {self.car.make} {self.car.model}, registration {self.car.reg}"
+            booking = overview["booking"]
+
+            self.booking = "none" if booking is None else f"{booking['date']}: {booking['description']}"
+
+            if booking is None:
+                if overview["available_dates"]:
+                    next_date = self.date_to_long_string(date.fromisoformat(overview["available_dates"][0]))
+                    offer = f"the next available date is {next_date}"
+                else:
+                    offer = "there are no dates available right now"
                 await self.session.generate_reply(
                     instructions=f"""Always speak English unless the customer speaks another language or asks you to use another language.
-                    Tell the customer you have the following details of their car: {car_details}.
-                    Tell them they have no existing bookings, {next_date_result.replace('The next available booking date is', 'the next available booking date is')}, and ask if they would like to make one."""
+                    Tell the customer you have these details of their car: {car_details}.
+                    Tell them they have no existing booking, {offer}, and ask if they would like to make one."""
                 )
             else:
                 # Has existing booking
+                booking_date = self.date_to_long_string(date.fromisoformat(booking["date"]))
                 await self.session.generate_reply(
                     instructions=f"""Always speak English unless the customer speaks another language or asks you to use another language.
-                    Tell the customer you have the following details of their car: {car_details}.
-                    {result}"""
+                    Tell the customer you have these details of their car: {car_details}.
+                    Tell them their next appointment is on {booking_date} for: {booking["description"]}."""
                 )
         except Exception as e:
             logger.error(f"Error in on_enter: {e}")
@@ -270,6 +425,7 @@ class BookingAssistant(Agent):
             )
 
     @function_tool
+    @memoised
     async def get_car_details(self):
         """
         Get details of the customer's car.
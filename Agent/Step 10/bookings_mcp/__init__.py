@@ -1 +1,5 @@
 # Bookings MCP Server
+
+# Reported to clients when they connect. Bump it whenever a tool's name,
+# description or schema changes, so clients drop their cached tool definitions
+__version__ = "1.0.0"
@@ -0,0 +1,151 @@
+"""
+Availability calendar for the bookings MCP server.
+
+The calendar is the set of dates already booked over a rolling horizon
+(today plus BOOKINGS_CALENDAR_DAYS). Any other weekday is free, because the
+garage takes one booking a day, Monday to Friday. It is served as the
+bookings://calendar resource:
+
+    {"from": "2025-11-03", "to": "2026-01-02", "version": 12,
+     "booked": ["2025-11-05", ...], "bookable_weekdays": ["Monday", ...]}
+
+Clients that subscribe to it get a resources/updated notification whenever
+it changes. The change itself travels in the notification's _meta, so a
+client can apply it without reading the resource again:
+
+    {"version": 13, "from": ..., "to": ..., "added": ["2025-11-06"], "removed": []}
+
+If a client sees a version gap, it should read the resource again.
+Bookings made through this server are pushed straight away. Changes made
+elsewhere in OpenEdge are picked up by a refresh every
+BOOKINGS_CALENDAR_REFRESH seconds while anyone is subscribed.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Optional
+
+from mcp.types import ResourceUpdatedNotification, ResourceUpdatedNotificationParams, ServerNotification
+
+logger = logging.getLogger("bookings-server")
+
+CALENDAR_URI = "bookings://calendar"
+BOOKABLE_WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+# Loads the booked dates between two dates (inclusive) from PASOE
+BookedDatesLoader = Callable[[date, date], Awaitable[set[date]]]
+
+
+class AvailabilityCalendar:
+    def __init__(self, load: BookedDatesLoader, horizon_days: int = 60, refresh_seconds: float = 60.0):
+        self._load = load
+        self.horizon_days = horizon_days
+        self.refresh_seconds = refresh_seconds
+        self.start: Optional[date] = None
+        self.end: Optional[date] = None
+        self.booked: set[date] = set()
+        self.version = 0
+        self._loaded_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._subscribers: set = set()
+        self._refresher: Optional[asyncio.Task] = None
+        self._publishing: set[asyncio.Task] = set()
+
+    def _window(self) -> tuple[date, date]:
+        today = date.today()
+        return today, today + timedelta(days=self.horizon_days)
+
+    def _stale(self) -> bool:
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at > self.refresh_seconds
+            or self.start != date.today()
+        )
+
+    async def refresh(self, force: bool = False) -> Optional[dict]:
+        """Reload from PASOE if stale (or forced); returns the change, or None if nothing moved"""
+        async with self._lock:
+            if not force and not self._stale():
+                return None
+
+            start, end = self._window()
+            booked = await self._load(start, end)
+            self._loaded_at = time.monotonic()
+
+            added, removed = booked - self.booked, self.booked - booked
+            if self.version and not added and not removed and (start, end) == (self.start, self.end):
+                return None
+
+            self.booked, self.start, self.end = booked, start, end
+            self.version += 1
+            return self._change(added, removed)
+
+    def _change(self, added: set[date], removed: set[date]) -> dict:
+        return {
+            "version": self.version,
+            "from": self.start.isoformat(),
+            "to": self.end.isoformat(),
+            "added": sorted(d.isoformat() for d in added),
+            "removed": sorted(d.isoformat() for d in removed),
+        }
+
+    async def snapshot(self) -> dict:
+        """The whole calendar, reloading it first if it's stale"""
+        change = await self.refresh()
+        if change is not None and change["version"] > 1:
+            self._publish(change)
+        return {
+            "from": self.start.isoformat(),
+            "to": self.end.isoformat(),
+            "version": self.version,
+            "booked": sorted(d.isoformat() for d in self.booked),
+            "bookable_weekdays": BOOKABLE_WEEKDAYS,
+        }
+
+    def mark_booked(self, booked_date: date) -> None:
+        """Record a booking made through this server and tell subscribers"""
+        if self.start is None or not self.start <= booked_date <= self.end or booked_date in self.booked:
+            return
+        self.booked.add(booked_date)
+        self.version += 1
+        self._publish(self._change({booked_date}, set()))
+
+    def subscribe(self, session) -> None:
+        self._subscribers.add(session)
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.create_task(self._refresh_while_subscribed())
+
+    def unsubscribe(self, session) -> None:
+        self._subscribers.discard(session)
+
+    def _publish(self, change: dict) -> None:
+        """Notify subscribers in the background, so a slow client never holds up a booking"""
+        if not self._subscribers:
+            return
+        task = asyncio.create_task(self._notify(change))
+        self._publishing.add(task)
+        task.add_done_callback(self._publishing.discard)
+
+    async def _notify(self, change: dict) -> None:
+        notification = ServerNotification(ResourceUpdatedNotification(
+            params=ResourceUpdatedNotificationParams(uri=CALENDAR_URI, _meta=change)
+        ))
+        for session in list(self._subscribers):
+            try:
+                await session.send_notification(notification)
+            except Exception:
+                # The client has gone away
+                self._subscribers.discard(session)
+
+    async def _refresh_while_subscribed(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                change = await self.refresh(force=True)
+            except Exception as e:
+                logger.warning(f"Availability calendar refresh failed: {e}")
+                continue
+            if change is not None:
+                self._publish(change)
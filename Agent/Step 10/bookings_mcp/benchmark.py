@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Bookings MCP Server benchmark
+
+Starts the bookings server and runs one of these scenarios:
+
+  concurrency  times the same batch of get_booking calls made one after
+               another and all at once over a single session. If the server
+               handles calls concurrently the parallel batch takes roughly as
+               long as one call, not as long as all of them.
+  handoff      times what BookingAssistant.on_enter needs before it can speak
+               to a customer with no booking: get_booking followed by
+               get_next_available_booking_date, against one
+               get_booking_overview call, against the same call prefetched
+               while the account agent looks the car up (which takes as
+               long as one PASOE round trip).
+  tokens       calls each tool once and reports how many tokens its short
+               rendering (what the model reads) and its structured content take.
+  transports   times connecting and per-call latency of get_the_date_today
+               (which never reaches PASOE) over stdio, HTTP and in-process.
+  pool         times what a handoff waits for before BookingAssistant can
+               list tools: a cold stdio server start, against checking a
+               session out of a warm MCPSessionPool.
+
+Usage:
+    py bookings_mcp/benchmark.py                                       # against OE_SERVICE_URL
+    py bookings_mcp/benchmark.py --fake-delay 0.25                     # against a local fake PASOE
+    py bookings_mcp/benchmark.py --scenario handoff --fake-delay 0.25
+    py bookings_mcp/benchmark.py --scenario tokens --fake-delay 0
+    py bookings_mcp/benchmark.py --scenario transports --fake-delay 0 --calls 500
+    py bookings_mcp/benchmark.py --scenario pool --fake-delay 0
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+SERVER_PATH = Path(__file__).parent / "server.py"
+
+# mcpClient lives next to the bookings_mcp package
+sys.path.insert(0, str(SERVER_PATH.resolve().parent.parent))
+from mcpClient import MCPSessionPool, count_tokens, http_transport, inprocess_transport, open_session, stdio_transport
+
+
+def start_fake_pasoe(delay: float) -> ThreadingHTTPServer:
+    """
+    A stand-in for the PASOE booking service that answers after `delay` seconds.
+    Regs starting with NEW have no booking.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/booking/getbooking" and query.get("reg", [""])[0].startswith("NEW"):
+                self.send_response(204)
+                self.end_headers()
+                return
+            if url.path == "/booking/getbooking":
+                body = {"BookingDate": "05-11-2025", "Description": "Annual service"}
+            elif url.path == "/booking/calendar":
+                body = {"BookedDates": ["05-11-2025"]}
+            else:
+                body = {"BookingDate": "06-11-2025"}
+                count = int(query.get("count", ["1"])[0])
+                if count > 1:
+                    body["BookingDates"] = [f"{6 + i:02d}-11-2025" for i in range(count)]
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"OK")
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+async def timed_call(session: ClientSession, reg: str) -> tuple[float, float]:
+    started = time.perf_counter()
+    await session.call_tool("get_booking", {"reg": reg})
+    return started, time.perf_counter()
+
+
+async def run_handoff(session: ClientSession, calls: int, lookup_seconds: float) -> None:
+    today = date.today().isoformat()
+
+    async def separate_calls(reg: str) -> None:
+        result = await session.call_tool("get_booking", {"reg": reg})
+        if result.structuredContent["booking"] is None:
+            await session.call_tool("get_next_available_booking_date", {"reg": reg, "earliest_date": today})
+
+    async def overview(reg: str) -> None:
+        await session.call_tool("get_booking_overview", {"reg": reg, "earliest_date": today, "count": 3})
+
+    async def after_handoff(greet, reg: str) -> float:
+        started = time.perf_counter()
+        await greet(reg)
+        return time.perf_counter() - started
+
+    async def prefetched(reg: str) -> float:
+        # The account agent starts the overview, then looks the car up
+        task = asyncio.create_task(overview(reg))
+        await asyncio.sleep(lookup_seconds)
+        started = time.perf_counter()
+        await task
+        return time.perf_counter() - started
+
+    variants = (
+        ("separate", lambda reg: after_handoff(separate_calls, reg)),
+        ("overview", lambda reg: after_handoff(overview, reg)),
+        ("prefetched", prefetched),
+    )
+    for label, greet in variants:
+        timings = sorted([await greet(f"NEW{i}") for i in range(calls)])
+        print(f"{label:>10}: median {timings[len(timings) // 2] * 1000:7.1f} ms, "
+              f"worst {timings[-1] * 1000:7.1f} ms over {calls} greetings")
+
+
+async def run_tokens(session: ClientSession) -> None:
+    today = date.today().isoformat()
+    calls = [
+        ("get_the_date_today", {}),
+        ("get_booking", {"reg": "AB12CDE"}),
+        ("get_booking", {"reg": "NEW1"}),
+        ("get_next_available_booking_date", {"reg": "NEW1", "earliest_date": today}),
+        ("get_booking_overview", {"reg": "NEW1", "earliest_date": today, "count": 3}),
+        ("book_appointment", {"reg": "NEW1", "date": today, "description": "Annual service"}),
+    ]
+    print(f"{'tool':>32}  rendering  structured")
+    for name, arguments in calls:
+        result = await session.call_tool(name, arguments)
+        rendering = count_tokens(result.content[0].text)
+        structured = count_tokens(json.dumps(result.structuredContent, separators=(",", ":")))
+        print(f"{name:>32}  {rendering:9d}  {structured:10d}   {result.content[0].text}")
+
+
+def start_http_server(env: dict) -> tuple[subprocess.Popen, str]:
+    """Start server.py --transport http on a free port and wait until it accepts connections"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    process = subprocess.Popen(
+        [sys.executable, str(SERVER_PATH), "--transport", "http", "--port", str(port)],
+        env=env
+    )
+    deadline = time.monotonic() + 15
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process, f"http://127.0.0.1:{port}/mcp/"
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.terminate()
+                raise RuntimeError("HTTP server did not start")
+            time.sleep(0.1)
+
+
+async def run_transports(calls: int, env: dict) -> None:
+    # The in-process server reads OE_SERVICE_URL when it is first imported
+    os.environ.update(env)
+    http_server, url = start_http_server(env)
+
+    try:
+        transports = (
+            ("stdio", stdio_transport()),
+            ("http", http_transport(url)),
+            ("inprocess", inprocess_transport()),
+        )
+        for label, transport in transports:
+            started = time.perf_counter()
+            async with open_session(transport) as session:
+                connect = time.perf_counter() - started
+                # The first call also fetches the tool list for output validation
+                await session.call_tool("get_the_date_today", {})
+
+                timings = []
+                for _ in range(calls):
+                    started = time.perf_counter()
+                    await session.call_tool("get_the_date_today", {})
+                    timings.append(time.perf_counter() - started)
+
+            timings.sort()
+            print(f"{label:>10}: connect {connect * 1000:7.1f} ms, per call "
+                  f"median {timings[len(timings) // 2] * 1e6:7.0f} µs, "
+                  f"p95 {timings[int(len(timings) * 0.95)] * 1e6:7.0f} µs")
+    finally:
+        http_server.terminate()
+        http_server.wait()
+
+
+async def run_pool(calls: int, env: dict) -> None:
+    # stdio_transport() hands the current environment to the server
+    os.environ.update(env)
+    transport = stdio_transport()
+
+    cold = []
+    for _ in range(min(calls, 5)):
+        started = time.perf_counter()
+        async with open_session(transport) as session:
+            await session.list_tools()
+        cold.append(time.perf_counter() - started)
+
+    pool = MCPSessionPool(transport, size=2, shared=True)
+    started = time.perf_counter()
+    await pool.start()
+    print(f"pool of 2 warmed in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    warm = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        async with pool.session() as session:
+            await session.list_tools()
+        warm.append(time.perf_counter() - started)
+    stats = pool.stats()
+    await pool.aclose()
+
+    for label, timings in (("cold start", cold), ("warm pool", warm)):
+        timings.sort()
+        print(f"{label:>10}: median {timings[len(timings) // 2] * 1000:7.1f} ms over {len(timings)} handoffs")
+    print(f"pool stats: {stats}")
+
+
+async def run(calls: int, env: dict, scenario: str = "concurrency", lookup_seconds: float = 0.25) -> None:
+    params = StdioServerParameters(command=sys.executable, args=[str(SERVER_PATH)], env=env)
+
+    async with stdio_client(params) as (read, write):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.call_tool("get_booking", {"reg": "WARMUP"})
+
+            if scenario == "handoff":
+                await run_handoff(session, calls, lookup_seconds)
+                return
+            if scenario == "tokens":
+                await run_tokens(session)
+                return
+
+            started = time.perf_counter()
+            sequential = [await timed_call(session, f"SEQ{i}") for i in range(calls)]
+            sequential_wall = time.perf_counter() - started
+
+            started = time.perf_counter()
+            parallel = await asyncio.gather(*(timed_call(session, f"PAR{i}") for i in range(calls)))
+            parallel_wall = time.perf_counter() - started
+
+    for label, results, wall in (("sequential", sequential, sequential_wall), ("parallel", parallel, parallel_wall)):
+        busy = sum(end - start for start, end in results)
+        print(f"{label:>10}: {calls} calls in {wall * 1000:8.1f} ms "
+              f"(mean call {busy / calls * 1000:7.1f} ms, overlap x{busy / wall:4.1f})")
+
+    # Count how many calls were in flight at the same moment during the parallel batch
+    events = sorted([(s, 1) for s, _ in parallel] + [(e, -1) for _, e in parallel])
+    in_flight = peak = 0
+    for _, step in events:
+        in_flight += step
+        peak = max(peak, in_flight)
+    print(f"peak concurrent calls: {peak}, speed-up: {sequential_wall / parallel_wall:4.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bookings MCP Server benchmark")
+    parser.add_argument("--scenario", choices=("concurrency", "handoff", "tokens", "transports", "pool"), default="concurrency")
+    parser.add_argument("--calls", type=int, default=10, help="Calls per batch")
+    parser.add_argument("--fake-delay", type=float, metavar="SECONDS",
+                        help="Run against a local fake PASOE that takes this long to answer")
+    args = parser.parse_args()
+
+    env = {**os.environ}
+    fake = None
+    if args.fake_delay is not None:
+        fake = start_fake_pasoe(args.fake_delay)
+        env["OE_SERVICE_URL"] = f"http://127.0.0.1:{fake.server_address[1]}/"
+    if args.scenario == "handoff":
+        # Every greeting should reach PASOE, not the result cache
+        env["BOOKINGS_CACHE_TTL"] = "0"
+
+    try:
+        if args.scenario == "transports":
+            asyncio.run(run_transports(args.calls, env))
+        elif args.scenario == "pool":
+            asyncio.run(run_pool(args.calls, env))
+        else:
+            lookup_seconds = args.fake_delay if args.fake_delay is not None else 0.25
+            asyncio.run(run(args.calls, env, args.scenario, lookup_seconds))
+    finally:
+        if fake is not None:
+            fake.shutdown()
+
+
+if __name__ == "__main__":
+    main()
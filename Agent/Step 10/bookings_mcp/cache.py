@@ -0,0 +1,103 @@
+"""
+Result cache for the bookings MCP server.
+
+Read tools (get_booking, get_next_available_booking_date) are cached for a
+short TTL, keyed by tool name and normalised arguments, so "AB12 CDE" and
+"ab12cde" hit the same entry. Each entry carries tags such as
+("reg", "AB12CDE") or ("date", "2025-11-05"); a successful booking
+invalidates every entry tagged with its reg or date.
+"""
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Iterable, Optional
+
+
+def normalise_argument(name: str, value: Any) -> Any:
+    """Canonical form of an argument for use in a cache key"""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if name == "reg":
+        return value.upper().replace(" ", "")
+    if "date" in name:
+        try:
+            return datetime.fromisoformat(value).date().isoformat()
+        except ValueError:
+            return value
+    return value
+
+
+class ResultCache:
+    def __init__(self, ttl: float = 30.0, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, tuple[float, Any, frozenset]] = OrderedDict()
+        self._hits: dict[str, int] = {}
+        self._misses: dict[str, int] = {}
+        self._invalidations = 0
+        # Bumped by every invalidation, so a read that started before a write
+        # cannot store its (now stale) result afterwards
+        self._epoch = 0
+
+    @staticmethod
+    def key(tool: str, arguments: dict) -> tuple:
+        return (tool, tuple(sorted((k, normalise_argument(k, v)) for k, v in arguments.items())))
+
+    def get(self, tool: str, arguments: dict) -> Optional[tuple[Any, float]]:
+        """Return (value, age in seconds) if a fresh entry exists, otherwise None"""
+        key = self.key(tool, arguments)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+
+        if entry is None or now - entry[0] > self.ttl:
+            if entry is not None:
+                del self._entries[key]
+            self._misses[tool] = self._misses.get(tool, 0) + 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits[tool] = self._hits.get(tool, 0) + 1
+        return entry[1], now - entry[0]
+
+    def token(self) -> int:
+        """Take before calling the backend and pass to put()"""
+        return self._epoch
+
+    def put(self, tool: str, arguments: dict, value: Any, tags: Iterable[tuple[str, str]] = (), token: Optional[int] = None) -> None:
+        if self.ttl <= 0 or (token is not None and token != self._epoch):
+            return
+        key = self.key(tool, arguments)
+        self._entries[key] = (time.monotonic(), value, frozenset(tags))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *tags: tuple[str, str]) -> int:
+        """Drop every entry carrying any of the given tags; returns how many were dropped"""
+        self._epoch += 1
+        wanted = set(tags)
+        stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & wanted]
+        for key in stale:
+            del self._entries[key]
+        self._invalidations += len(stale)
+        return len(stale)
+
+    def stats(self) -> dict:
+        tools = sorted(set(self._hits) | set(self._misses))
+        per_tool = {}
+        for tool in tools:
+            hits, misses = self._hits.get(tool, 0), self._misses.get(tool, 0)
+            per_tool[tool] = {"hits": hits, "misses": misses, "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+
+        hits, misses = sum(self._hits.values()), sum(self._misses.values())
+        return {
+            "ttl_seconds": self.ttl,
+            "entries": len(self._entries),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            "invalidated_entries": self._invalidations,
+            "tools": per_tool,
+        }
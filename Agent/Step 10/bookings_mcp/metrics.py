@@ -0,0 +1,215 @@
+"""
+Per-tool latency and error metrics for the bookings MCP server.
+
+Every tools/call is timed from the moment the server dispatches it until its
+result is ready to send, and split into three phases:
+
+  queue          dispatch, tool lookup and argument validation, up to the
+                 moment the tool's handler starts
+  backend        time spent waiting on PASOE (overlapping requests, as in
+                 get_booking_overview, count once)
+  serialization  everything else: the handler's own work building its
+                 rendering and structured content, output validation and
+                 wrapping the result
+
+Failed calls are counted per tool and kind (InvalidArguments, UnknownTool,
+BackendError, ...). ToolMetrics.snapshot() is served as the
+bookings://stats/tools resource and ToolMetrics.prometheus() on /metrics.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from mcp.types import CallToolRequest
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PHASES = ("queue", "backend", "serialization", "total")
+
+
+class Histogram:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the q-th observation, or None if
+        there are no observations or it is above the top bucket (which has
+        no bound a JSON reader could take)
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets[:len(BUCKETS)]):
+            seen += n
+            if seen >= rank:
+                return BUCKETS[i]
+        return None
+
+
+class CallTimer:
+    """Timestamps for one tool call, reachable from the code running it through a context variable"""
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.received = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.backend: list[tuple[float, float]] = []
+        self.error: Optional[str] = None
+
+    def backend_seconds(self) -> float:
+        """Wall time covered by backend requests, counting overlaps once"""
+        total = 0.0
+        covered_to = 0.0
+        for start, end in sorted(self.backend):
+            if end <= covered_to:
+                continue
+            total += end - max(start, covered_to)
+            covered_to = end
+        return total
+
+
+_current_call: ContextVar[Optional[CallTimer]] = ContextVar("bookings_tool_call", default=None)
+
+
+def mark_handler_started() -> None:
+    timer = _current_call.get()
+    if timer is not None:
+        timer.handler_started = time.perf_counter()
+
+
+def mark_error(kind: str) -> None:
+    timer = _current_call.get()
+    if timer is not None and timer.error is None:
+        timer.error = kind
+
+
+@contextmanager
+def backend_call():
+    """Wrap each PASOE request so its time is counted in the backend phase"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer = _current_call.get()
+        if timer is not None:
+            timer.backend.append((started, time.perf_counter()))
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else seconds * 1000
+
+
+class ToolMetrics:
+    def __init__(self):
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._errors: dict[tuple[str, str], int] = {}
+
+    def instrument(self, server, known_tools) -> None:
+        """
+        Time every tools/call handled by `server`. Call after the server's
+        call_tool handler has been registered. Names not in `known_tools`
+        are recorded as "unknown" so clients can't inflate the label set.
+        """
+        handler = server.request_handlers[CallToolRequest]
+
+        async def timed_call_tool(request: CallToolRequest):
+            name = request.params.name
+            timer = CallTimer(name if name in known_tools else "unknown")
+            token = _current_call.set(timer)
+            try:
+                result = await handler(request)
+                if getattr(result.root, "isError", False):
+                    mark_error("Error")
+                return result
+            except Exception as e:
+                mark_error(type(e).__name__)
+                raise
+            finally:
+                _current_call.reset(token)
+                self.record(timer, time.perf_counter())
+
+        server.request_handlers[CallToolRequest] = timed_call_tool
+
+    def _observe(self, tool: str, phase: str, seconds: float) -> None:
+        histogram = self._histograms.get((tool, phase))
+        if histogram is None:
+            histogram = self._histograms[(tool, phase)] = Histogram()
+        histogram.observe(seconds)
+
+    def record(self, timer: CallTimer, finished: float) -> None:
+        total = finished - timer.received
+        started = timer.handler_started or finished
+        queue = started - timer.received
+        backend = timer.backend_seconds()
+        self._observe(timer.tool, "queue", queue)
+        self._observe(timer.tool, "backend", backend)
+        self._observe(timer.tool, "serialization", max(total - queue - backend, 0.0))
+        self._observe(timer.tool, "total", total)
+        if timer.error is not None:
+            key = (timer.tool, timer.error)
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        """
+        Per tool: calls, errors by kind, and mean/p50/p95 milliseconds per
+        phase. A p50 or p95 above the top bucket bound is None.
+        """
+        tools: dict[str, dict] = {}
+        for (tool, phase), histogram in sorted(self._histograms.items()):
+            entry = tools.setdefault(tool, {"calls": 0, "errors": {}, "phases_ms": {}})
+            if phase == "total":
+                entry["calls"] = histogram.count
+            entry["phases_ms"][phase] = {
+                "mean": histogram.sum / histogram.count * 1000,
+                "p50": _ms(histogram.quantile(0.5)),
+                "p95": _ms(histogram.quantile(0.95)),
+            }
+        for (tool, kind), count in sorted(self._errors.items()):
+            tools.setdefault(tool, {"calls": 0, "errors": {}, "phases_ms": {}})["errors"][kind] = count
+        return {"bucket_bounds_ms": [b * 1000 for b in BUCKETS], "tools": tools}
+
+    def prometheus(self, cache_stats: Optional[dict] = None) -> str:
+        """The metrics in Prometheus text exposition format"""
+        lines = [
+            "# HELP bookings_mcp_tool_phase_seconds Tool call latency by phase",
+            "# TYPE bookings_mcp_tool_phase_seconds histogram",
+        ]
+        for (tool, phase), histogram in sorted(self._histograms.items()):
+            labels = f'tool="{tool}",phase="{phase}"'
+            cumulative = 0
+            for bound, n in zip(BUCKETS + (float("inf"),), histogram.buckets):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'bookings_mcp_tool_phase_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f"bookings_mcp_tool_phase_seconds_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"bookings_mcp_tool_phase_seconds_count{{{labels}}} {histogram.count}")
+
+        lines += [
+            "# HELP bookings_mcp_tool_errors_total Failed tool calls by kind",
+            "# TYPE bookings_mcp_tool_errors_total counter",
+        ]
+        for (tool, kind), count in sorted(self._errors.items()):
+            lines.append(f'bookings_mcp_tool_errors_total{{tool="{tool}",kind="{kind}"}} {count}')
+
+        if cache_stats is not None:
+            lines += [
+                "# HELP bookings_mcp_cache_lookups_total Result cache lookups by outcome",
+                "# TYPE bookings_mcp_cache_lookups_total counter",
+            ]
+            for tool, stats in sorted(cache_stats["tools"].items()):
+                lines.append(f'bookings_mcp_cache_lookups_total{{tool="{tool}",result="hit"}} {stats["hits"]}')
+                lines.append(f'bookings_mcp_cache_lookups_total{{tool="{tool}",result="miss"}} {stats["misses"]}')
+
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,116 @@
+"""
+Tool registry for the bookings MCP server.
+
+Each tool is declared once, next to its handler:
+
+    @tools.tool(
+        name="get_booking",
+        description="Get the existing booking for a car registration",
+        input_schema={...},
+        output_schema={...},
+    )
+    async def get_booking(reg: str):
+        ...
+
+The registry builds the list_tools response and a validator for every schema
+when a tool is registered, so a call is a dictionary lookup plus a check
+against an already-compiled validator. Arguments that don't match the input
+schema are rejected before the handler (and so PASOE) is ever reached.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from jsonschema import FormatChecker
+from jsonschema.validators import validator_for
+from mcp.types import CallToolResult, TextContent, Tool
+
+from bookings_mcp.metrics import mark_error, mark_handler_started
+
+ToolHandler = Callable[..., Awaitable[tuple[list, dict]]]
+
+FORMAT_CHECKER = FormatChecker(formats=("date",))
+
+
+def compile_schema(schema: dict):
+    """A reusable validator for a JSON schema; the schema itself is checked once, here"""
+    cls = validator_for(schema)
+    cls.check_schema(schema)
+    return cls(schema, format_checker=FORMAT_CHECKER)
+
+
+def error_result(message: str) -> CallToolResult:
+    return CallToolResult(content=[TextContent(type="text", text=message)], isError=True)
+
+
+@dataclass
+class RegisteredTool:
+    definition: Tool
+    handler: ToolHandler
+    input_validator: Any
+    output_validator: Any
+
+
+class ToolRegistry:
+    def __init__(self):
+        self._tools: dict[str, RegisteredTool] = {}
+        self._definitions: list[Tool] = []
+
+    def tool(self, name: str, description: str, input_schema: dict, output_schema: Optional[dict] = None):
+        """Register the decorated coroutine as the handler for a tool"""
+        def register(handler: ToolHandler) -> ToolHandler:
+            definition = Tool(name=name, description=description, inputSchema=input_schema, outputSchema=output_schema)
+            self._tools[name] = RegisteredTool(
+                definition=definition,
+                handler=handler,
+                input_validator=compile_schema(input_schema),
+                output_validator=compile_schema(output_schema) if output_schema else None,
+            )
+            self._definitions.append(definition)
+            return handler
+        return register
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def list_tools(self) -> list[Tool]:
+        """The tool definitions, built once at registration"""
+        return self._definitions
+
+    def validate(self, name: str, arguments: dict) -> Optional[str]:
+        """Why these arguments can't be passed to the tool, or None if they can"""
+        entry = self._tools.get(name)
+        if entry is None:
+            mark_error("UnknownTool")
+            return f"Unknown tool: {name}"
+        error = next(entry.input_validator.iter_errors(arguments), None)
+        if error is not None:
+            mark_error("InvalidArguments")
+            where = ".".join(str(p) for p in error.absolute_path)
+            return f"Input validation error: {where + ': ' if where else ''}{error.message}"
+        return None
+
+    async def call(self, name: str, arguments: dict) -> CallToolResult:
+        """
+        Validate and run a tool. Failures come back as isError results rather
+        than exceptions, as MCP clients expect.
+        """
+        problem = self.validate(name, arguments)
+        if problem is not None:
+            return error_result(problem)
+
+        entry = self._tools[name]
+        mark_handler_started()
+        try:
+            content, structured = await entry.handler(**arguments)
+        except Exception as e:
+            mark_error(type(e).__name__)
+            return error_result(str(e))
+
+        if entry.output_validator is not None:
+            error = next(entry.output_validator.iter_errors(structured), None)
+            if error is not None:
+                mark_error("OutputValidation")
+                return error_result(f"Output validation error: {error.message}")
+
+        return CallToolResult(content=content, structuredContent=structured, isError=False)
@@ -2,24 +2,267 @@
 """
 Bookings MCP Server
 Provides booking management tools via MCP protocol
+
+Run it either as a private subprocess over stdio (the default, started by
+BookingAssistant), or as one long-running server shared by every agent:
+
+    py bookings_mcp/server.py --transport http --port 8765
+
+which serves streamable HTTP on /mcp/ and SSE on /sse. Add --metrics to
+also serve Prometheus metrics on /metrics.
 """
 
 import os
+import sys
+from pathlib import Path
+
+if not __package__:
+    # Run as a script (python bookings_mcp/server.py): make the package importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Only when run as its own process; in-process, the agent's profile covers it
+PROFILE_STARTUP = bool(os.getenv("STARTUP_PROFILE")) and __name__ == "__main__"
+if PROFILE_STARTUP:
+    # Time the imports below; startupProfile.py sits next to the agent's main.py
+    import startupProfile
+    startupProfile.start("mcp server", configure_logging=True)
+
+import argparse
+import asyncio
+import contextlib
+import json
 from datetime import datetime, date
 from typing import Optional
-import requests
+import httpx
 from dotenv import load_dotenv
 from mcp.server import Server
-from mcp.server.stdio import stdio_server
-from mcp.types import Tool, TextContent
+from mcp.server.lowlevel.helper_types import ReadResourceContents
+from mcp.types import CallToolResult, Resource, Tool, TextContent
 
-# Load environment variables
-load_dotenv(override=True)
+from bookings_mcp import __version__
+from bookings_mcp.availability import CALENDAR_URI, AvailabilityCalendar
+from bookings_mcp.cache import ResultCache
+from bookings_mcp.metrics import ToolMetrics, backend_call
+from bookings_mcp.registry import ToolRegistry
+
+# Load environment variables. Values passed in by the client process (which
+# has already loaded its own .env) take precedence over the file
+load_dotenv()
 
 BASE_URL = os.getenv("OE_SERVICE_URL")
 
+@contextlib.asynccontextmanager
+async def session_lifespan(server):
+    """
+    Runs around each client session. A session that subscribed to the
+    calendar is dropped from its subscribers as soon as it closes, rather
+    than when the next change fails to reach it.
+    """
+    subscribed: set = set()
+    try:
+        yield subscribed
+    finally:
+        for session in subscribed:
+            calendar.unsubscribe(session)
+
+
 # Initialize MCP server
-app = Server("bookings-server")
+app = Server("bookings-server", version=__version__, lifespan=session_lifespan)
+
+# The low-level server always reports resources.subscribe as false. This
+# server supports subscriptions (to the availability calendar), so say so to
+# every transport, including the streamable HTTP manager
+_create_initialization_options = app.create_initialization_options
+
+
+def create_initialization_options(*args, **kwargs):
+    options = _create_initialization_options(*args, **kwargs)
+    if options.capabilities.resources is not None:
+        options.capabilities.resources.subscribe = True
+    return options
+
+
+app.create_initialization_options = create_initialization_options
+
+# One pooled async client for all PASOE calls, so a slow call only waits on
+# the network and never blocks the event loop for other in-flight tool calls
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+HTTP_TIMEOUT = httpx.Timeout(10.0)
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared PASOE client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_client
+
+
+async def close_http_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# Short-lived cache of read tool results. Agents repeat get_booking and
+# get_next_available_booking_date within seconds of each other; a booking made
+# through this server invalidates the entries for its reg and date
+result_cache = ResultCache(ttl=float(os.getenv("BOOKINGS_CACHE_TTL", "30")))
+
+CACHE_STATS_URI = "bookings://stats/cache"
+
+# Latency per tool and phase, and error counts
+tool_metrics = ToolMetrics()
+
+TOOL_STATS_URI = "bookings://stats/tools"
+
+
+def tool_result(rendering: str, structured: dict, cached_age: Optional[float] = None) -> tuple[list[TextContent], dict]:
+    """
+    A tool result as a short rendering for the model plus the same facts as
+    structured content for code to branch on. Answers served from the cache
+    are marked as such.
+    """
+    meta = None if cached_age is None else {"cached": True, "age_seconds": round(cached_age, 3)}
+    return [TextContent(type="text", text=rendering, _meta=meta)], structured
+
+
+def booking_fields(booking: Optional[dict]) -> Optional[dict]:
+    """A fetched booking as structured content"""
+    if booking is None:
+        return None
+    return {"date": booking["date"].isoformat(), "description": booking["description"]}
+
+
+class BackendError(Exception):
+    """PASOE could not be reached, or answered with an unexpected status"""
+
+
+async def fetch_booking(reg: str) -> tuple[Optional[dict], Optional[float]]:
+    """
+    The booking held for a normalised reg as {"date", "description"}, or None.
+    Also returns the age of the cached answer, or None if PASOE was asked.
+    """
+    cache_key = {"reg": reg}
+    hit = result_cache.get("get_booking", cache_key)
+    if hit is not None:
+        return hit
+
+    token = result_cache.token()
+    try:
+        with backend_call():
+            r = await get_http_client().get(
+                f"{BASE_URL}booking/getbooking",
+                params={"reg": reg},
+                headers={"Accept": "application/json"}
+            )
+    except httpx.HTTPError as e:
+        raise BackendError(f"Request failed: {e}")
+
+    if r.status_code == 200:
+        data = r.json()
+        bd = data.get("BookingDate")
+        booking = None
+        if bd:
+            booking = {
+                "date": datetime.strptime(bd, "%d-%m-%Y").date(),
+                "description": data.get("Description", ""),
+            }
+    elif r.status_code in (204, 404):
+        booking = None
+    else:
+        raise BackendError(f"Unexpected status {r.status_code}: {r.text}")
+
+    result_cache.put("get_booking", cache_key, booking, tags=[("reg", reg)], token=token)
+    return booking, None
+
+
+async def fetch_available_dates(earliest_date: date, count: int = 1) -> tuple[list[date], Optional[float]]:
+    """
+    The next `count` available booking dates after earliest_date, in order,
+    plus the age of the cached answer (None if PASOE was asked). Availability
+    is the same for every car, so it is cached on the dates only.
+    """
+    cache_key = {"earliest_date": earliest_date.isoformat()}
+    if count > 1:
+        cache_key["count"] = count
+    hit = result_cache.get("get_next_available_booking_date", cache_key)
+    if hit is not None:
+        return hit
+
+    params = {"startDate": earliest_date.strftime("%d-%m-%Y")}
+    if count > 1:
+        params["count"] = count
+
+    token = result_cache.token()
+    try:
+        with backend_call():
+            r = await get_http_client().get(
+                f"{BASE_URL}booking/next",
+                params=params,
+                headers={"Accept": "application/json"}
+            )
+    except httpx.HTTPError as e:
+        raise BackendError(f"Request failed: {e}")
+
+    if r.status_code in (204, 404):
+        return [], None
+    if r.status_code != 200:
+        raise BackendError(f"Unexpected status {r.status_code}: {r.text}")
+
+    data = r.json()
+    found = data.get("BookingDates") or [data.get("BookingDate")]
+    dates = [datetime.strptime(bd, "%d-%m-%Y").date() for bd in found if bd]
+    if not dates:
+        return [], None
+
+    if len(dates) < count:
+        # The PASOE handler predates the count parameter: carry on from the last date
+        more, _ = await fetch_available_dates(dates[-1], count - len(dates))
+        dates += more
+
+    # Only a booking on one of the dates we offered can change this answer
+    result_cache.put(
+        "get_next_available_booking_date", cache_key, dates,
+        tags=[("date", d.isoformat()) for d in dates], token=token
+    )
+    return dates, None
+
+
+async def fetch_booked_dates(start: date, end: date) -> set[date]:
+    """The dates already booked between start and end, inclusive"""
+    try:
+        with backend_call():
+            r = await get_http_client().get(
+                f"{BASE_URL}booking/calendar",
+                params={"startDate": start.strftime("%d-%m-%Y"), "endDate": end.strftime("%d-%m-%Y")},
+                headers={"Accept": "application/json"}
+            )
+    except httpx.HTTPError as e:
+        raise BackendError(f"Request failed: {e}")
+
+    if r.status_code != 200:
+        raise BackendError(f"Unexpected status {r.status_code}: {r.text}")
+    return {datetime.strptime(bd, "%d-%m-%Y").date() for bd in r.json().get("BookedDates", [])}
+
+
+# Booked dates over the next BOOKINGS_CALENDAR_DAYS, pushed to subscribers as they change
+calendar = AvailabilityCalendar(
+    fetch_booked_dates,
+    horizon_days=int(os.getenv("BOOKINGS_CALENDAR_DAYS", "60")),
+    refresh_seconds=float(os.getenv("BOOKINGS_CALENDAR_REFRESH", "60"))
+)
+
+
+def join_dates(dates: list[date]) -> str:
+    """Dates as spoken, e.g. 5th November 2025, 6th November 2025 and 7th November 2025"""
+    spoken = [date_to_long_string(d) for d in dates]
+    if len(spoken) < 2:
+        return "".join(spoken)
+    return f"{', '.join(spoken[:-1])} and {spoken[-1]}"
 
 
 def date_to_long_string(d: date) -> str:
@@ -33,239 +276,391 @@ def date_to_long_string(d: date) -> str:
     return f"{day}{suffix} {d.strftime('%B %Y')}"
 
 
+# Structured content returned by the tools. Dates are ISO (YYYY-MM-DD)
+ISO_DATE = {"type": "string", "format": "date"}
+BOOKING_OUTPUT = {
+    "type": ["object", "null"],
+    "properties": {
+        "date": ISO_DATE,
+        "description": {"type": "string"}
+    },
+    "required": ["date", "description"]
+}
+REG_INPUT = {
+    "type": "string",
+    "minLength": 1,
+    "maxLength": 10,
+    "description": "Car registration number"
+}
+
+tools = ToolRegistry()
+
+
+@tools.tool(
+    name="get_the_date_today",
+    description="Get today's date in a formatted string",
+    input_schema={
+        "type": "object",
+        "properties": {},
+        "required": []
+    },
+    output_schema={
+        "type": "object",
+        "properties": {"today": ISO_DATE},
+        "required": ["today"]
+    }
+)
+async def get_the_date_today():
+    today = date.today()
+    return tool_result(f"Today is {date_to_long_string(today)}", {"today": today.isoformat()})
+
+
+@tools.tool(
+    name="get_next_available_booking_date",
+    description="Get the next available booking date from a given start date",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "reg": REG_INPUT,
+            "earliest_date": {
+                **ISO_DATE,
+                "description": "Earliest date for booking in ISO format (YYYY-MM-DD)"
+            }
+        },
+        "required": ["reg", "earliest_date"]
+    },
+    output_schema={
+        "type": "object",
+        "properties": {"next_available_date": {"type": ["string", "null"], "format": "date"}},
+        "required": ["next_available_date"]
+    }
+)
+async def get_next_available_booking_date(reg: str, earliest_date: str):
+    dates, cached_age = await fetch_available_dates(date.fromisoformat(earliest_date))
+
+    if not dates:
+        return tool_result("No dates available", {"next_available_date": None}, cached_age)
+    return tool_result(
+        f"Next available: {date_to_long_string(dates[0])}",
+        {"next_available_date": dates[0].isoformat()},
+        cached_age
+    )
+
+
+@tools.tool(
+    name="book_appointment",
+    description="Book an appointment for a specific date",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "reg": REG_INPUT,
+            "date": {
+                **ISO_DATE,
+                "description": "Date for the appointment in ISO format (YYYY-MM-DD)"
+            },
+            "description": {
+                "type": "string",
+                "minLength": 1,
+                "description": "Description of the appointment"
+            }
+        },
+        "required": ["reg", "date", "description"]
+    },
+    output_schema={
+        "type": "object",
+        "properties": {
+            "booked": {"type": "boolean"},
+            "date": ISO_DATE,
+            "description": {"type": "string"},
+            "conflict": {"type": "string"}
+        },
+        "required": ["booked", "date"]
+    }
+)
+async def book_appointment(reg: str, date: str, description: str):
+    reg = reg.upper().replace(" ", "")
+    booking_date = datetime.fromisoformat(date).date()
+
+    # Call API
+    url = f"{BASE_URL}booking"
+    payload = {
+        "reg": reg,
+        "date": booking_date.strftime("%d-%m-%Y"),
+        "description": description,
+    }
+
+    try:
+        with backend_call():
+            r = await get_http_client().post(
+                url,
+                json=payload,
+                headers={"Content-Type": "application/json"}
+            )
+    except httpx.HTTPError as e:
+        raise BackendError(f"Request failed: {e}")
+
+    if r.status_code == 200 and r.text.strip().upper() == "OK":
+        result_cache.invalidate(("reg", reg), ("date", booking_date.isoformat()))
+        calendar.mark_booked(booking_date)
+        return tool_result(
+            f"Booked: {date_to_long_string(booking_date)}, {description}",
+            {"booked": True, "date": booking_date.isoformat(), "description": description}
+        )
+    elif r.status_code == 409:
+        # Someone else has the date: tell watchers and drop any answer offering it
+        result_cache.invalidate(("date", booking_date.isoformat()))
+        calendar.mark_booked(booking_date)
+        return tool_result(
+            f"Not booked: {r.text.strip()}",
+            {"booked": False, "date": booking_date.isoformat(), "conflict": r.text.strip()}
+        )
+    else:
+        raise BackendError(f"Failed to book appointment: {r.text}")
+
+
+@tools.tool(
+    name="get_booking",
+    description="Get the existing booking for a car registration",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "reg": REG_INPUT
+        },
+        "required": ["reg"]
+    },
+    output_schema={
+        "type": "object",
+        "properties": {"booking": BOOKING_OUTPUT},
+        "required": ["booking"]
+    }
+)
+async def get_booking(reg: str):
+    booking, cached_age = await fetch_booking(reg.upper().replace(" ", ""))
+
+    if booking is None:
+        return tool_result("No booking", {"booking": None}, cached_age)
+    return tool_result(
+        f"Booking: {date_to_long_string(booking['date'])}, {booking['description']}",
+        {"booking": booking_fields(booking)},
+        cached_age
+    )
+
+
+@tools.tool(
+    name="get_booking_overview",
+    description="Get the existing booking for a car registration together with the next available booking dates, in one call",
+    input_schema={
+        "type": "object",
+        "properties": {
+            "reg": REG_INPUT,
+            "earliest_date": {
+                **ISO_DATE,
+                "description": "Earliest date for booking in ISO format (YYYY-MM-DD), defaults to today"
+            },
+            "count": {
+                "type": "integer",
+                "minimum": 1,
+                "maximum": 10,
+                "description": "How many available dates to return (1-10, default 3)"
+            }
+        },
+        "required": ["reg"]
+    },
+    output_schema={
+        "type": "object",
+        "properties": {
+            "booking": BOOKING_OUTPUT,
+            "available_dates": {"type": "array", "items": ISO_DATE}
+        },
+        "required": ["booking", "available_dates"]
+    }
+)
+async def get_booking_overview(reg: str, earliest_date: Optional[str] = None, count: int = 3):
+    # Everything BookingAssistant needs to greet the customer. The booking
+    # and the available dates are fetched at the same time, so this costs
+    # one PASOE round trip instead of get_booking followed by
+    # get_next_available_booking_date
+    reg = reg.upper().replace(" ", "")
+    start = date.fromisoformat(earliest_date) if earliest_date else date.today()
+
+    (booking, booking_age), (dates, dates_age) = await asyncio.gather(
+        fetch_booking(reg),
+        fetch_available_dates(start, count)
+    )
+
+    if booking is None:
+        rendering = "No booking."
+    else:
+        rendering = f"Booking: {date_to_long_string(booking['date'])}, {booking['description']}."
+    rendering += f" Available: {join_dates(dates)}" if dates else " No dates available"
+
+    # Only marked as cached if neither half needed PASOE
+    cached_age = None
+    if booking_age is not None and dates_age is not None:
+        cached_age = max(booking_age, dates_age)
+    return tool_result(
+        rendering,
+        {"booking": booking_fields(booking), "available_dates": [d.isoformat() for d in dates]},
+        cached_age
+    )
+
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """List available booking tools"""
+    return tools.list_tools()
+
+
+# The registry validates arguments against its compiled schemas, and returns
+# a finished CallToolResult so the output isn't validated a second time
+@app.call_tool(validate_input=False)
+async def call_tool(name: str, arguments: dict) -> CallToolResult:
+    """Handle tool calls"""
+    return await tools.call(name, arguments)
+
+
+tool_metrics.instrument(app, tools)
+
+
+@app.list_resources()
+async def list_resources() -> list[Resource]:
+    """List the availability calendar and diagnostic resources"""
     return [
-        Tool(
-            name="get_the_date_today",
-            description="Get today's date in a formatted string",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
+        Resource(
+            uri=CACHE_STATS_URI,
+            name="cache_stats",
+            description="Result cache size and hit ratios, overall and per tool",
+            mimeType="application/json"
         ),
-        Tool(
-            name="get_next_available_booking_date",
-            description="Get the next available booking date from a given start date",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "reg": {
-                        "type": "string",
-                        "description": "Car registration number"
-                    },
-                    "earliest_date": {
-                        "type": "string",
-                        "description": "Earliest date for booking in ISO format (YYYY-MM-DD)"
-                    }
-                },
-                "required": ["reg", "earliest_date"]
-            }
+        Resource(
+            uri=CALENDAR_URI,
+            name="availability_calendar",
+            description="Dates already booked over the coming weeks; subscribe for updates as bookings are made",
+            mimeType="application/json"
         ),
-        Tool(
-            name="book_appointment",
-            description="Book an appointment for a specific date",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "reg": {
-                        "type": "string",
-                        "description": "Car registration number"
-                    },
-                    "date": {
-                        "type": "string",
-                        "description": "Date for the appointment in ISO format (YYYY-MM-DD)"
-                    },
-                    "description": {
-                        "type": "string",
-                        "description": "Description of the appointment"
-                    }
-                },
-                "required": ["reg", "date", "description"]
-            }
-        ),
-        Tool(
-            name="get_booking",
-            description="Get the existing booking for a car registration",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "reg": {
-                        "type": "string",
-                        "description": "Car registration number"
-                    }
-                },
-                "required": ["reg"]
-            }
+        Resource(
+            uri=TOOL_STATS_URI,
+            name="tool_stats",
+            description="Per-tool call counts, errors by kind, and queue/backend/serialization latency",
+            mimeType="application/json"
         )
     ]
 
 
-@app.call_tool()
-async def call_tool(name: str, arguments: dict) -> list[TextContent]:
-    """Handle tool calls"""
-
-    if name == "get_the_date_today":
-        date_str = date_to_long_string(date.today())
-        return [TextContent(
-            type="text",
-            text=f"The date today is {date_str}"
-        )]
-
-    elif name == "get_next_available_booking_date":
-        reg = arguments["reg"]
-        earliest_date_str = arguments["earliest_date"]
-
-        # Parse ISO date
-        try:
-            earliest_date = datetime.fromisoformat(earliest_date_str).date()
-        except ValueError as e:
-            return [TextContent(
-                type="text",
-                text=f"Invalid date format: {e}"
-            )]
-
-        # Call API
-        url = f"{BASE_URL}booking/next"
-        formatted_date = earliest_date.strftime("%d-%m-%Y")
-
-        try:
-            r = requests.get(
-                url,
-                params={"startDate": formatted_date},
-                headers={"Accept": "application/json"},
-                timeout=10
-            )
-
-            if r.status_code == 200:
-                data = r.json()
-                bd = data.get("BookingDate")
-                if bd:
-                    next_date = datetime.strptime(bd, "%d-%m-%Y").date()
-                    date_str = date_to_long_string(next_date)
-                    return [TextContent(
-                        type="text",
-                        text=f"The next available booking date is {date_str}"
-                    )]
-                else:
-                    return [TextContent(type="text", text="No booking date available")]
-            elif r.status_code in (204, 404):
-                return [TextContent(type="text", text="No booking date available")]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"Unexpected status {r.status_code}: {r.text}"
-                )]
-
-        except requests.RequestException as e:
-            return [TextContent(type="text", text=f"Request failed: {e}")]
-
-    elif name == "book_appointment":
-        reg = arguments["reg"].upper().replace(" ", "")
-        date_str = arguments["date"]
-        description = arguments["description"]
-
-        # Parse ISO date
-        try:
-            booking_date = datetime.fromisoformat(date_str).date()
-        except ValueError as e:
-            return [TextContent(
-                type="text",
-                text=f"Invalid date format: {e}"
-            )]
-
-        # Call API
-        url = f"{BASE_URL}booking"
-        payload = {
-            "reg": reg,
-            "date": booking_date.strftime("%d-%m-%Y"),
-            "description": description,
-        }
-
-        try:
-            r = requests.post(
-                url,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
+@app.read_resource()
+async def read_resource(uri) -> list[ReadResourceContents]:
+    """Read a resource"""
+    if str(uri) == CALENDAR_URI:
+        return [ReadResourceContents(content=json.dumps(await calendar.snapshot()), mime_type="application/json")]
+    if str(uri) == CACHE_STATS_URI:
+        return [ReadResourceContents(content=json.dumps(result_cache.stats()), mime_type="application/json")]
+    if str(uri) == TOOL_STATS_URI:
+        return [ReadResourceContents(content=json.dumps(tool_metrics.snapshot()), mime_type="application/json")]
+    raise ValueError(f"Unknown resource: {uri}")
+
+
+@app.subscribe_resource()
+async def subscribe_resource(uri) -> None:
+    """Push availability calendar changes to the calling session"""
+    if str(uri) != CALENDAR_URI:
+        raise ValueError(f"Resource cannot be subscribed to: {uri}")
+    context = app.request_context
+    calendar.subscribe(context.session)
+    # Unsubscribed when the session closes (see session_lifespan)
+    context.lifespan_context.add(context.session)
+
+
+@app.unsubscribe_resource()
+async def unsubscribe_resource(uri) -> None:
+    if str(uri) == CALENDAR_URI:
+        context = app.request_context
+        calendar.unsubscribe(context.session)
+        context.lifespan_context.discard(context.session)
+
+
+async def run_stdio():
+    """Run the MCP server for a single client over stdin/stdout"""
+    from mcp.server.stdio import stdio_server
+
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            if PROFILE_STARTUP:
+                startupProfile.mark("ready")
+                startupProfile.report()
+            await app.run(
+                read_stream,
+                write_stream,
+                app.create_initialization_options()
             )
+    finally:
+        await close_http_client()
+
+
+def create_http_app(metrics: bool = False):
+    """
+    Build the ASGI app for the shared server. Every client gets its own MCP
+    session, but they all share this process, its imports and its pooled
+    PASOE connections. With `metrics`, Prometheus can scrape /metrics.
+    """
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse, Response
+    from starlette.routing import Mount, Route
+
+    session_manager = StreamableHTTPSessionManager(app=app)
+    sse = SseServerTransport("/messages/")
+
+    async def handle_streamable_http(scope, receive, send):
+        await session_manager.handle_request(scope, receive, send)
+
+    async def handle_sse(request):
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+        return Response()
+
+    async def handle_metrics(request):
+        return PlainTextResponse(
+            tool_metrics.prometheus(result_cache.stats()),
+            media_type="text/plain; version=0.0.4"
+        )
 
-            if r.status_code == 200 and r.text.strip().upper() == "OK":
-                formatted_date = date_to_long_string(booking_date)
-                return [TextContent(
-                    type="text",
-                    text=f"Appointment booked for {formatted_date} with description: {description}"
-                )]
-            elif r.status_code == 409:
-                return [TextContent(
-                    type="text",
-                    text=f"Conflict: {r.text.strip()}"
-                )]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"Failed to book appointment: {r.text}"
-                )]
-
-        except requests.RequestException as e:
-            return [TextContent(type="text", text=f"Request failed: {e}")]
-
-    elif name == "get_booking":
-        reg = arguments["reg"].upper().replace(" ", "")
-
-        # Call API
-        url = f"{BASE_URL}booking/getbooking"
-
-        try:
-            r = requests.get(
-                url,
-                params={"reg": reg},
-                headers={"Accept": "application/json"},
-                timeout=10
-            )
+    @contextlib.asynccontextmanager
+    async def lifespan(starlette_app):
+        async with session_manager.run():
+            if PROFILE_STARTUP:
+                startupProfile.mark("ready")
+                startupProfile.report()
+            try:
+                yield
+            finally:
+                await close_http_client()
+
+    routes = [
+        Mount("/mcp", app=handle_streamable_http),
+        Route("/sse", endpoint=handle_sse),
+        Mount("/messages/", app=sse.handle_post_message),
+    ]
+    if metrics:
+        routes.append(Route("/metrics", endpoint=handle_metrics))
 
-            if r.status_code == 200:
-                data = r.json()
-                bd = data.get("BookingDate")
-                desc = data.get("Description", "")
-
-                if bd:
-                    booking_date = datetime.strptime(bd, "%d-%m-%Y").date()
-                    formatted_date = date_to_long_string(booking_date)
-                    return [TextContent(
-                        type="text",
-                        text=f"Next appointment is on {formatted_date} with description: {desc}"
-                    )]
-                else:
-                    return [TextContent(type="text", text="No appointment found")]
-
-            elif r.status_code in (204, 404):
-                return [TextContent(type="text", text="No appointment found")]
-            else:
-                return [TextContent(
-                    type="text",
-                    text=f"Unexpected status {r.status_code}: {r.text}"
-                )]
-
-        except requests.RequestException as e:
-            return [TextContent(type="text", text=f"Request failed: {e}")]
+    return Starlette(routes=routes, lifespan=lifespan)
 
-    else:
-        return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
+def main():
+    parser = argparse.ArgumentParser(description="Bookings MCP Server")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--metrics", action="store_true", help="Serve Prometheus metrics on /metrics (http only)")
+    args = parser.parse_args()
 
-async def main():
-    """Run the MCP server"""
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(
-            read_stream,
-            write_stream,
-            app.create_initialization_options()
-        )
+    if args.transport == "http":
+        import uvicorn
+        uvicorn.run(create_http_app(metrics=args.metrics), host=args.host, port=args.port, log_level="warning")
+    else:
+        asyncio.run(run_stdio())
 
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
+    main()
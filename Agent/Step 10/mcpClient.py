@@ -0,0 +1,752 @@
+"""
+MCP client helpers for the booking agent.
+
+BookingAssistant reaches the bookings MCP server through a transport:
+
+  - stdio (default): a private `python bookings_mcp/server.py` subprocess
+  - http: a shared long-running server started with
+          `py bookings_mcp/server.py --transport http`, used when
+          BOOKINGS_MCP_URL is set (e.g. http://127.0.0.1:8765/mcp/, or a
+          URL ending in /sse for the SSE endpoint)
+  - inprocess: the server's `app` runs inside the agent process and talks
+          over in-memory streams, used when BOOKINGS_MCP_TRANSPORT=inprocess.
+          No subprocess, pipes or JSON encoding; tools are still discovered
+          through MCP
+
+Runtime calls go through one MCPSessionPool per process, whichever the
+transport, so a handoff doesn't start a process or perform a fresh
+initialize handshake. For stdio the pool keeps BOOKINGS_MCP_POOL_SIZE server
+processes warm and replaces each after BOOKINGS_MCP_RECYCLE_AFTER calls
+(0 never), or as soon as it fails. A call that can't get a session within
+BOOKINGS_MCP_CHECKOUT_TIMEOUT seconds (default 10), or whose pool is closed
+while it waits, raises SessionUnavailableError. Pooled stdio servers don't cache results,
+as each would only see the bookings made through itself.
+
+Tool definitions are discovered once per process and kept in a ToolCatalog,
+which also saves them to disk (BOOKINGS_MCP_TOOL_CACHE) keyed by server
+version and schema hash, and refreshes them in the background. Creating a
+BookingAssistant never waits for discovery.
+
+Tool results the model reads are counted in `result_tokens`, so the cost of
+each tool's output can be tracked per call.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, AsyncContextManager, Callable, Optional
+
+from mcp import ClientSession, StdioServerParameters, types
+from mcp.client.stdio import stdio_client
+
+logger = logging.getLogger("user-data")
+
+SERVER_PATH = Path(__file__).parent / "bookings_mcp" / "server.py"
+
+CALENDAR_URI = "bookings://calendar"
+
+# A transport is anything that opens (read_stream, write_stream, ...) to a server
+Transport = Callable[[], AsyncContextManager[tuple]]
+
+
+def stdio_transport(server_path: Path = SERVER_PATH, env: Optional[dict[str, str]] = None) -> Transport:
+    """
+    Start a private copy of the server as a subprocess for each connection,
+    with this process's environment plus `env`
+    """
+    params = StdioServerParameters(
+        command=sys.executable,
+        args=[str(server_path)],
+        env={**os.environ, **(env or {})}
+    )
+    return lambda: stdio_client(params)
+
+
+def http_transport(url: str) -> Transport:
+    """Connect to an already-running shared server"""
+    if url.rstrip("/").endswith("/sse"):
+        from mcp.client.sse import sse_client
+        return lambda: sse_client(url)
+
+    from mcp.client.streamable_http import streamablehttp_client
+    return lambda: streamablehttp_client(url)
+
+
+@asynccontextmanager
+async def _inprocess_streams():
+    import anyio
+    from mcp.shared.memory import create_client_server_memory_streams
+    from bookings_mcp.server import app
+
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lambda: app.run(
+                server_streams[0],
+                server_streams[1],
+                app.create_initialization_options(),
+                raise_exceptions=False
+            ))
+            try:
+                yield client_streams
+            finally:
+                tg.cancel_scope.cancel()
+
+
+def inprocess_transport() -> Transport:
+    """
+    Run the bookings server in this process. Its tool handlers share the
+    agent's event loop, so they must never block.
+    """
+    return _inprocess_streams
+
+
+def use_inprocess() -> bool:
+    return os.getenv("BOOKINGS_MCP_TRANSPORT", "").lower() == "inprocess"
+
+
+def default_transport() -> Transport:
+    if use_inprocess():
+        return inprocess_transport()
+    url = os.getenv("BOOKINGS_MCP_URL")
+    return http_transport(url) if url else stdio_transport()
+
+
+@asynccontextmanager
+async def _open_initialized(transport: Transport, message_handler=None):
+    """A session and the server's initialize result, closed on exit"""
+    async with transport() as streams:
+        kwargs = {"message_handler": message_handler} if message_handler else {}
+        async with ClientSession(streams[0], streams[1], **kwargs) as session:
+            initialized = await session.initialize()
+            yield session, initialized
+
+
+@asynccontextmanager
+async def open_session(transport: Transport, message_handler=None):
+    """One-off initialised session, closed on exit"""
+    async with _open_initialized(transport, message_handler) as (session, _):
+        yield session
+
+
+class MCPConnection:
+    """
+    An initialised ClientSession kept open by its own background task.
+    The MCP transports must be entered and exited in the same task, so the
+    task owns them and everyone else just uses `session`.
+    """
+
+    def __init__(self, transport: Transport, message_handler=None):
+        self._transport = transport
+        self._message_handler = message_handler
+        self.session: Optional[ClientSession] = None
+        self.server_info: Optional[types.Implementation] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+        self.calls = 0
+        self.failed = False
+        self.last_used = time.monotonic()
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self) -> None:
+        try:
+            async with _open_initialized(self._transport, self._message_handler) as (session, initialized):
+                self.session = session
+                self.server_info = initialized.serverInfo
+                self._ready.set()
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def ping(self, timeout: float = 2.0) -> bool:
+        """Health check: does the server still answer?"""
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            return False
+
+    async def aclose(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            await self._task
+
+
+class SessionUnavailableError(Exception):
+    """No pooled session could be had: none came free in time, or the pool was closed"""
+
+
+class MCPSessionPool:
+    """
+    A fixed number of open sessions to one server. A call checks a session
+    out, uses it and hands it back, so concurrent calls spread across the
+    sessions instead of queueing on one.
+
+    Sessions are kept healthy: one that has been idle longer than
+    `health_check_after` seconds is pinged before it is handed out, and one
+    that raised an error or has served `max_calls` calls is closed and
+    replaced in the background. For stdio that means a fresh server process.
+    """
+
+    def __init__(self, transport: Transport, size: int = 1, shared: bool = False,
+                 max_calls: Optional[int] = None, health_check_after: float = 30.0,
+                 checkout_timeout: float = 10.0):
+        self._transport = transport
+        self.size = size
+        self.shared = shared
+        self.max_calls = max_calls
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+        self._connections: list[MCPConnection] = []
+        # None wakes a waiter when the pool closes
+        self._idle: asyncio.Queue[Optional[MCPConnection]] = asyncio.Queue()
+        self._started = False
+        self._start_lock = asyncio.Lock()
+        self._replacing: set[asyncio.Task] = set()
+        self._in_use = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._recycled = 0
+
+    async def start(self) -> None:
+        async with self._start_lock:
+            if self._started:
+                return
+            connections = [MCPConnection(self._transport) for _ in range(self.size)]
+            await asyncio.gather(*(c.start() for c in connections))
+            for connection in connections:
+                self._connections.append(connection)
+                self._idle.put_nowait(connection)
+            self._started = True
+
+    async def _checkout(self) -> MCPConnection:
+        """
+        An idle, healthy session. Raises SessionUnavailableError if none comes
+        free within checkout_timeout (say the server can't be started and
+        every replacement fails) or the pool is closed meanwhile.
+        """
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            self._waiting += 1
+            try:
+                connection = await asyncio.wait_for(self._idle.get(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise SessionUnavailableError(
+                    f"no bookings server session free within {self.checkout_timeout:.0f}s") from None
+            finally:
+                self._waiting -= 1
+            if connection is None or not self._started:
+                raise SessionUnavailableError("the session pool was closed")
+            if connection.alive and (
+                time.monotonic() - connection.last_used < self.health_check_after
+                or await connection.ping()
+            ):
+                return connection
+            logger.warning("[MCP] Pooled session failed its health check, replacing it")
+            self._replace(connection)
+
+    def _checkin(self, connection: MCPConnection) -> None:
+        connection.calls += 1
+        connection.last_used = time.monotonic()
+        if connection.failed or (self.max_calls and connection.calls >= self.max_calls):
+            self._replace(connection)
+        else:
+            self._idle.put_nowait(connection)
+
+    def _replace(self, connection: MCPConnection) -> None:
+        """Close a session and open its replacement without making anyone wait"""
+        self._recycled += 1
+        task = asyncio.create_task(self._open_replacement(connection))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def _open_replacement(self, old: MCPConnection) -> None:
+        if old in self._connections:
+            self._connections.remove(old)
+        await old.aclose()
+
+        delay = 1.0
+        while self._started:
+            new = MCPConnection(self._transport)
+            try:
+                await new.start()
+            except Exception as e:
+                logger.warning(f"[MCP] Could not open a replacement session ({e}), retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+                continue
+            self._connections.append(new)
+            self._idle.put_nowait(new)
+            return
+
+    @asynccontextmanager
+    async def session(self):
+        await self.start()
+        started = time.perf_counter()
+        connection = await self._checkout()
+        waited = time.perf_counter() - started
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+
+        self._in_use += 1
+        try:
+            yield connection.session
+        except Exception:
+            connection.failed = True
+            raise
+        finally:
+            self._in_use -= 1
+            self._checkin(connection)
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]):
+        async with self.session() as session:
+            return await session.call_tool(name, arguments)
+
+    async def list_tools(self) -> tuple[list[types.Tool], Optional[types.Implementation]]:
+        """The server's tools, and the name and version it reported when the session opened"""
+        await self.start()
+        connection = await self._checkout()
+        try:
+            result = await connection.session.list_tools()
+        except Exception:
+            connection.failed = True
+            raise
+        finally:
+            self._checkin(connection)
+        return result.tools, connection.server_info
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size,
+            "in_use": self._in_use,
+            "idle": self._idle.qsize(),
+            "waiting": self._waiting,
+            "occupancy": self._in_use / self.size,
+            "checkouts": self._checkouts,
+            "mean_wait_ms": self._wait_total / self._checkouts * 1000 if self._checkouts else 0.0,
+            "max_wait_ms": self._wait_max * 1000,
+            "recycled": self._recycled,
+        }
+
+    def load(self) -> tuple[int, int]:
+        """Calls using a session, and calls waiting for one"""
+        return self._in_use, self._waiting
+
+    async def aclose(self) -> None:
+        self._started = False
+        for task in list(self._replacing):
+            task.cancel()
+        await asyncio.gather(*(c.aclose() for c in self._connections), return_exceptions=True)
+        self._connections.clear()
+        # Callers still waiting on the old queue fail rather than wait forever
+        idle, self._idle = self._idle, asyncio.Queue()
+        for _ in range(self._waiting):
+            idle.put_nowait(None)
+
+
+class AvailabilityView:
+    """
+    A local copy of the server's availability calendar (bookings://calendar),
+    kept current by the server's update notifications rather than by polling.
+    Any weekday in the calendar's range that isn't booked is free.
+    """
+
+    def __init__(self, transport: Transport):
+        self._connection = MCPConnection(transport, message_handler=self._on_message)
+        self.start: Optional[date] = None
+        self.end: Optional[date] = None
+        self.booked: set[date] = set()
+        self.version = 0
+        self._reloading: Optional[asyncio.Task] = None
+
+    async def start_watching(self) -> None:
+        await self._connection.start()
+        # Subscribe before reading so no change can slip between the two
+        await self._connection.session.subscribe_resource(CALENDAR_URI)
+        await self._reload()
+
+    async def _reload(self) -> None:
+        result = await self._connection.session.read_resource(CALENDAR_URI)
+        data = json.loads(result.contents[0].text)
+        self.start = date.fromisoformat(data["from"])
+        self.end = date.fromisoformat(data["to"])
+        self.booked = {date.fromisoformat(d) for d in data["booked"]}
+        self.version = data["version"]
+
+    async def _on_message(self, message) -> None:
+        if not isinstance(message, types.ServerNotification):
+            return
+        notification = message.root
+        if not isinstance(notification, types.ResourceUpdatedNotification) or str(notification.params.uri) != CALENDAR_URI:
+            return
+
+        change = notification.params.meta.model_dump() if notification.params.meta else {}
+        if change.get("version") == self.version + 1:
+            self.start = date.fromisoformat(change["from"])
+            self.end = date.fromisoformat(change["to"])
+            self.booked |= {date.fromisoformat(d) for d in change["added"]}
+            self.booked -= {date.fromisoformat(d) for d in change["removed"]}
+            self.version = change["version"]
+        elif self._reloading is None or self._reloading.done():
+            # Missed a change, or the server sent no details: read the whole
+            # calendar. Not awaited here, as this runs on the session's receive loop
+            self._reloading = asyncio.create_task(self._reload())
+
+    @property
+    def ready(self) -> bool:
+        return self.start is not None
+
+    def mark_booked(self, day: date) -> None:
+        """
+        Record a date this process booked, or found already taken. The
+        server that answered may not be the one this view watches, so its
+        notification can't be relied on to arrive.
+        """
+        if self.ready and self.start <= day <= self.end:
+            self.booked.add(day)
+
+    def is_available(self, day: date) -> bool:
+        return self.start <= day <= self.end and day.weekday() < 5 and day not in self.booked
+
+    def next_available(self, after: date, count: int = 1) -> list[date]:
+        """Up to `count` free dates after `after`, within the calendar's range"""
+        found = []
+        day = max(after + timedelta(days=1), self.start)
+        while day <= self.end and len(found) < count:
+            if self.is_available(day):
+                found.append(day)
+            day += timedelta(days=1)
+        return found
+
+    async def aclose(self) -> None:
+        await self._connection.aclose()
+
+
+_availability_view: Optional[AvailabilityView] = None
+
+
+async def get_availability_view() -> AvailabilityView:
+    """The per-process availability calendar, watching the default transport's server"""
+    global _availability_view
+    if _availability_view is None:
+        view = AvailabilityView(default_transport())
+        try:
+            await view.start_watching()
+        except Exception:
+            await view.aclose()
+            raise
+        _availability_view = view
+    return _availability_view
+
+
+def calendar_is_pushed() -> bool:
+    """
+    Whether the watched calendar hears about every booking as it is made:
+    the shared HTTP and in-process servers take them all, while a private
+    stdio server only sees the bookings made through itself, so its
+    calendar is only as fresh as its BOOKINGS_CALENDAR_REFRESH
+    """
+    return default_server_key() != "stdio"
+
+
+def current_availability_view() -> Optional[AvailabilityView]:
+    """The availability calendar if it is being watched yet, without waiting for it"""
+    view = _availability_view
+    return view if view is not None and view.ready else None
+
+
+_encoder = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens the realtime model sees for `text`. Exact when tiktoken and its
+    o200k_base encoding are available, otherwise about four characters a token.
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text))
+    return max(1, round(len(text) / 4))
+
+
+class ResultTokenStats:
+    """Per-tool count of results and the tokens they added to the conversation"""
+
+    def __init__(self):
+        self._tools: dict[str, list[int]] = {}
+
+    def record(self, tool: str, text: str) -> int:
+        tokens = count_tokens(text)
+        calls_and_tokens = self._tools.setdefault(tool, [0, 0])
+        calls_and_tokens[0] += 1
+        calls_and_tokens[1] += tokens
+        return tokens
+
+    def stats(self) -> dict:
+        return {
+            tool: {"calls": calls, "tokens": tokens, "mean_tokens": tokens / calls}
+            for tool, (calls, tokens) in self._tools.items()
+        }
+
+
+result_tokens = ResultTokenStats()
+
+_shared_pools: dict[str, MCPSessionPool] = {}
+
+
+def _get_pool(key: str, transport: Callable[[], Transport], description: str) -> MCPSessionPool:
+    pool = _shared_pools.get(key)
+    if pool is None:
+        size = int(os.getenv("BOOKINGS_MCP_POOL_SIZE", "2"))
+        max_calls = int(os.getenv("BOOKINGS_MCP_RECYCLE_AFTER", "500")) or None
+        checkout_timeout = float(os.getenv("BOOKINGS_MCP_CHECKOUT_TIMEOUT", "10"))
+        pool = MCPSessionPool(transport(), size=size, shared=True, max_calls=max_calls,
+                              checkout_timeout=checkout_timeout)
+        _shared_pools[key] = pool
+        logger.info(f"[MCP] Using {description} ({size} sessions)")
+    return pool
+
+
+def get_shared_pool(url: str) -> MCPSessionPool:
+    """The per-process pool for a shared server, created on first use"""
+    return _get_pool(url, lambda: http_transport(url), f"shared bookings server at {url}")
+
+
+def get_inprocess_pool() -> MCPSessionPool:
+    """The per-process pool for the in-process server, created on first use"""
+    return _get_pool("inprocess", inprocess_transport, "in-process bookings server")
+
+
+def get_stdio_pool() -> MCPSessionPool:
+    """
+    The per-process pool of warm stdio server processes, created on first
+    use. Call `start()` on it ahead of time (e.g. when the worker starts) so
+    no agent waits for a cold server start.
+
+    Each server process has its own result cache, and a booking only
+    invalidates the cache of the server that made it, so a read sent to
+    another server could return the booking state from before it. The
+    pooled servers therefore run with the result cache off; the shared HTTP
+    and in-process servers keep theirs.
+    """
+    return _get_pool("stdio", lambda: stdio_transport(env={"BOOKINGS_CACHE_TTL": "0"}),
+                     "pool of stdio bookings servers")
+
+
+def default_server_key() -> str:
+    """Which server the environment selects: "inprocess", "stdio" or the shared server's URL"""
+    if use_inprocess():
+        return "inprocess"
+    return os.getenv("BOOKINGS_MCP_URL") or "stdio"
+
+
+def get_default_pool() -> MCPSessionPool:
+    """The pool for the transport selected by the environment (see default_transport)"""
+    key = default_server_key()
+    if key == "inprocess":
+        return get_inprocess_pool()
+    return get_stdio_pool() if key == "stdio" else get_shared_pool(key)
+
+
+def schema_hash(tools: list[types.Tool]) -> str:
+    """A short fingerprint of tool definitions; changes whenever a name, description or schema does"""
+    definitions = sorted(
+        (tool.model_dump(mode="json", exclude_none=True) for tool in tools),
+        key=lambda d: d["name"]
+    )
+    return hashlib.sha256(json.dumps(definitions, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _local_server_version() -> str:
+    from bookings_mcp import __version__
+    return __version__
+
+
+class ToolCatalog:
+    """
+    The tool definitions of one server, discovered once per process rather
+    than once per agent.
+
+    `cached()` never waits: it returns what this process already knows, or
+    what an earlier process saved to disk, and starts a background refresh
+    once the definitions are older than `refresh_after` seconds. The disk
+    entry records the server version and schema hash. An entry for a local
+    (stdio or in-process) server is ignored once the server's __version__
+    moves on; a shared server's entry is used until the refresh says
+    otherwise.
+    """
+
+    def __init__(self, key: str, cache_path: Optional[Path], refresh_after: float = 300.0):
+        self.key = key
+        self.cache_path = cache_path
+        self.refresh_after = refresh_after
+        self.tools: Optional[list[types.Tool]] = None
+        self.server_version: Optional[str] = None
+        self.schema_hash: Optional[str] = None
+        self.source: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._disk_checked = False
+        self._refreshing: Optional[asyncio.Task] = None
+
+    def _read_disk(self) -> None:
+        self._disk_checked = True
+        if self.cache_path is None:
+            return
+        try:
+            entry = json.loads(self.cache_path.read_text()).get(self.key)
+        except (OSError, ValueError):
+            return
+        if not entry:
+            return
+        if self.key in ("stdio", "inprocess") and entry.get("server_version") != _local_server_version():
+            logger.info(f"[MCP] Cached tools are for server {entry.get('server_version')}, ignoring them")
+            return
+        try:
+            tools = [types.Tool.model_validate(t) for t in entry["tools"]]
+        except Exception as e:
+            logger.warning(f"[MCP] Could not read cached tools: {e}")
+            return
+        if schema_hash(tools) != entry.get("schema_hash"):
+            return
+        self.tools = tools
+        self.server_version = entry["server_version"]
+        self.schema_hash = entry["schema_hash"]
+        self.source = "disk"
+        # Due a refresh as soon as there's a loop to run it on
+        self._loaded_at = None
+
+    def _write_disk(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            try:
+                saved = json.loads(self.cache_path.read_text())
+            except (OSError, ValueError):
+                saved = {}
+            saved[self.key] = {
+                "server_version": self.server_version,
+                "schema_hash": self.schema_hash,
+                "tools": [t.model_dump(mode="json", exclude_none=True) for t in self.tools],
+            }
+            # Write then rename, so another process never reads half a file
+            partial = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}")
+            partial.write_text(json.dumps(saved))
+            partial.replace(self.cache_path)
+        except OSError as e:
+            logger.warning(f"[MCP] Could not save tool definitions to {self.cache_path}: {e}")
+
+    @property
+    def stale(self) -> bool:
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_after
+
+    def cached(self) -> Optional[list[types.Tool]]:
+        """The tool definitions if known, without waiting; None if they have never been discovered"""
+        if self.tools is None and not self._disk_checked:
+            self._read_disk()
+        if self.stale:
+            self.refresh_in_background()
+        return self.tools
+
+    async def get(self) -> list[types.Tool]:
+        """The tool definitions, discovering them first if nothing is cached"""
+        tools = self.cached()
+        if tools is None:
+            if self._refreshing is not None and not self._refreshing.done():
+                await asyncio.shield(self._refreshing)
+            if self.tools is None:
+                await self.refresh()
+            tools = self.tools
+        return tools
+
+    def refresh_in_background(self) -> None:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.create_task(self._refresh_quietly())
+
+    async def _refresh_quietly(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.warning(f"[MCP] Tool discovery failed: {e}")
+
+    async def refresh(self) -> list[types.Tool]:
+        """Ask the server for its tools through the process-wide pool"""
+        started = time.perf_counter()
+        tools, server_info = await get_default_pool().list_tools()
+        self._store(tools, server_info.version if server_info else None, "server")
+        logger.info(f"[MCP] Discovered {len(tools)} tools in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return tools
+
+    def discover_blocking(self) -> list[types.Tool]:
+        """Discover over a one-off session, for callers with no event loop running"""
+        async def discover():
+            async with _open_initialized(default_transport()) as (session, initialized):
+                return (await session.list_tools()).tools, initialized.serverInfo.version
+
+        tools, version = asyncio.run(discover())
+        self._store(tools, version, "server")
+        return tools
+
+    def _store(self, tools: list[types.Tool], server_version: Optional[str], source: str) -> None:
+        new_hash = schema_hash(tools)
+        changed = new_hash != self.schema_hash or server_version != self.server_version
+        if self.schema_hash is not None and new_hash != self.schema_hash:
+            logger.info(f"[MCP] Tool schemas changed ({self.schema_hash} -> {new_hash}); new agents get the new tools")
+        self.tools = tools
+        self.server_version = server_version
+        self.schema_hash = new_hash
+        self.source = source
+        self._loaded_at = time.monotonic()
+        if changed:
+            self._write_disk()
+
+
+_tool_catalogs: dict[str, ToolCatalog] = {}
+
+
+def get_tool_catalog() -> ToolCatalog:
+    """The per-process tool catalog for the server selected by the environment"""
+    key = default_server_key()
+    catalog = _tool_catalogs.get(key)
+    if catalog is None:
+        setting = os.getenv("BOOKINGS_MCP_TOOL_CACHE", "")
+        if setting.lower() == "off":
+            cache_path = None
+        else:
+            cache_path = Path(setting) if setting else Path(tempfile.gettempdir()) / "bookings-mcp-tools.json"
+        refresh_after = float(os.getenv("BOOKINGS_MCP_TOOLS_REFRESH", "300"))
+        catalog = _tool_catalogs[key] = ToolCatalog(key, cache_path, refresh_after)
+    return catalog
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Step 10 runs on top of Step 7: its own modules first, then Step 7's
+STEP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEP_7_DIR = os.path.join(os.path.dirname(STEP_DIR), "Step 7")
+for path in (STEP_7_DIR, STEP_DIR):
+    if path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
@@ -0,0 +1,44 @@
+from datetime import date
+
+from mcpClient import AvailabilityView, calendar_is_pushed
+
+
+def view_of(start: date, end: date, booked=()) -> AvailabilityView:
+    view = AvailabilityView(transport=None)
+    view.start, view.end, view.booked = start, end, set(booked)
+    return view
+
+
+def test_not_ready_until_loaded():
+    assert not AvailabilityView(transport=None).ready
+
+
+def test_next_available_skips_weekends_and_booked_days():
+    # Monday 4 to Friday 15 November 2030
+    view = view_of(date(2030, 11, 4), date(2030, 11, 15), booked=[date(2030, 11, 5)])
+    assert view.next_available(date(2030, 11, 4), count=3) == [date(2030, 11, 6), date(2030, 11, 7), date(2030, 11, 8)]
+    assert view.next_available(date(2030, 11, 8)) == [date(2030, 11, 11)]
+
+
+def test_nothing_past_the_end_of_the_range():
+    view = view_of(date(2030, 11, 4), date(2030, 11, 8))
+    assert view.next_available(date(2030, 11, 8)) == []
+
+
+def test_mark_booked_within_the_range_only():
+    view = view_of(date(2030, 11, 4), date(2030, 11, 8))
+    view.mark_booked(date(2030, 11, 5))
+    view.mark_booked(date(2030, 12, 2))
+    assert view.booked == {date(2030, 11, 5)}
+    assert view.next_available(date(2030, 11, 4)) == [date(2030, 11, 6)]
+
+
+def test_only_pushed_calendars_are_watched(monkeypatch):
+    monkeypatch.delenv("BOOKINGS_MCP_TRANSPORT", raising=False)
+    monkeypatch.delenv("BOOKINGS_MCP_URL", raising=False)
+    assert not calendar_is_pushed()
+    monkeypatch.setenv("BOOKINGS_MCP_URL", "http://127.0.0.1:8765/mcp/")
+    assert calendar_is_pushed()
+    monkeypatch.delenv("BOOKINGS_MCP_URL")
+    monkeypatch.setenv("BOOKINGS_MCP_TRANSPORT", "inprocess")
+    assert calendar_is_pushed()
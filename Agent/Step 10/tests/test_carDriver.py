@@ -0,0 +1,9 @@
+from OEDatabaseDriver import ENDPOINT_LIMITS, OEDatabaseDriver
+
+
+def test_driver_only_calls_the_car_service():
+    # Bookings go through the MCP server in this step
+    assert list(ENDPOINT_LIMITS) == ["carService", "carService/regs"]
+    for method in ("get_booking", "save_booking", "get_next_available_booking"):
+        assert not hasattr(OEDatabaseDriver, method)
+    assert list(OEDatabaseDriver().stats()) == list(ENDPOINT_LIMITS)
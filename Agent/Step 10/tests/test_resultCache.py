@@ -0,0 +1,57 @@
+import time
+
+from bookings_mcp.cache import ResultCache
+
+
+def test_arguments_are_normalised():
+    cache = ResultCache()
+    cache.put("get_booking", {"reg": "ab12 cde"}, "booked")
+    assert cache.get("get_booking", {"reg": "AB12CDE"})[0] == "booked"
+    assert cache.get("get_booking", {"reg": "XY34ZZZ"}) is None
+
+
+def test_entries_expire(monkeypatch):
+    cache = ResultCache(ttl=30)
+    cache.put("get_booking", {"reg": "AB12CDE"}, "booked")
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert cache.get("get_booking", {"reg": "AB12CDE"}) is None
+
+
+def test_zero_ttl_caches_nothing():
+    cache = ResultCache(ttl=0)
+    cache.put("get_booking", {"reg": "AB12CDE"}, "booked")
+    assert cache.get("get_booking", {"reg": "AB12CDE"}) is None
+
+
+def test_invalidate_drops_only_tagged_entries():
+    cache = ResultCache()
+    cache.put("get_booking", {"reg": "AB12CDE"}, "none", tags=[("reg", "AB12CDE")])
+    cache.put("get_booking", {"reg": "XY34ZZZ"}, "none", tags=[("reg", "XY34ZZZ")])
+    cache.put("get_next_available_booking_date", {"earliest_date": "2030-11-01"}, "2030-11-06",
+              tags=[("date", "2030-11-06")])
+
+    assert cache.invalidate(("reg", "AB12CDE"), ("date", "2030-11-06")) == 2
+    assert cache.get("get_booking", {"reg": "AB12CDE"}) is None
+    assert cache.get("get_next_available_booking_date", {"earliest_date": "2030-11-01"}) is None
+    assert cache.get("get_booking", {"reg": "XY34ZZZ"}) is not None
+
+
+def test_read_started_before_a_write_is_not_stored():
+    cache = ResultCache()
+    token = cache.token()
+    # A booking lands while the read is waiting on PASOE
+    cache.invalidate(("reg", "AB12CDE"))
+    cache.put("get_booking", {"reg": "AB12CDE"}, "none", tags=[("reg", "AB12CDE")], token=token)
+    assert cache.get("get_booking", {"reg": "AB12CDE"}) is None
+
+    cache.put("get_booking", {"reg": "AB12CDE"}, "booked", tags=[("reg", "AB12CDE")], token=cache.token())
+    assert cache.get("get_booking", {"reg": "AB12CDE"})[0] == "booked"
+
+
+def test_oldest_entries_are_evicted():
+    cache = ResultCache(max_entries=2)
+    for reg in ("AA11AAA", "BB22BBB", "CC33CCC"):
+        cache.put("get_booking", {"reg": reg}, reg)
+    assert cache.get("get_booking", {"reg": "AA11AAA"}) is None
+    assert cache.get("get_booking", {"reg": "CC33CCC"})[0] == "CC33CCC"
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from mcpClient import MCPSessionPool, SessionUnavailableError
+
+
+def started_pool(checkout_timeout: float) -> MCPSessionPool:
+    # Started, but every session failed and no replacement could be opened
+    pool = MCPSessionPool(transport=None, checkout_timeout=checkout_timeout)
+    pool._started = True
+    return pool
+
+
+def test_checkout_gives_up_after_the_timeout():
+    pool = started_pool(0.05)
+    with pytest.raises(SessionUnavailableError):
+        asyncio.run(pool.call_tool("get_booking", {"reg": "AB12CDE"}))
+    assert pool.load() == (0, 0)
+
+
+def test_closing_the_pool_wakes_waiting_calls():
+    async def run():
+        pool = started_pool(30)
+        waiting = asyncio.create_task(pool.call_tool("get_booking", {"reg": "AB12CDE"}))
+        await asyncio.sleep(0.01)
+        assert pool.load() == (0, 1)
+        await pool.aclose()
+        with pytest.raises(SessionUnavailableError):
+            await asyncio.wait_for(waiting, 1)
+
+    asyncio.run(run())
@@ -0,0 +1,23 @@
+import json
+
+from bookings_mcp.metrics import BUCKETS, Histogram, ToolMetrics
+
+
+def test_quantile_is_a_bucket_bound():
+    histogram = Histogram()
+    for seconds in (0.003, 0.004, 0.2, 0.3):
+        histogram.observe(seconds)
+    assert histogram.quantile(0.5) == 0.005
+    assert histogram.quantile(0.95) == 0.5
+    assert Histogram().quantile(0.5) is None
+
+
+def test_overflow_is_reported_as_null():
+    histogram = Histogram()
+    histogram.observe(BUCKETS[-1] + 5)
+    assert histogram.quantile(0.5) is None
+
+    metrics = ToolMetrics()
+    metrics._observe("get_booking", "total", BUCKETS[-1] + 5)
+    snapshot = json.loads(json.dumps(metrics.snapshot(), allow_nan=False))
+    assert snapshot["tools"]["get_booking"]["phases_ms"]["total"]["p95"] is None
@@ -28,6 +28,14 @@ class Car:
     year: int
 
 class OEDatabaseDriver:
+    def __init__(self):
+        # One pooled session, so calls reuse a warm connection to PASOE
+        self.session = requests.Session()
+
+    def prewarm(self) -> None:
+        """Open the pooled connection to PASOE ahead of the first customer (no car has a blank reg)"""
+        self.get_car("")
+
     def save_car(self, reg: str, make: str, model: str, year: int) -> bool:
         """
         Calls the car service API to save a car.
@@ -55,7 +63,7 @@ class OEDatabaseDriver:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload, headers=headers)
 
             if response.status_code == 200:
                 if response.text.strip().upper() == "OK":
@@ -86,7 +94,7 @@ class OEDatabaseDriver:
         headers = {"Accept": "application/json"}
 
         try:
-            r = requests.get(url, params={"reg": reg}, headers=headers, timeout=10)
+            r = self.session.get(url, params={"reg": reg}, headers=headers, timeout=10)
 
             if r.status_code == 200:
                 # Body is a single car object
@@ -2,13 +2,31 @@ from dotenv import load_dotenv
 from livekit import agents
 from livekit.agents import AgentSession
 from prompts import WELCOME_MESSAGE
-from agent import Assistant
+from agent import Assistant, driver
 from livekit.plugins import (
     openai
 )
+import logging
+import time
 
 load_dotenv(".env", override=True)
 
+logger = logging.getLogger("user-data")
+logger.setLevel(logging.INFO)
+
+def prewarm(proc: agents.JobProcess):
+    """
+    Runs once in each worker process before it is given a job, so the first
+    customer doesn't pay for opening the connection to PASOE
+    """
+    started = time.perf_counter()
+    try:
+        driver.prewarm()
+    except Exception as e:
+        logger.warning("prewarm failed: %s", e)
+    proc.userdata["prewarm_ms"] = round((time.perf_counter() - started) * 1000)
+    logger.info("prewarm took %d ms", proc.userdata["prewarm_ms"])
+
 async def entrypoint(ctx: agents.JobContext):
     session = AgentSession(
         llm=openai.realtime.RealtimeModel(
@@ -29,4 +47,4 @@ async def entrypoint(ctx: agents.JobContext):
     )
 
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm))
\ No newline at end of file
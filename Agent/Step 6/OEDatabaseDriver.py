@@ -37,6 +37,14 @@ class Booking:
     description: str
 
 class OEDatabaseDriver:
+    def __init__(self):
+        # One pooled session, so calls reuse a warm connection to PASOE
+        self.session = requests.Session()
+
+    def prewarm(self) -> None:
+        """Open the pooled connection to PASOE ahead of the first customer (no car has a blank reg)"""
+        self.get_car("")
+
     def save_car(self, reg: str, make: str, model: str, year: int) -> bool:
         """
         Calls the car service API to save a car.
@@ -64,7 +72,7 @@ class OEDatabaseDriver:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self.session.post(url, json=payload, headers=headers)
 
             if response.status_code == 200:
                 if response.text.strip().upper() == "OK":
@@ -95,7 +103,7 @@ class OEDatabaseDriver:
         headers = {"Accept": "application/json"}
 
         try:
-            r = requests.get(url, params={"reg": reg}, headers=headers, timeout=10)
+            r = self.session.get(url, params={"reg": reg}, headers=headers, timeout=10)
 
             if r.status_code == 200:
                 # Body is a single car object
@@ -134,7 +142,7 @@ class OEDatabaseDriver:
         formatted_date = start_date.strftime("%d-%m-%Y")
 
         try:
-            r = requests.get(url, params={"startDate": formatted_date}, headers={"Accept": "application/json"}, timeout=10)
+            r = self.session.get(url, params={"startDate": formatted_date}, headers={"Accept": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 data = r.json()
@@ -166,7 +174,7 @@ class OEDatabaseDriver:
         }
 
         try:
-            r = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=10)
+            r = self.session.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 return r.text.strip().upper() == "OK"
@@ -191,7 +199,7 @@ class OEDatabaseDriver:
         url = f"{BASE_URL}booking/getbooking"
 
         try:
-            r = requests.get(url, params={"reg": reg}, headers={"Accept": "application/json"}, timeout=10)
+            r = self.session.get(url, params={"reg": reg}, headers={"Accept": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 data = r.json()
@@ -1,19 +1,16 @@
 from dotenv import load_dotenv
 import os
 import requests
+import threading
+import time
+from collections import deque
 from dataclasses import dataclass
 from typing import Optional
 from datetime import date, datetime
 
+# Load environment variables from .env, once
 load_dotenv(".env", override=True)
 
-import os
-import requests
-from dotenv import load_dotenv
-
-# Load environment variables from .env
-load_dotenv()
-
 BASE_URL = os.getenv("OE_SERVICE_URL")
 
 @dataclass
@@ -23,6 +20,9 @@ class Car:
         self.make = make
         self.model = model
         self.year = year
+        # Tool results for the rest of the call (see toolMemo.py); not a
+        # field, so asdict() and comparisons leave it out
+        self.tool_results: dict = {}
     reg: str
     make: str
     model: str
@@ -36,7 +36,229 @@ class Booking:
     booking_date: date
     description: str
 
+class ServiceUnavailableError(Exception):
+    """
+    Raised instead of calling PASOE when an endpoint is known to be failing
+    (its circuit breaker is open) or is already at its concurrency limit.
+    Agents catch this and tell the customer straight away rather than waiting
+    on a timeout.
+    """
+    def __init__(self, endpoint: str, reason: str, retry_after: float = 0.0):
+        super().__init__(f"{endpoint} unavailable: {reason}")
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(ServiceUnavailableError):
+    pass
+
+
+class BulkheadFullError(ServiceUnavailableError):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker over a rolling window of calls.
+
+    The breaker opens when, over the last `window` calls (and at least
+    `min_calls`), the share of failures reaches `error_rate` or the share of
+    calls slower than `slow_call_seconds` reaches `slow_rate`. While open every
+    call is rejected immediately. After `open_seconds` up to
+    `half_open_calls` trial calls are let through; if they all succeed the
+    breaker closes again, otherwise it re-opens.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint: str, window: int = 20, min_calls: int = 5, error_rate: float = 0.5,
+                 slow_call_seconds: float = 3.0, slow_rate: float = 0.5, open_seconds: float = 15.0,
+                 half_open_calls: int = 1):
+        self.endpoint = endpoint
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self.state = self.CLOSED
+        self._results: deque[tuple[bool, bool]] = deque(maxlen=window)  # (failed, slow)
+        self._opened_at = 0.0
+        self._trials = 0
+        # Bumped on every change of state, so late outcomes can be told apart
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> int:
+        """
+        Raise CircuitOpenError if the call should not be attempted. Otherwise
+        return a token to pass to record() or cancel(): an outcome is only
+        counted in the state the call was let through in.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self._generation
+
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    raise CircuitOpenError(self.endpoint, "circuit open", retry_after=remaining)
+                self._move_to(self.HALF_OPEN)
+                self._trials = 0
+
+            if self._trials >= self.half_open_calls:
+                raise CircuitOpenError(self.endpoint, "circuit half-open, trial call in progress")
+            self._trials += 1
+            return self._generation
+
+    def record(self, token: int, failed: bool, elapsed: float) -> None:
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if token != self._generation:
+                # Let through before the breaker last changed state
+                return
+
+            if self.state == self.HALF_OPEN:
+                if failed or slow:
+                    self._open()
+                else:
+                    self._trials -= 1
+                    if self._trials <= 0:
+                        self._move_to(self.CLOSED)
+                return
+
+            self._results.append((failed, slow))
+            calls = len(self._results)
+            if calls < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._results if f)
+            slow_calls = sum(1 for _, s in self._results if s)
+            if failures / calls >= self.error_rate or slow_calls / calls >= self.slow_rate:
+                self._open()
+
+    def cancel(self, token: int) -> None:
+        """Hand back a half-open trial slot for a call that was never made"""
+        with self._lock:
+            if token == self._generation and self.state == self.HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def _open(self) -> None:
+        if self.state == self.OPEN:
+            return
+        print(f"Circuit breaker for {self.endpoint} opened")
+        self._move_to(self.OPEN)
+        self._opened_at = time.monotonic()
+
+    def _move_to(self, state: str) -> None:
+        self.state = state
+        self._generation += 1
+        self._results.clear()
+
+
+class Bulkhead:
+    """
+    Per-endpoint isolation: a dedicated connection pool and a cap on
+    concurrent calls, so a backed-up endpoint cannot use up the connections
+    or threads another endpoint needs.
+    """
+    def __init__(self, endpoint: str, max_connections: int = 4, max_concurrent: int = 4, max_wait: float = 0.5):
+        self.endpoint = endpoint
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=max_connections, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.max_wait)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        if not acquired:
+            raise BulkheadFullError(self.endpoint, f"{self.max_concurrent} calls already in flight")
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+# Connection and concurrency limits for each PASOE endpoint the driver calls
+ENDPOINT_LIMITS = {
+    "carService":         {"max_connections": 4, "max_concurrent": 4},
+    "carService/regs":    {"max_connections": 1, "max_concurrent": 1},
+    "booking":            {"max_connections": 2, "max_concurrent": 2},
+    "booking/next":       {"max_connections": 2, "max_concurrent": 2},
+    "booking/getbooking": {"max_connections": 4, "max_concurrent": 4},
+}
+
+# Breaker settings that differ from the defaults for an endpoint. Listing
+# every reg is expected to take a while, so only failures count against it
+ENDPOINT_BREAKERS = {
+    "carService/regs": {"slow_call_seconds": 30.0},
+}
+
+
 class OEDatabaseDriver:
+    def __init__(self, endpoint_limits: Optional[dict] = None, **breaker_options):
+        limits = endpoint_limits or ENDPOINT_LIMITS
+        self._bulkheads = {name: Bulkhead(name, **opts) for name, opts in limits.items()}
+        self._breakers = {name: CircuitBreaker(name, **{**breaker_options, **ENDPOINT_BREAKERS.get(name, {})})
+                          for name in limits}
+
+    def _request(self, endpoint: str, method: str, **kwargs) -> requests.Response:
+        """
+        Call a PASOE endpoint through its circuit breaker and bulkhead.
+        Raises ServiceUnavailableError without touching the network when the
+        endpoint is open or saturated; other request errors are raised as normal.
+        """
+        breaker = self._breakers[endpoint]
+        bulkhead = self._bulkheads[endpoint]
+
+        token = breaker.allow()
+        try:
+            bulkhead.acquire()
+        except BulkheadFullError:
+            breaker.cancel(token)
+            raise
+
+        started = time.monotonic()
+        failed = True
+        try:
+            response = bulkhead.session.request(method, f"{BASE_URL}{endpoint}", **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            breaker.record(token, failed=failed, elapsed=time.monotonic() - started)
+            bulkhead.release()
+
+    def stats(self) -> dict:
+        """Breaker state and in-flight calls for each endpoint"""
+        return {
+            name: {"state": self._breakers[name].state, "in_flight": bulkhead.in_flight}
+            for name, bulkhead in self._bulkheads.items()
+        }
+
+    def load(self) -> tuple[int, int]:
+        """Calls in flight, and calls waiting for a slot, across every endpoint"""
+        bulkheads = self._bulkheads.values()
+        return sum(b.in_flight for b in bulkheads), sum(b.waiting for b in bulkheads)
+
     def save_car(self, reg: str, make: str, model: str, year: int) -> bool:
         """
         Calls the car service API to save a car.
@@ -50,8 +272,6 @@ class OEDatabaseDriver:
         Returns:
             bool: True if save was successful, False otherwise
         """
-        url = f"{BASE_URL}carService"
-
         payload = {
             "reg": reg,
             "make": make,
@@ -64,7 +284,7 @@ class OEDatabaseDriver:
         }
 
         try:
-            response = requests.post(url, json=payload, headers=headers)
+            response = self._request("carService", "POST", json=payload, headers=headers, timeout=10)
 
             if response.status_code == 200:
                 if response.text.strip().upper() == "OK":
@@ -91,11 +311,10 @@ class OEDatabaseDriver:
         Look up a car by registration.
         Returns a Car if found, otherwise None.
         """
-        url = f"{BASE_URL}carService"
         headers = {"Accept": "application/json"}
 
         try:
-            r = requests.get(url, params={"reg": reg}, headers=headers, timeout=10)
+            r = self._request("carService", "GET", params={"reg": reg}, headers=headers, timeout=10)
 
             if r.status_code == 200:
                 # Body is a single car object
@@ -125,16 +344,40 @@ class OEDatabaseDriver:
             return None
 
 
+    def get_all_regs(self) -> Optional[list[str]]:
+        """
+        GET  {BASE_URL}carService/regs
+        200 -> {"Regs":["AB12CDE", ...]}
+        Returns None if the list couldn't be fetched.
+        """
+        headers = {"Accept": "application/json"}
+
+        try:
+            r = self._request("carService/regs", "GET", headers=headers, timeout=30)
+
+            if r.status_code == 200:
+                try:
+                    return [str(reg) for reg in r.json().get("Regs", [])]
+                except (ValueError, AttributeError):
+                    print(f"Unexpected response: {r.text}")
+                    return None
+
+            print(f"Unexpected status {r.status_code}: {r.text}")
+            return None
+
+        except requests.RequestException as e:
+            print(f"Request failed: {e}")
+            return None
+
     def get_next_available_booking(self, start_date: date) -> Optional[date]:
         """
         GET  {BASE_URL}booking/next?startDate=DD-MM-YYYY
         200 -> {"BookingDate":"15-10-2025"}
         """
-        url = f"{BASE_URL}booking/next"
         formatted_date = start_date.strftime("%d-%m-%Y")
 
         try:
-            r = requests.get(url, params={"startDate": formatted_date}, headers={"Accept": "application/json"}, timeout=10)
+            r = self._request("booking/next", "GET", params={"startDate": formatted_date}, headers={"Accept": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 data = r.json()
@@ -158,7 +401,6 @@ class OEDatabaseDriver:
         200 -> "OK"
         409 -> "A booking for the date ... already exists"
         """
-        url = f"{BASE_URL}booking"
         payload = {
             "reg": reg,
             "date": booking_date.strftime("%d-%m-%Y"),
@@ -166,7 +408,7 @@ class OEDatabaseDriver:
         }
 
         try:
-            r = requests.post(url, json=payload, headers={"Content-Type": "application/json"}, timeout=10)
+            r = self._request("booking", "POST", json=payload, headers={"Content-Type": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 return r.text.strip().upper() == "OK"
@@ -188,10 +430,8 @@ class OEDatabaseDriver:
         200 -> {"BookingDate":"DD-MM-YYYY","Description":"..."}
         204/404 -> no content
         """
-        url = f"{BASE_URL}booking/getbooking"
-
         try:
-            r = requests.get(url, params={"reg": reg}, headers={"Accept": "application/json"}, timeout=10)
+            r = self._request("booking/getbooking", "GET", params={"reg": reg}, headers={"Accept": "application/json"}, timeout=10)
 
             if r.status_code == 200:
                 data = r.json()
@@ -1,13 +1,20 @@
 from livekit.agents.llm import function_tool
 from livekit.agents import RunContext
 from livekit.agents import Agent
-from prompts import ACCOUNT_INSTRUCTIONS
-from OEDatabaseDriver import OEDatabaseDriver, Car
+from prompts import ACCOUNT_INSTRUCTIONS, SERVICE_UNAVAILABLE
+from OEDatabaseDriver import OEDatabaseDriver, Car, ServiceUnavailableError
 from typing import Annotated
 from dataclasses import asdict
 from bookingAgent import BookingAssistant
+from regIndex import RegIndex, normalise_spoken_reg, repair_uk_reg
+import asyncio
 import logging
-from livekit.plugins import openai
+import os
+from realtimeHandoff import ACCOUNT_VOICE
+from voiceMode import agent_models, agent_voice
+from fillerSpeech import with_filler
+from workerLoad import add_load_source
+from contextPolicy import handoff_context
 
 
 
@@ -15,34 +22,85 @@ logger = logging.getLogger("user-data")
 logger.setLevel(logging.INFO)
 
 driver = OEDatabaseDriver()
+add_load_source("pasoe account", driver.load)
+
+# Every known reg, for matching regs that speech-to-text got slightly wrong
+reg_index = RegIndex(driver.get_all_regs, refresh_seconds=float(os.getenv("REG_INDEX_REFRESH", "600")))
 
 class AccountAssistant(Agent):
 
+    @staticmethod
+    def prewarm() -> None:
+        """Once per worker process: load the reg index and open the carService connection"""
+        reg_index.load()
+        driver.get_car("")
+
     def __init__(self) -> None:
         super().__init__(
             instructions=ACCOUNT_INSTRUCTIONS,
-            llm=openai.realtime.RealtimeModel(
-                voice="shimmer",
-                temperature=0.8
-            ))
+            # Realtime or STT -> LLM -> TTS, per ACCOUNT_VOICE_MODE / VOICE_MODE
+            **agent_models("account", ACCOUNT_VOICE))
         self.car = Car()
+        self.filler_voice = agent_voice("account", ACCOUNT_VOICE)
+        # Loads in the background; lookups pass regs straight through until it's ready
+        reg_index.refresh_if_stale()
         
     def get_car_str(self):
         car_str = ""
         for field, value in asdict(self.car).items():
             car_str += f"{field}: {value}\n"
         return car_str
+
+    def context_facts(self) -> dict:
+        """What has to survive a handoff or a trimmed conversation"""
+        if not self.car.reg:
+            return {}
+        return {"Registration": self.car.reg, "Make": self.car.make, "Model": self.car.model, "Year": self.car.year}
+
+    def handoff_to_booking(self, prefetched: asyncio.Task) -> BookingAssistant:
+        """The booking agent, starting with as much of this conversation as HANDOFF_CONTEXT allows"""
+        return BookingAssistant(car=self.car, prefetched=prefetched,
+                                chat_ctx=handoff_context(self.chat_ctx, self.context_facts()))
     
+    @staticmethod
+    def misheard(match) -> str:
+        return (f"Car not found under {match.heard}, which may have been misheard. "
+                f"It could be one of: {', '.join(match.candidates)}. "
+                "Read these back to the customer and look up the one they confirm.")
+
     @function_tool
+    @with_filler
     async def lookup_car_by_registration_number_in_database(self, reg: Annotated[str, "Car registration number"]):
         logger.info("lookup car - reg: %s", reg)
-        
-        result = driver.get_car(reg.upper().replace(" ", ""))
-        if result is None:
+        match = reg_index.match(reg)
+        if match.reg is None:
+            logger.info("lookup car - %s not a reg, candidates: %s", match.heard, match.candidates)
+            return self.misheard(match)
+        if match.corrected:
+            logger.info("lookup car - heard %s, repaired to %s", match.heard, match.reg)
+        reg = match.reg
+
+        # Speculatively fetch the booking state while the car is looked up,
+        # so it is ready when the booking agent greets the customer
+        prefetched = BookingAssistant.prefetch(reg)
+        try:
+            result = await asyncio.to_thread(driver.get_car, reg)
+        except ServiceUnavailableError as e:
+            prefetched.cancel()
+            logger.warning("lookup car skipped: %s", e)
+            return SERVICE_UNAVAILABLE
+        if not result:
+            prefetched.cancel()
+            if match.candidates:
+                # Never someone else's car without the customer confirming it
+                logger.info("lookup car - %s not found, candidates: %s", reg, match.candidates)
+                return self.misheard(match)
+            if not match.valid_format:
+                return f"Car not found. {match.heard} does not look like a UK registration, so ask the customer to repeat it."
             return "Car not found"
         
         self.car = result
-        return BookingAssistant(car=self.car), "Transfer to booking agent"
+        return self.handoff_to_booking(prefetched), "Transfer to booking agent"
     
     @function_tool
     async def get_details_of_current_car(self):
@@ -50,6 +108,7 @@ class AccountAssistant(Agent):
         return f"The car details are: {self.get_car_str()}"
     
     @function_tool
+    @with_filler
     async def add_car_details_to_database(
         self, 
         reg: Annotated[str, "The registration number (reg) of the car"],
@@ -57,12 +116,22 @@ class AccountAssistant(Agent):
         model: Annotated[str, "The model of the car"],
         year: Annotated[int, "The year of the car"]
     ):
-        reg = reg.replace(" ", "").upper()
+        reg = normalise_spoken_reg(reg)
+        # Fix letter/digit mix-ups that don't fit any UK format, e.g. AB12C0E
+        reg = next(iter(repair_uk_reg(reg)), reg)
         logger.info("create car - reg: %s, make: %s, model: %s, year: %s", reg, make, model, year)
-        result = driver.save_car(reg, make, model, year)
-        if result is None:
+        prefetched = BookingAssistant.prefetch(reg)
+        try:
+            result = await asyncio.to_thread(driver.save_car, reg, make, model, year)
+        except ServiceUnavailableError as e:
+            prefetched.cancel()
+            logger.warning("create car skipped: %s", e)
+            return SERVICE_UNAVAILABLE
+        if not result:
+            prefetched.cancel()
             return "Failed to create car"
         
         self.car = Car(reg=reg, make=make, model=model, year=year)
-        return BookingAssistant(car=self.car), "Transfer to booking agent"
+        reg_index.add(reg)
+        return self.handoff_to_booking(prefetched), "Transfer to booking agent"
     
\ No newline at end of file
@@ -1,13 +1,19 @@
 from livekit.agents.llm import function_tool
 from livekit.agents import RunContext
 from livekit.agents import Agent, ChatContext
-from prompts import BOOKING_INSTRUCTIONS
-from OEDatabaseDriver import OEDatabaseDriver, Car, Booking
-from typing import Annotated
+from prompts import BOOKING_INSTRUCTIONS, SERVICE_UNAVAILABLE
+from OEDatabaseDriver import OEDatabaseDriver, Car, Booking, ServiceUnavailableError
+from typing import Annotated, Optional
 from dataclasses import asdict
 from datetime import date, datetime
+import asyncio
 import logging
-from livekit.plugins import openai
+import time
+from realtimeHandoff import BOOKING_VOICE
+from voiceMode import agent_models, agent_voice
+from fillerSpeech import with_filler
+from toolMemo import forget, memoised
+from workerLoad import add_load_source
 
 
 
@@ -15,17 +21,58 @@ logger = logging.getLogger("user-data")
 logger.setLevel(logging.INFO)
 
 driver = OEDatabaseDriver()
+add_load_source("pasoe booking", driver.load)
+
+
+async def fetch_booking_state(reg: str) -> tuple:
+    """
+    The car's booking and the next available date, fetched side by side.
+    Each is either a value or the exception raised fetching it; the next
+    available date is only needed when there is no booking.
+    """
+    return tuple(await asyncio.gather(
+        asyncio.to_thread(driver.get_booking, reg),
+        asyncio.to_thread(driver.get_next_available_booking, date.today()),
+        return_exceptions=True
+    ))
+
 
 class BookingAssistant(Agent):
 
-    def __init__(self, car: Car) -> None:
+    @staticmethod
+    def prewarm() -> None:
+        """Once per worker process: open the connections the greeting will use"""
+        driver.get_next_available_booking(date.today())
+        driver.get_booking("")
+
+    @staticmethod
+    async def prewarm_job() -> None:
+        """Once per job, on its event loop. Nothing to do here: the driver's connections belong to the process"""
+
+    @staticmethod
+    def prefetch(reg: str) -> asyncio.Task:
+        """
+        Start fetching the booking state for a reg in the background, so it
+        is ready by the time the agent greets the customer. Cancel the task
+        if the car turns out not to exist.
+        """
+        task = asyncio.create_task(fetch_booking_state(reg.upper().replace(" ", "")))
+        # Never leave an unread exception behind if the handoff doesn't happen
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    def __init__(self, car: Car, prefetched: Optional[asyncio.Task] = None,
+                 chat_ctx: Optional[ChatContext] = None) -> None:
         self.car = car
+        self._prefetched = prefetched
+        # The booking as last seen, for context_facts
+        self.booking: Optional[str] = None
+        self.filler_voice = agent_voice("booking", BOOKING_VOICE)
         super().__init__(
             instructions=BOOKING_INSTRUCTIONS,
-            llm=openai.realtime.RealtimeModel(
-                voice="echo",
-                temperature=0.8
-            )
+            chat_ctx=chat_ctx,
+            # Realtime or STT -> LLM -> TTS, per BOOKING_VOICE_MODE / VOICE_MODE
+            **agent_models("booking", BOOKING_VOICE)
         )
 
     def get_car_str(self):
@@ -33,6 +80,11 @@ class BookingAssistant(Agent):
         for field, value in asdict(self.car).items():
             car_str += f"{field}: {value}\n"
         return car_str
+
+    def context_facts(self) -> dict:
+        """What has to survive a trimmed conversation"""
+        return {"Registration": self.car.reg, "Make": self.car.make, "Model": self.car.model,
+                "Year": self.car.year, "Booking": self.booking}
     
     def date_to_long_string(self, d: date) -> str:
         day = d.day
@@ -44,8 +96,42 @@ class BookingAssistant(Agent):
         return f"{day}{suffix} {d.strftime('%B %Y')}"
     
     async def on_enter(self) -> None:
-        booking = driver.get_booking(self.car.reg.upper().replace(" ", ""))
+        # The session's car is now this one, with nothing remembered yet
+        self.session.userdata = self.car
+        try:
+            await self._greet()
+        except ServiceUnavailableError as e:
+            logger.warning("booking lookup skipped: %s", e)
+            await self.session.generate_reply(
+                instructions=f"""Always speak English unless the customer speaks another language or asks you to use another language. Tell the customer you have the following details of their car: 
+                            Registration: {self.car.reg}, 
+                            Make: {self.car.make},
+                            Model: {self.car.model},
+                            Year: {self.car.year}.
+                    {SERVICE_UNAVAILABLE}""")
+
+    async def _booking_state(self) -> tuple[Optional[Booking], Optional[date]]:
+        """The booking and next available date, from the prefetch if the account agent started one"""
+        started = time.perf_counter()
+        if self._prefetched is not None:
+            booking, next_date = await self._prefetched
+            self._prefetched = None
+            source = "prefetched"
+        else:
+            booking, next_date = await fetch_booking_state(self.car.reg.upper().replace(" ", ""))
+            source = "fetched"
+        logger.info("booking state %s, waited %.0f ms", source, (time.perf_counter() - started) * 1000)
+
+        if isinstance(booking, Exception):
+            raise booking
+        if booking is None and isinstance(next_date, Exception):
+            raise next_date
+        return booking, next_date
+
+    async def _greet(self) -> None:
+        booking, next_date = await self._booking_state()
         if booking is not None:
+            self.booking = f"{self.date_to_long_string(booking.booking_date)}: {booking.description}"
             await self.session.generate_reply(
                 instructions=
                     f"""Always speak English unless the customer speaks another language or asks you to use another language. Tell the customer you have the following details of their car: 
@@ -56,7 +142,8 @@ class BookingAssistant(Agent):
                     Also tell them they have an existing booking on {self.date_to_long_string(booking.booking_date)} with description: {booking.description}.
                     Tell them they have a existing booking on {self.date_to_long_string(booking.booking_date)} with description: {booking.description}.""")
         else:
-            next_booking_date = self.date_to_long_string(driver.get_next_available_booking(date.today()))
+            self.booking = "none"
+            next_booking_date = self.date_to_long_string(next_date)
             await self.session.generate_reply(
                 instructions=
                     f"""Always speak English unless the customer speaks another language or asks you to use another language. Tell the customer you have the following details of their car: 
@@ -68,6 +155,7 @@ class BookingAssistant(Agent):
 
 
     @function_tool
+    @memoised
     async def get_car_details(self):
         logger.info("get car details")
         return f"The car details are: {self.get_car_str()}"
@@ -79,24 +167,48 @@ class BookingAssistant(Agent):
         return f"The date today is {date_str}"
     
     @function_tool
+    @memoised(shared=True)
+    @with_filler
     async def get_next_available_booking_date(self, earliest_date: Annotated[date, "Earliest date for booking"]):
         logger.info("lookup next available booking slot")
-        date_str = self.date_to_long_string(driver.get_next_available_booking(earliest_date))
+        try:
+            next_date = await asyncio.to_thread(driver.get_next_available_booking, earliest_date)
+        except ServiceUnavailableError as e:
+            logger.warning("lookup next available booking slot skipped: %s", e)
+            return SERVICE_UNAVAILABLE
+        date_str = self.date_to_long_string(next_date)
         return f"The next available booking date is {date_str}"
     
-    @function_tool 
+    @function_tool
+    @with_filler
     async def book_appointment(self, date: Annotated[date, "Date for the appointment"], description: Annotated[str, "Description of the appointment"]):
         logger.info("booking appointment")
-        if driver.save_booking(self.car.reg.upper().replace(" ", ""), date, description):
+        try:
+            saved = await asyncio.to_thread(driver.save_booking, self.car.reg.upper().replace(" ", ""), date, description)
+        except ServiceUnavailableError as e:
+            logger.warning("booking appointment skipped: %s", e)
+            return SERVICE_UNAVAILABLE
+        finally:
+            # Booked or not, the available dates remembered may no longer be
+            forget(self.session)
+        if saved:
+            self.booking = f"{self.date_to_long_string(date)}: {description}"
             return f"Appointment booked for {self.date_to_long_string(date)} with description: {description}"
         else:
             return "Failed to book appointment, please try again later"
         
     @function_tool
+    @memoised
+    @with_filler
     async def get_booking(self):
         logger.info("get next appointment")
-        booking = driver.get_booking(self.car.reg.upper().replace(" ", ""))
+        try:
+            booking = await asyncio.to_thread(driver.get_booking, self.car.reg.upper().replace(" ", ""))
+        except ServiceUnavailableError as e:
+            logger.warning("get next appointment skipped: %s", e)
+            return SERVICE_UNAVAILABLE
         if booking is None:
             return "No appointment found"
         else:
+            self.booking = f"{self.date_to_long_string(booking.booking_date)}: {booking.description}"
             return f"Next appointment is on {self.date_to_long_string(booking.booking_date)} with description: {booking.description}"
@@ -0,0 +1,195 @@
+"""
+How much of the conversation each agent carries.
+
+On handoff, HANDOFF_CONTEXT decides what the booking agent inherits from the
+account agent:
+
+  summary  (default) one message with the key facts (reg, car, booking) and
+           the customer's last few remarks
+  last     the last HANDOFF_CONTEXT_TURNS messages (default 6)
+  full     every message so far
+
+The account agent's tool calls are never carried over, as the booking agent
+doesn't have those tools.
+
+During the call, ContextBudget keeps each agent's conversation under
+CONTEXT_TOKEN_BUDGET tokens (default 3000, 0 to turn off). After every reply
+the oldest turns are dropped until it fits, and the key facts are kept in a
+summary message at the top, so the prompt for each turn stays about the
+same size however long the call goes on. Tokens are estimated at four
+characters each, which is close enough to budget with.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Optional
+
+from livekit.agents import ChatContext
+from livekit.agents.llm import ChatMessage
+
+logger = logging.getLogger("user-data")
+
+HANDOFF_MODES = ("summary", "last", "full")
+CHARS_PER_TOKEN = 4
+# Roles, separators and so on around each item
+TOKENS_PER_ITEM = 4
+SUMMARY_REMARKS = 3
+REMARK_CHARS = 160
+
+
+def handoff_mode() -> str:
+    mode = os.getenv("HANDOFF_CONTEXT", "summary").lower()
+    if mode not in HANDOFF_MODES:
+        logger.warning("unknown HANDOFF_CONTEXT %s, using summary", mode)
+        return "summary"
+    return mode
+
+
+def token_budget() -> int:
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+def estimate_tokens(item) -> int:
+    if item.type == "message":
+        text = item.text_content or ""
+    elif item.type == "function_call":
+        text = item.name + item.arguments
+    elif item.type == "function_call_output":
+        text = item.output
+    else:
+        return 0
+    return TOKENS_PER_ITEM + (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def context_tokens(chat_ctx: ChatContext) -> int:
+    return sum(estimate_tokens(item) for item in chat_ctx.items)
+
+
+def is_summary(item) -> bool:
+    return item.type == "message" and item.extra.get("is_summary") is True
+
+
+def is_conversation(item) -> bool:
+    """A user or assistant message, or a tool call and its output"""
+    if item.type == "message":
+        return item.role in ("user", "assistant") and not is_summary(item)
+    return item.type in ("function_call", "function_call_output")
+
+
+def summary_message(facts: dict[str, Any], remarks: Optional[list[str]] = None) -> ChatMessage:
+    """The key facts, and optionally what the customer said, as one message"""
+    lines = ["Summary of the call so far."]
+    lines += [f"{name}: {value}" for name, value in facts.items() if value not in (None, "")]
+    if remarks:
+        lines.append("The customer said:")
+        lines += [f'- "{remark}"' for remark in remarks]
+    # The same marker LiveKit puts on its own summaries
+    return ChatMessage(role="assistant", content=["\n".join(lines)], extra={"is_summary": True})
+
+
+def customer_remarks(chat_ctx: ChatContext, count: int = SUMMARY_REMARKS) -> list[str]:
+    """The customer's last few messages, clipped"""
+    remarks = []
+    for item in reversed(chat_ctx.items):
+        if item.type == "message" and item.role == "user" and (text := (item.text_content or "").strip()):
+            remarks.append(text if len(text) <= REMARK_CHARS else text[:REMARK_CHARS - 3] + "...")
+            if len(remarks) == count:
+                break
+    return list(reversed(remarks))
+
+
+def handoff_context(chat_ctx: ChatContext, facts: dict[str, Any], mode: Optional[str] = None) -> ChatContext:
+    """The conversation the next agent starts with, per HANDOFF_CONTEXT, within the token budget"""
+    mode = mode or handoff_mode()
+    messages = chat_ctx.copy(
+        exclude_function_call=True,
+        exclude_instructions=True,
+        exclude_empty_message=True,
+        exclude_handoff=True,
+        exclude_config_update=True,
+    )
+    messages.items = [item for item in messages.items if is_conversation(item)]
+
+    if mode == "summary":
+        carried = ChatContext([summary_message(facts, customer_remarks(messages))])
+    elif mode == "last":
+        turns = int(os.getenv("HANDOFF_CONTEXT_TURNS", "6"))
+        carried = ChatContext(messages.items[-turns:] if turns > 0 else [])
+    else:
+        carried = messages
+
+    trimmed = trim_to_budget(carried, token_budget(), facts)
+    carried = trimmed or carried
+    logger.info("handoff context (%s): %d of %d messages, about %d tokens",
+                mode, len(carried.items), len(messages.items), context_tokens(carried))
+    return carried
+
+
+def trim_to_budget(chat_ctx: ChatContext, budget: int, facts: Optional[dict[str, Any]] = None) -> Optional[ChatContext]:
+    """
+    A copy of the conversation with the oldest turns dropped to fit the
+    budget, or None if it already fits. Instructions stay where they are;
+    the facts replace any earlier summary at the top of the conversation.
+    The latest message is always kept.
+    """
+    if budget <= 0 or context_tokens(chat_ctx) <= budget:
+        return None
+
+    kept = [item for item in chat_ctx.items if not is_conversation(item) and not is_summary(item)]
+    turns = [item for item in chat_ctx.items if is_conversation(item)]
+    summary = summary_message(facts) if facts else next((item for item in chat_ctx.items if is_summary(item)), None)
+
+    used = sum(estimate_tokens(item) for item in kept)
+    if summary is not None:
+        used += estimate_tokens(summary)
+    start = len(turns)
+    while start > 0 and (start == len(turns) or used + estimate_tokens(turns[start - 1]) <= budget):
+        start -= 1
+        used += estimate_tokens(turns[start])
+    # A tool output can't come before its call
+    while start < len(turns) - 1 and turns[start].type == "function_call_output":
+        start += 1
+
+    items = kept + ([summary] if summary is not None else []) + turns[start:]
+    return ChatContext(items)
+
+
+class ContextBudget:
+    """
+    Trims the current agent's conversation to CONTEXT_TOKEN_BUDGET after
+    each reply. Agents can define context_facts() to say what must survive
+    the trim.
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = token_budget() if budget is None else budget
+        self._session = None
+        self._trimming: Optional[asyncio.Task] = None
+
+    def attach(self, session) -> None:
+        if self.budget <= 0:
+            return
+        self._session = session
+        session.on("conversation_item_added", self._on_conversation_item_added)
+
+    def _on_conversation_item_added(self, ev) -> None:
+        item = ev.item
+        if item.type != "message" or item.role != "assistant" or is_summary(item):
+            return
+        if self._trimming is None or self._trimming.done():
+            self._trimming = asyncio.create_task(self._trim(self._session.current_agent))
+
+    async def _trim(self, agent) -> None:
+        before, items = context_tokens(agent.chat_ctx), len(agent.chat_ctx.items)
+        facts = agent.context_facts() if hasattr(agent, "context_facts") else None
+        trimmed = trim_to_budget(agent.chat_ctx, self.budget, facts)
+        if trimmed is None:
+            return
+        try:
+            await agent.update_chat_ctx(trimmed)
+        except Exception as e:
+            logger.warning("context trim failed: %s", e)
+            return
+        logger.info("context trimmed to the budget: %d -> %d tokens (%d -> %d items)",
+                    before, context_tokens(trimmed), items, len(trimmed.items))
@@ -0,0 +1,153 @@
+"""
+Holding phrases for slow tool calls.
+
+A tool that waits on PASOE (or the MCP server) for more than a second or so
+leaves the caller listening to silence, and they tend to start talking over
+the agent. run_with_filler (or the with_filler decorator on a tool) runs the
+tool's work and, if it hasn't finished after FILLER_AFTER seconds (default
+1.0, 0 turns fillers off), plays a short holding phrase while it carries on.
+The tool's result is returned unchanged once it's ready. Agents with no
+voice (text chat) never play one.
+
+The phrases are synthesised once per worker process, in each agent's voice,
+by prepare_fillers(), so playing one costs no model round trip. Until they
+are ready an agent with a TTS (pipeline mode) speaks the phrase through it;
+otherwise the filler is skipped rather than asking the realtime model for
+another turn while the tool is still running.
+
+Every wrapped call is recorded in tool_timings: how long the tool took and
+whether a filler was played.
+"""
+
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import time
+from typing import Any, Awaitable, Optional
+
+from livekit import rtc
+from livekit.agents.utils import is_given
+
+logger = logging.getLogger("user-data")
+
+HOLDING_PHRASES = [
+    "One moment, I'm just checking that for you.",
+    "Bear with me a second.",
+    "Just a moment while I look that up.",
+]
+
+# Synthesised phrases, per voice
+_phrase_audio: dict[tuple[str, str], list[rtc.AudioFrame]] = {}
+_next_phrase = itertools.cycle(HOLDING_PHRASES)
+
+
+def filler_after() -> float:
+    return float(os.getenv("FILLER_AFTER", "1.0"))
+
+
+class ToolTimings:
+    """How long each tool took, and how often a filler had to cover for it"""
+
+    def __init__(self):
+        self._tools: dict[str, dict[str, Any]] = {}
+
+    def record(self, tool: str, elapsed_ms: float, filler: bool) -> None:
+        stats = self._tools.setdefault(tool, {"calls": 0, "fillers": 0, "total_ms": 0.0, "max_ms": 0.0})
+        stats["calls"] += 1
+        stats["fillers"] += int(filler)
+        stats["total_ms"] += elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        return {
+            tool: {
+                "calls": stats["calls"],
+                "fillers": stats["fillers"],
+                "avg_ms": round(stats["total_ms"] / stats["calls"]),
+                "max_ms": round(stats["max_ms"]),
+            }
+            for tool, stats in self._tools.items()
+        }
+
+
+tool_timings = ToolTimings()
+
+
+async def prepare_fillers(voices: list[str]) -> None:
+    """Synthesise the holding phrases in each voice, once per process"""
+    # The TTS client is only needed here
+    from livekit.plugins import openai
+
+    started = time.perf_counter()
+    for voice in voices:
+        tts = openai.TTS(voice=voice)
+        try:
+            for phrase in HOLDING_PHRASES:
+                if (voice, phrase) in _phrase_audio:
+                    continue
+                _phrase_audio[(voice, phrase)] = [event.frame async for event in tts.synthesize(phrase)]
+        finally:
+            await tts.aclose()
+    logger.info("filler phrases ready in %.0f ms", (time.perf_counter() - started) * 1000)
+
+
+async def _replay(frames: list[rtc.AudioFrame]):
+    for frame in frames:
+        yield frame
+
+
+def _has_tts(session) -> bool:
+    agent_tts = session.current_agent.tts
+    return (agent_tts if is_given(agent_tts) else session.tts) is not None
+
+
+def speak_filler(session, voice: str) -> bool:
+    """Play a holding phrase; False if there's no way to say one without a model turn"""
+    phrase = next(_next_phrase)
+    frames = _phrase_audio.get((voice, phrase))
+    # A holding phrase isn't part of the conversation
+    if frames is not None:
+        session.say(phrase, audio=_replay(frames), add_to_chat_ctx=False)
+    elif _has_tts(session):
+        session.say(phrase, add_to_chat_ctx=False)
+    else:
+        return False
+    return True
+
+
+async def run_with_filler(session, tool: str, work: Awaitable, voice: Optional[str],
+                          threshold: Optional[float] = None) -> Any:
+    """Await a tool's work, playing a holding phrase if it takes longer than the threshold"""
+    threshold = filler_after() if threshold is None else threshold
+    started = time.perf_counter()
+    task = asyncio.ensure_future(work)
+    filler = False
+    try:
+        if threshold > 0 and voice is not None:
+            done, _ = await asyncio.wait({task}, timeout=threshold)
+            if not done:
+                try:
+                    filler = speak_filler(session, voice)
+                except Exception as e:
+                    logger.warning("filler for %s failed: %s", tool, e)
+        return await task
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        tool_timings.record(tool, elapsed_ms, filler)
+        logger.info("tool %s took %.0f ms%s", tool, elapsed_ms, " (filler played)" if filler else "")
+
+
+def with_filler(tool):
+    """
+    Wrap an agent's tool method in run_with_filler, in the agent's
+    filler_voice. Goes under @function_tool.
+    """
+    @functools.wraps(tool)
+    async def wrapper(self, *args, **kwargs):
+        return await run_with_filler(self.session, tool.__name__, tool(self, *args, **kwargs), self.filler_voice)
+    return wrapper
@@ -1,19 +1,91 @@
+import startupProfile
+# Before anything else is imported, so STARTUP_PROFILE=1 can time the imports
+startupProfile.start("main.py")
+
 from dotenv import load_dotenv
 from livekit import agents
 from livekit.agents import AgentSession
 from prompts import WELCOME_MESSAGE
 from accountAgent import AccountAssistant
+from bookingAgent import BookingAssistant
 from OEDatabaseDriver import Car
+from realtimeHandoff import ACCOUNT_VOICE, BOOKING_VOICE, HandoffTimer, session_llm
+import voiceMode
+from contextPolicy import ContextBudget
+from fillerSpeech import prepare_fillers, tool_timings
+from workerLoad import report_job_load, worker_options
+import asyncio
+import logging
+import time
+
+startupProfile.mark("imports")
 
 load_dotenv(".env", override=True)
 
+logger = logging.getLogger("user-data")
+logger.setLevel(logging.INFO)
+
+
+def prewarm(proc: agents.JobProcess):
+    """
+    Runs once in each worker process before it is given a job, so the first
+    customer doesn't pay for opening connections or loading the reg index
+    """
+    started = time.perf_counter()
+    timings = {}
+    stages = (("account", AccountAssistant.prewarm), ("booking", BookingAssistant.prewarm), ("voice", voiceMode.prewarm))
+    for name, warm in stages:
+        stage_started = time.perf_counter()
+        try:
+            warm()
+        except Exception as e:
+            logger.warning("prewarm %s failed: %s", name, e)
+        timings[name] = round((time.perf_counter() - stage_started) * 1000)
+
+    proc.userdata["prewarm_ms"] = timings
+    logger.info("prewarm took %.0f ms %s", (time.perf_counter() - started) * 1000, timings)
+    startupProfile.mark("prewarm")
+    startupProfile.report("job process")
+
+
+def log_prewarm_failure(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("job prewarm failed: %s", task.exception())
+
+
+async def log_tool_timings() -> None:
+    logger.info("tool timings: %s", tool_timings.summary())
+
+
 async def entrypoint(ctx: agents.JobContext):
-    session = AgentSession[Car]()
+    startupProfile.mark("job started")
+    # Anything that lives on the job's event loop, started while the account agent talks
+    warming = asyncio.create_task(BookingAssistant.prewarm_job())
+    warming.add_done_callback(log_prewarm_failure)
+    ctx.proc.userdata["prewarm_job"] = warming
+
+    # Holding phrases for slow tools, synthesised once per process
+    fillers = asyncio.create_task(prepare_fillers(sorted({voiceMode.agent_voice("account", ACCOUNT_VOICE),
+                                                     voiceMode.agent_voice("booking", BOOKING_VOICE)})))
+    fillers.add_done_callback(log_prewarm_failure)
+    ctx.proc.userdata["filler_job"] = fillers
+    ctx.add_shutdown_callback(log_tool_timings)
+
+    # Lets the worker count this job's PASOE and MCP calls in its load
+    report_job_load()
+
+    # One realtime model for the whole call if REALTIME_HANDOFF=shared
+    session = AgentSession[Car](llm=session_llm(), userdata=Car())
+    HandoffTimer().attach(session)
+    # Keeps each agent's conversation under CONTEXT_TOKEN_BUDGET
+    ContextBudget().attach(session)
 
     await session.start(
         room=ctx.room,
         agent=AccountAssistant()
     )
+    startupProfile.mark("session started")
+    startupProfile.report("job")
 
     await ctx.connect()
 
@@ -21,5 +93,13 @@ async def entrypoint(ctx: agents.JobContext):
         instructions=WELCOME_MESSAGE
     )
 
+# Heavy libraries the job processes import. On Linux LiveKit imports these once
+# in its forkserver, and every job process starts with them already loaded
+# (any that aren't installed, like mcp before Step 10, are skipped)
+PRELOAD_MODULES = ["requests", "psutil", "jsonschema", "httpx", "mcp"]
+
 if __name__ == "__main__":
-    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint))
\ No newline at end of file
+    startupProfile.report("worker")
+    # Load counts backend calls as well as CPU, so busy workers shed new customers
+    agents.cli.run_app(agents.WorkerOptions(entrypoint_fnc=entrypoint, prewarm_fnc=prewarm,
+                                            preload_modules=PRELOAD_MODULES, **worker_options()))
\ No newline at end of file
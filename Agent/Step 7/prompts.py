@@ -9,6 +9,7 @@ ACCOUNT_INSTRUCTIONS = """
     You goal is to find or create an account on behalf of the customer, then pass the customer to the booking agent.
     Start by asking for the customers car registration number (reg) to lookup their details.
     If the users registration number is in the database, you can answer their questions or direct them to the correct department.
+    If the lookup says the registration number may have been misheard and offers possible matches, read them back to the customer and look up the one they confirm.
     If the users registration number is not in the database, tell the user you are going to create an account for them, ask for the make, model, and year of the car, and create a new car entry in the database.
 """
 
@@ -19,4 +20,9 @@ BOOKING_INSTRUCTIONS = """
     Start by asking the customer if they want to make a new booking, or lookup and existing booking.
     If the user wants to lookup an existing booking, look up the booking and tell them the details.
     If the user wants to make a new booking, let them know the earliest available booking date, ask them for the date and type of booking, and create a new booking in the database.
-"""
\ No newline at end of file
+"""
+
+SERVICE_UNAVAILABLE = """
+    The garage system is not responding right now, so you cannot look this up or save it.
+    Apologise to the customer, explain the system is temporarily unavailable, and offer to take their details so someone can call them back.
+"""
@@ -0,0 +1,100 @@
+"""
+How the account and booking agents share (or don't share) a realtime
+connection, and how long each handoff takes.
+
+REALTIME_HANDOFF=separate (default): each agent builds its own RealtimeModel
+with its own voice, so every handoff closes one realtime session and opens
+another before the new agent can speak.
+
+REALTIME_HANDOFF=shared: one RealtimeModel is set on the AgentSession and the
+agents don't set their own. LiveKit then keeps the realtime session open
+across the handoff and updates its instructions and tools in place. OpenAI
+won't change a session's voice once it has spoken, so the whole call uses
+the account agent's voice.
+
+HandoffTimer logs, for every handoff, the time from the tool that handed
+over finishing to the new agent starting to speak, so the two modes can be
+compared on real calls.
+"""
+
+import logging
+import os
+import time
+from typing import Optional
+
+from livekit.agents import NOT_GIVEN
+from livekit.plugins import openai
+
+logger = logging.getLogger("user-data")
+
+ACCOUNT_VOICE = "shimmer"
+BOOKING_VOICE = "echo"
+
+
+def shared_realtime() -> bool:
+    return os.getenv("REALTIME_HANDOFF", "separate").lower() == "shared"
+
+
+def realtime_model(voice: str) -> openai.realtime.RealtimeModel:
+    return openai.realtime.RealtimeModel(voice=voice, temperature=0.8)
+
+
+def session_llm():
+    """The model for the AgentSession: the shared one, or none if each agent has its own"""
+    return realtime_model(ACCOUNT_VOICE) if shared_realtime() else NOT_GIVEN
+
+
+def spoken_voice(voice: str) -> str:
+    """The voice an agent is actually heard in"""
+    return ACCOUNT_VOICE if shared_realtime() else voice
+
+
+def agent_llm(voice: str):
+    """The model for an agent: its own, or none so it uses the session's"""
+    return NOT_GIVEN if shared_realtime() else realtime_model(voice)
+
+
+class HandoffTimer:
+    """
+    Times each handoff from the moment the handing-over tool finishes to the
+    moment the new agent starts speaking. `swap` is the part before the new
+    agent's activity starts: draining the old agent and, unless the
+    connection is shared, closing its realtime session.
+    """
+
+    def __init__(self):
+        self.mode = "shared" if shared_realtime() else "separate"
+        self.handoffs: list[dict] = []
+        self._tools_finished: Optional[float] = None
+        self._pending: Optional[tuple[float, float, str]] = None
+
+    def attach(self, session) -> None:
+        session.on("function_tools_executed", self._on_function_tools_executed)
+        session.on("conversation_item_added", self._on_conversation_item_added)
+        session.on("agent_state_changed", self._on_agent_state_changed)
+
+    def _on_function_tools_executed(self, ev) -> None:
+        self._tools_finished = time.perf_counter()
+
+    def _on_conversation_item_added(self, ev) -> None:
+        item = ev.item
+        if getattr(item, "type", None) == "agent_handoff" and item.old_agent_id is not None:
+            now = time.perf_counter()
+            self._pending = (self._tools_finished or now, now, item.new_agent_id)
+
+    def _on_agent_state_changed(self, ev) -> None:
+        if ev.new_state != "speaking" or self._pending is None:
+            return
+        started, swapped, agent = self._pending
+        self._pending = None
+        now = time.perf_counter()
+        handoff = {
+            "agent": agent,
+            "realtime": self.mode,
+            "total_ms": round((now - started) * 1000),
+            "swap_ms": round((swapped - started) * 1000),
+            "new_agent_ms": round((now - swapped) * 1000),
+        }
+        self.handoffs.append(handoff)
+        logger.info("handoff to %s (%s realtime): %d ms to first speech (swap %d ms, new agent %d ms)",
+                    agent, self.mode, handoff["total_ms"], handoff["swap_ms"], handoff["new_agent_ms"])
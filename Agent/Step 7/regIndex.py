@@ -0,0 +1,292 @@
+"""
+Registration matching for regs that came through speech-to-text.
+
+A customer saying "AB12 CDE" can reach the agent as "A B 1 2 C D E",
+"AB twelve CDE", "alpha bravo one two charlie delta echo" or "AB12 CDF", and
+O/0, I/1 and S/5 are easily swapped. Three steps turn that into a reg:
+
+  normalise_spoken_reg  spoken words to characters: number words, "double",
+                        the NATO alphabet, spaces and punctuation
+  repair_uk_reg         fixes letter/digit swaps using the UK formats (current
+                        AB12CDE, prefix A123BCD, suffix ABC123D, dateless)
+  RegIndex              finds the known regs close to that (see DeletionIndex)
+                        and ranks them with an edit distance where easily
+                        confused characters cost half as much to swap
+
+RegIndex.match() returns the reg to look up (only ever the heard reg, its
+format repair or an exact known match) and ranked candidates for the agent
+to confirm with the customer if that lookup misses.
+"""
+
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger("user-data")
+
+UK_REG_FORMATS = [
+    re.compile(r"^[A-Z]{2}[0-9]{2}[A-Z]{3}$"),       # current, 2001 on: AB12CDE
+    re.compile(r"^[A-Z][0-9]{1,3}[A-Z]{3}$"),        # prefix, 1983-2001: A123BCD
+    re.compile(r"^[A-Z]{3}[0-9]{1,3}[A-Z]$"),        # suffix, 1963-1983: ABC123D
+    re.compile(r"^[A-Z]{1,3}[0-9]{1,4}$"),           # dateless: ABC1234
+    re.compile(r"^[0-9]{1,4}[A-Z]{1,3}$"),           # dateless, reversed: 1234ABC
+]
+
+NUMBER_WORDS = {
+    "ZERO": 0, "NOUGHT": 0, "ONE": 1, "TWO": 2, "THREE": 3, "FOUR": 4, "FIVE": 5,
+    "SIX": 6, "SEVEN": 7, "EIGHT": 8, "NINE": 9, "TEN": 10, "ELEVEN": 11, "TWELVE": 12,
+    "THIRTEEN": 13, "FOURTEEN": 14, "FIFTEEN": 15, "SIXTEEN": 16, "SEVENTEEN": 17,
+    "EIGHTEEN": 18, "NINETEEN": 19,
+}
+TENS_WORDS = {
+    "TWENTY": 20, "THIRTY": 30, "FORTY": 40, "FIFTY": 50,
+    "SIXTY": 60, "SEVENTY": 70, "EIGHTY": 80, "NINETY": 90,
+}
+NATO_ALPHABET = {
+    "ALPHA": "A", "ALFA": "A", "BRAVO": "B", "CHARLIE": "C", "DELTA": "D", "ECHO": "E",
+    "FOXTROT": "F", "GOLF": "G", "HOTEL": "H", "INDIA": "I", "JULIET": "J", "JULIETT": "J",
+    "KILO": "K", "LIMA": "L", "MIKE": "M", "NOVEMBER": "N", "OSCAR": "O", "PAPA": "P",
+    "QUEBEC": "Q", "ROMEO": "R", "SIERRA": "S", "TANGO": "T", "UNIFORM": "U", "VICTOR": "V",
+    "WHISKEY": "W", "WHISKY": "W", "XRAY": "X", "YANKEE": "Y", "ZULU": "Z",
+}
+REPEAT_WORDS = {"DOUBLE": 2, "TREBLE": 3, "TRIPLE": 3}
+
+# Characters speech-to-text (or the customer) easily swaps. Swapping one of
+# these pairs costs half as much as any other substitution
+CONFUSABLE_PAIRS = [
+    ("O", "0"), ("Q", "0"), ("D", "0"), ("I", "1"), ("L", "1"), ("S", "5"), ("Z", "2"),
+    ("B", "8"), ("G", "6"), ("T", "7"),
+    ("B", "D"), ("B", "P"), ("B", "V"), ("D", "T"), ("P", "T"), ("C", "Z"),
+    ("M", "N"), ("F", "S"), ("A", "8"), ("E", "3"),
+]
+CONFUSABLE = {frozenset(pair) for pair in CONFUSABLE_PAIRS}
+AS_DIGIT = {"O": "0", "Q": "0", "D": "0", "I": "1", "L": "1", "S": "5", "Z": "2", "B": "8", "G": "6", "T": "7"}
+AS_LETTER = {"0": "O", "1": "I", "5": "S", "2": "Z", "8": "B", "6": "G", "7": "T"}
+
+
+def normalise_spoken_reg(text: str) -> str:
+    """
+    Turn a transcribed reg into its characters: "AB twelve CDE" -> "AB12CDE",
+    "double five" -> "55", "alpha bravo" -> "AB"
+    """
+    tokens = re.findall(r"[A-Z0-9]+", text.upper().replace("X-RAY", "XRAY"))
+    out: list[str] = []
+    repeat = 1
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in REPEAT_WORDS:
+            repeat = REPEAT_WORDS[token]
+            i += 1
+            continue
+
+        if token in TENS_WORDS:
+            value = TENS_WORDS[token]
+            if i + 1 < len(tokens) and 0 < NUMBER_WORDS.get(tokens[i + 1], 0) < 10:
+                value += NUMBER_WORDS[tokens[i + 1]]
+                i += 1
+            piece = str(value)
+        elif token == "OH":
+            # A letter or a digit; repair_uk_reg decides from its position
+            piece = "O"
+        elif token in NUMBER_WORDS:
+            piece = str(NUMBER_WORDS[token])
+        elif token in NATO_ALPHABET:
+            piece = NATO_ALPHABET[token]
+        else:
+            piece = token
+
+        out.append(piece * repeat if len(piece) == 1 else piece)
+        repeat = 1
+        i += 1
+    return "".join(out)
+
+
+def is_valid_uk_reg(reg: str) -> bool:
+    return any(pattern.match(reg) for pattern in UK_REG_FORMATS)
+
+
+def repair_uk_reg(reg: str) -> list[str]:
+    """
+    Valid UK regs the given one could be, by swapping confusable letters and
+    digits to fit each format. A reg that is already valid comes first.
+    """
+    repaired = [reg] if is_valid_uk_reg(reg) else []
+    n = len(reg)
+    # Character classes for each position, per format that fits the length
+    shapes = ["LLDDLLL"] if n == 7 else []
+    if 5 <= n <= 7:
+        shapes.append("L" + "D" * (n - 4) + "LLL")
+        shapes.append("LLL" + "D" * (n - 4) + "L")
+    for shape in shapes:
+        chars = []
+        for char, kind in zip(reg, shape):
+            if kind == "D" and not char.isdigit():
+                char = AS_DIGIT.get(char, char)
+            elif kind == "L" and char.isdigit():
+                char = AS_LETTER.get(char, char)
+            chars.append(char)
+        candidate = "".join(chars)
+        if candidate not in repaired and is_valid_uk_reg(candidate):
+            repaired.append(candidate)
+    return repaired
+
+
+def reg_distance(a: str, b: str) -> float:
+    """Edit distance where swapping a confusable pair costs 0.5 and anything else 1"""
+    previous = [float(j) for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [float(i)]
+        for j, cb in enumerate(b, 1):
+            if ca == cb:
+                swap = 0.0
+            elif frozenset((ca, cb)) in CONFUSABLE:
+                swap = 0.5
+            else:
+                swap = 1.0
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + swap))
+        previous = current
+    return previous[-1]
+
+
+def single_deletions(reg: str) -> set[str]:
+    return {reg} | {reg[:i] + reg[i + 1:] for i in range(len(reg))}
+
+
+class DeletionIndex:
+    """
+    Finds stored regs within about one edit of a query (one character
+    swapped, missed or added) by looking up single-character deletions of
+    both, as SymSpell does. A lookup is a handful of dictionary hits however
+    many regs are stored, where comparing against every reg would be
+    thousands of edit distances.
+    """
+
+    def __init__(self):
+        self._by_deletion: dict[str, set[str]] = {}
+
+    def add(self, reg: str) -> None:
+        for key in single_deletions(reg):
+            self._by_deletion.setdefault(key, set()).add(reg)
+
+    def near(self, query: str) -> set[str]:
+        found: set[str] = set()
+        for key in single_deletions(query):
+            found |= self._by_deletion.get(key, set())
+        return found
+
+
+@dataclass
+class RegMatch:
+    heard: str
+    reg: Optional[str] = None
+    candidates: list[str] = field(default_factory=list)
+    valid_format: bool = False
+
+    @property
+    def corrected(self) -> bool:
+        return self.reg is not None and self.reg != self.heard
+
+
+class RegIndex:
+    """
+    The regs of every known car, for resolving a misheard reg without a
+    round trip per guess. Loaded in the background by `loader` and
+    reloaded every `refresh_seconds`; cars added by this process are added
+    straight away with `add`.
+    """
+
+    def __init__(self, loader: Callable[[], Optional[Iterable[str]]], refresh_seconds: float = 600.0,
+                 max_distance: float = 2.0):
+        self._loader = loader
+        self.refresh_seconds = refresh_seconds
+        self.max_distance = max_distance
+        self._index = DeletionIndex()
+        self._regs: set[str] = set()
+        self._loaded_at: Optional[float] = None
+        self._loading = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._regs)
+
+    def refresh_if_stale(self) -> None:
+        """Reload in a background thread if never loaded or older than refresh_seconds"""
+        with self._lock:
+            if self._loading or (self.loaded and time.monotonic() - self._loaded_at < self.refresh_seconds):
+                return
+            self._loading = True
+        threading.Thread(target=self.load, name="reg-index", daemon=True).start()
+
+    def load(self) -> None:
+        """Load the regs now, in this thread"""
+        try:
+            started = time.perf_counter()
+            regs = self._loader()
+            if regs is None:
+                return
+            index = DeletionIndex()
+            known = set()
+            for reg in regs:
+                reg = reg.upper().replace(" ", "")
+                if reg and reg not in known:
+                    known.add(reg)
+                    index.add(reg)
+            with self._lock:
+                self._index, self._regs = index, known
+                self._loaded_at = time.monotonic()
+            logger.info("reg index loaded %d regs in %.0f ms", len(known), (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            logger.warning("reg index load failed: %s", e)
+        finally:
+            self._loading = False
+
+    def add(self, reg: str) -> None:
+        reg = reg.upper().replace(" ", "")
+        with self._lock:
+            if reg not in self._regs:
+                self._regs.add(reg)
+                self._index.add(reg)
+
+    def match(self, heard: str) -> RegMatch:
+        """
+        The reg to look up for what the customer said, and the known regs it
+        could have been misheard from. `reg` is a known reg the heard one
+        (or its format repair) matches exactly, or else the well-formed reg
+        itself, which must still be looked up exactly as the index can be
+        out of date. A different known reg is never chosen on the caller's
+        behalf: when the lookup misses, `candidates` holds the closest known
+        regs, best first, for the customer to confirm. `reg` is None only
+        when what was heard isn't a reg at all but is close to known ones.
+        """
+        reg = normalise_spoken_reg(heard)
+        repairs = repair_uk_reg(reg)
+        result = RegMatch(heard=reg, valid_format=bool(repairs) and repairs[0] == reg)
+
+        if not self.loaded:
+            result.reg = repairs[0] if repairs else reg
+            return result
+
+        for candidate in [reg] + repairs:
+            if candidate in self._regs:
+                result.reg = candidate
+                return result
+
+        # Look near the heard reg and near each format repair of it
+        with self._lock:
+            near = set().union(*(self._index.near(query) for query in {reg, *repairs}))
+        ranked = sorted((reg_distance(reg, known), known) for known in near)
+        result.candidates = [known for distance, known in ranked if distance <= self.max_distance][:5]
+        if repairs:
+            # Not in the index, but it may have been added elsewhere since the last load
+            result.reg = repairs[0]
+        elif not result.candidates:
+            result.reg = reg
+        return result
@@ -0,0 +1,123 @@
+"""
+Where a process's start-up time goes.
+
+Set STARTUP_PROFILE=1 and the worker, every job process and every stdio MCP
+server subprocess log a start-up profile:
+
+  - milestones since the process started (imports done, prewarm done,
+    session started, server ready), the last of which is its time-to-ready
+  - the slowest imports made directly by our code, including everything
+    they imported in turn
+  - the slowest single modules, excluding what they imported
+
+Imports are timed by wrapping __import__, which only happens in profile mode.
+start() must run before the imports to be timed, so it is the first thing
+main.py and the MCP server do. STARTUP_PROFILE_TOP sets how many imports are
+listed (default 12). Only the standard library is used here, so importing
+this module costs nothing worth profiling.
+"""
+
+import builtins
+import logging
+import os
+import sys
+import threading
+import time
+from importlib.util import resolve_name
+from typing import Optional
+
+logger = logging.getLogger("user-data")
+
+ENABLED = os.getenv("STARTUP_PROFILE", "").lower() not in ("", "0", "false", "no", "off")
+
+_original_import = builtins.__import__
+_label = ""
+_started = time.perf_counter()
+_milestones: list[tuple[str, float]] = []
+# Anything not in the standard library or an installed package is our code
+STDLIB_DIR = os.path.dirname(os.__file__)
+# Module -> (imported by our code, time including its own imports, time excluding them)
+_imports: dict[str, tuple[bool, float, float]] = {}
+_local = threading.local()
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    try:
+        module = resolve_name("." * level + name, (globals or {}).get("__package__")) if level else name
+    except (ImportError, ValueError):
+        module = name
+    if module in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        if module in sys.modules and module not in _imports:
+            importer = (globals or {}).get("__file__") or ""
+            ours = bool(importer) and "site-packages" not in importer and not importer.startswith(STDLIB_DIR)
+            _imports[module] = (ours, elapsed, elapsed - children)
+
+
+def _process_age() -> float:
+    """Seconds since this process started, or since start() if that can't be found"""
+    try:
+        import psutil
+        return time.time() - psutil.Process().create_time()
+    except Exception:
+        return time.perf_counter() - _started
+
+
+def start(label: str, configure_logging: bool = False) -> None:
+    """Start timing imports, if STARTUP_PROFILE is set"""
+    global _label, _started
+    if not ENABLED:
+        return
+    _label = label
+    _started = time.perf_counter() - _process_age()
+    builtins.__import__ = _timed_import
+    if configure_logging and not logging.getLogger().handlers:
+        # A process with nowhere to log yet, e.g. the stdio MCP server; stdout is its protocol
+        logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(message)s")
+
+
+def mark(milestone: str) -> None:
+    if ENABLED:
+        _milestones.append((milestone, time.perf_counter()))
+
+
+def report(label: Optional[str] = None) -> None:
+    """Log the milestones so far and the slowest imports, then stop timing imports"""
+    if not ENABLED:
+        return
+    builtins.__import__ = _original_import
+    top = int(os.getenv("STARTUP_PROFILE_TOP", "12"))
+
+    milestones = ", ".join(f"{name} {(at - _started) * 1000:.0f} ms" for name, at in _milestones)
+    lines = [f"startup profile ({label or _label}), since process start: {milestones}"]
+    if not _imports:
+        # Already reported
+        logger.info(lines[0])
+        return
+
+    lines.append(f"  {len(_imports)} modules imported")
+
+    direct = sorted(((inclusive, module) for module, (ours, inclusive, _) in _imports.items() if ours),
+                    reverse=True)
+    lines.append("  slowest imports, with what they imported:")
+    lines += [f"    {inclusive * 1000:7.1f} ms  {module}" for inclusive, module in direct[:top]]
+
+    alone = sorted(((own, module) for module, (_, _, own) in _imports.items()), reverse=True)
+    lines.append("  slowest modules on their own:")
+    lines += [f"    {own * 1000:7.1f} ms  {module}" for own, module in alone[:top]]
+
+    logger.info("\n".join(lines))
+    _imports.clear()
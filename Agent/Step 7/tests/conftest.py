@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The agent's modules import each other by name, as when run from "Agent/Step 7"
+STEP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if STEP_DIR not in sys.path:
+    sys.path.insert(0, STEP_DIR)
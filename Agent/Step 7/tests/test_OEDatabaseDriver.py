@@ -0,0 +1,146 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from OEDatabaseDriver import (Bulkhead, BulkheadFullError, CircuitBreaker, CircuitOpenError,
+                              OEDatabaseDriver)
+
+
+def fail(breaker: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        breaker.record(breaker.allow(), failed=True, elapsed=0.1)
+
+
+def test_breaker_opens_on_error_rate():
+    breaker = CircuitBreaker("carService", min_calls=4, error_rate=0.5)
+    fail(breaker, 3)
+    assert breaker.state == CircuitBreaker.CLOSED
+    fail(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+
+
+def test_breaker_opens_on_slow_calls():
+    breaker = CircuitBreaker("carService", min_calls=2, slow_call_seconds=1.0, slow_rate=0.5)
+    for _ in range(2):
+        breaker.record(breaker.allow(), failed=False, elapsed=2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_trial_closes_or_reopens(monkeypatch):
+    breaker = CircuitBreaker("carService", min_calls=1, open_seconds=15)
+    fail(breaker, 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 16)
+
+    trial = breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial call at a time
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()
+    breaker.record(trial, failed=True, elapsed=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 32)
+    breaker.record(breaker.allow(), failed=False, elapsed=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancel_hands_back_the_trial_slot(monkeypatch):
+    breaker = CircuitBreaker("carService", min_calls=1, open_seconds=15)
+    fail(breaker, 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 16)
+    breaker.cancel(breaker.allow())
+    breaker.allow()
+
+
+def test_late_failures_do_not_extend_the_cool_down(monkeypatch):
+    breaker = CircuitBreaker("carService", min_calls=1, open_seconds=15)
+    in_flight = [breaker.allow() for _ in range(3)]
+    breaker.record(in_flight[0], failed=True, elapsed=0.1)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 10)
+    for token in in_flight[1:]:
+        breaker.record(token, failed=True, elapsed=0.1)
+    # Still half-opens 15 s after it first opened
+    monkeypatch.setattr(time, "monotonic", lambda: now + 16)
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_call_from_before_opening_is_not_a_trial(monkeypatch):
+    breaker = CircuitBreaker("carService", min_calls=1, open_seconds=15)
+    early = breaker.allow()
+    fail(breaker, 1)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 16)
+    breaker.allow()
+    # The call let through while closed finishes during the trial
+    breaker.record(early, failed=False, elapsed=0.1)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_bulkhead_caps_concurrent_calls():
+    bulkhead = Bulkhead("carService", max_concurrent=2, max_wait=0.01)
+    bulkhead.acquire()
+    bulkhead.acquire()
+    assert bulkhead.in_flight == 2
+    with pytest.raises(BulkheadFullError):
+        bulkhead.acquire()
+    assert bulkhead.waiting == 0
+    bulkhead.release()
+    bulkhead.acquire()
+
+
+def test_bulkhead_counts_waiting_calls():
+    bulkhead = Bulkhead("carService", max_concurrent=1, max_wait=1.0)
+    bulkhead.acquire()
+    waiter = threading.Thread(target=bulkhead.acquire)
+    waiter.start()
+    deadline = time.monotonic() + 1.0
+    while bulkhead.waiting == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bulkhead.waiting == 1
+    bulkhead.release()
+    waiter.join()
+    assert (bulkhead.in_flight, bulkhead.waiting) == (1, 0)
+
+
+def test_driver_stops_calling_a_failing_endpoint():
+    driver = OEDatabaseDriver({"carService": {"max_concurrent": 1}}, min_calls=2)
+    calls = []
+
+    def request(method, url, **kwargs):
+        calls.append(url)
+        return SimpleNamespace(status_code=500, text="down")
+
+    driver._bulkheads["carService"].session = SimpleNamespace(request=request)
+    for _ in range(2):
+        driver._request("carService", "GET")
+    assert driver.stats()["carService"] == {"state": CircuitBreaker.OPEN, "in_flight": 0}
+    with pytest.raises(CircuitOpenError):
+        driver._request("carService", "GET")
+    assert len(calls) == 2
+    assert driver.load() == (0, 0)
+
+
+def test_slow_reg_list_does_not_block_car_lookups(monkeypatch):
+    driver = OEDatabaseDriver(min_calls=1)
+    clock = [time.monotonic()]
+    monkeypatch.setattr(time, "monotonic", lambda: clock[0])
+
+    def slow_request(method, url, **kwargs):
+        clock[0] += 10
+        return SimpleNamespace(status_code=200, text="")
+
+    driver._bulkheads["carService/regs"].session = SimpleNamespace(request=slow_request)
+    driver._request("carService/regs", "GET")
+    stats = driver.stats()
+    assert stats["carService/regs"]["state"] == CircuitBreaker.CLOSED
+    assert stats["carService"]["state"] == CircuitBreaker.CLOSED
@@ -0,0 +1,76 @@
+from livekit.agents import ChatContext
+from livekit.agents.llm import ChatMessage, FunctionCall, FunctionCallOutput
+
+from contextPolicy import (context_tokens, estimate_tokens, handoff_context, is_summary, summary_message,
+                           trim_to_budget)
+
+
+def message(role: str, text: str) -> ChatMessage:
+    return ChatMessage(role=role, content=[text])
+
+
+def conversation(turns: int) -> ChatContext:
+    items = [message("system", "You are the booking assistant.")]
+    for i in range(turns):
+        items.append(message("user", f"Question {i} " + "x" * 80))
+        items.append(message("assistant", f"Answer {i} " + "y" * 80))
+    return ChatContext(items)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens(message("user", "abcd" * 10)) == 4 + 10
+    assert estimate_tokens(FunctionCall(call_id="1", name="get_car", arguments="{}")) == 4 + 3
+    assert estimate_tokens(FunctionCallOutput(call_id="1", name="get_car", output="abcde", is_error=False)) == 4 + 2
+
+
+def test_nothing_to_trim_within_budget():
+    chat_ctx = conversation(2)
+    assert trim_to_budget(chat_ctx, context_tokens(chat_ctx)) is None
+    assert trim_to_budget(chat_ctx, 0) is None
+
+
+def test_oldest_turns_are_dropped_behind_a_summary():
+    chat_ctx = conversation(20)
+    trimmed = trim_to_budget(chat_ctx, 300, {"Reg": "AB12CDE", "Booking": None})
+
+    assert context_tokens(trimmed) <= 300
+    system, summary, *turns = trimmed.items
+    assert system.role == "system"
+    assert is_summary(summary)
+    assert "Reg: AB12CDE" in summary.text_content and "Booking" not in summary.text_content
+    # The newest turns survive, in order
+    assert turns == chat_ctx.items[-len(turns):]
+
+
+def test_facts_replace_an_earlier_summary():
+    chat_ctx = conversation(10)
+    chat_ctx.items.insert(1, summary_message({"Reg": "OLD1REG"}))
+    trimmed = trim_to_budget(chat_ctx, 200, {"Reg": "AB12CDE"})
+    summaries = [item for item in trimmed.items if is_summary(item)]
+    assert len(summaries) == 1 and "AB12CDE" in summaries[0].text_content
+
+
+def test_latest_message_is_kept_over_budget():
+    chat_ctx = conversation(1)
+    chat_ctx.items.append(message("user", "z" * 2000))
+    trimmed = trim_to_budget(chat_ctx, 50)
+    assert trimmed.items[-1] is chat_ctx.items[-1]
+
+
+def test_never_starts_with_a_tool_output():
+    items = [message("user", "x" * 400),
+             FunctionCall(call_id="1", name="get_car", arguments='{"reg": "AB12CDE"}' + " " * 40),
+             FunctionCallOutput(call_id="1", name="get_car", output="o" * 40, is_error=False),
+             message("assistant", "Your car is an Audi A4.")]
+    # Room for the output but not its call
+    trimmed = trim_to_budget(ChatContext(items), 30)
+    assert trimmed.items == [items[-1]]
+
+
+def test_handoff_summary_drops_tool_calls():
+    chat_ctx = conversation(3)
+    chat_ctx.items.append(FunctionCall(call_id="1", name="get_car", arguments="{}"))
+    carried = handoff_context(chat_ctx, {"Reg": "AB12CDE"}, mode="summary")
+    [summary] = carried.items
+    assert is_summary(summary)
+    assert "Question 2" in summary.text_content
@@ -0,0 +1,60 @@
+import asyncio
+from types import SimpleNamespace
+
+from livekit.agents import NOT_GIVEN
+
+import fillerSpeech
+
+
+class FakeSession:
+    def __init__(self, tts=None):
+        self.current_agent = SimpleNamespace(tts=NOT_GIVEN)
+        self.tts = tts
+        self.said = []
+
+    def say(self, text, **kwargs):
+        self.said.append((text, kwargs))
+
+    def generate_reply(self, **kwargs):
+        raise AssertionError("a filler must not start a model turn")
+
+
+async def slow(result):
+    await asyncio.sleep(0.05)
+    return result
+
+
+def run(session, voice="alloy"):
+    return asyncio.run(fillerSpeech.run_with_filler(session, "test_tool", slow("done"), voice, threshold=0.01))
+
+
+def test_realtime_agent_skips_filler_until_audio_is_ready(monkeypatch):
+    monkeypatch.setattr(fillerSpeech, "tool_timings", fillerSpeech.ToolTimings())
+    session = FakeSession()
+    assert run(session) == "done"
+    assert session.said == []
+    assert fillerSpeech.tool_timings.summary()["test_tool"]["fillers"] == 0
+
+
+def test_pipeline_agent_says_filler_through_its_tts():
+    session = FakeSession(tts=object())
+    assert run(session) == "done"
+    [(phrase, kwargs)] = session.said
+    assert phrase in fillerSpeech.HOLDING_PHRASES
+    assert kwargs == {"add_to_chat_ctx": False}
+
+
+def test_synthesised_filler_is_replayed(monkeypatch):
+    monkeypatch.setattr(fillerSpeech, "_phrase_audio",
+                        {("alloy", phrase): [] for phrase in fillerSpeech.HOLDING_PHRASES})
+    session = FakeSession()
+    run(session)
+    [(_, kwargs)] = session.said
+    assert "audio" in kwargs and kwargs["add_to_chat_ctx"] is False
+
+
+def test_no_filler_without_a_voice_or_when_fast():
+    session = FakeSession(tts=object())
+    assert run(session, voice=None) == "done"
+    assert asyncio.run(fillerSpeech.run_with_filler(session, "fast_tool", slow("done"), "alloy", threshold=1.0)) == "done"
+    assert session.said == []
@@ -0,0 +1,66 @@
+from regIndex import RegIndex, normalise_spoken_reg, repair_uk_reg
+
+
+def loaded_index(*regs):
+    index = RegIndex(lambda: list(regs))
+    index.load()
+    return index
+
+
+def test_normalise_spoken_reg():
+    assert normalise_spoken_reg("AB twelve CDE") == "AB12CDE"
+    assert normalise_spoken_reg("alpha bravo one two charlie delta echo") == "AB12CDE"
+    assert normalise_spoken_reg("double five") == "55"
+
+
+def test_repair_uk_reg():
+    assert repair_uk_reg("AB12CDE")[0] == "AB12CDE"
+    assert repair_uk_reg("A812C0E")[0] == "AB12COE"
+    assert repair_uk_reg("AB12CDEE") == []
+
+
+def test_known_reg_matches_exactly():
+    match = loaded_index("AB12CDE", "XY34ZZZ").match("ab12 cde")
+    assert match.reg == "AB12CDE"
+    assert match.candidates == []
+
+
+def test_format_repair_of_known_reg():
+    match = loaded_index("AB12COE").match("AB12C0E")
+    assert match.reg == "AB12COE"
+    assert match.corrected
+
+
+def test_unknown_well_formed_reg_is_never_swapped_for_a_known_one():
+    index = loaded_index("AB12CDE", "XY34ZZZ")
+    for heard in ("AB12CDF", "AB12 CDX", "KB12CDE"):
+        match = index.match(heard)
+        # Looked up as heard; the near known reg is only offered for confirmation
+        assert match.reg == heard.replace(" ", "")
+        assert match.candidates == ["AB12CDE"]
+
+
+def test_malformed_reg_close_to_known_ones_asks_for_confirmation():
+    match = loaded_index("AB12CDE").match("AB12CDEE")
+    assert match.reg is None
+    assert match.candidates == ["AB12CDE"]
+    assert not match.valid_format
+
+
+def test_nothing_close_passes_the_reg_through():
+    match = loaded_index("AB12CDE").match("MN99PQR")
+    assert match.reg == "MN99PQR"
+    assert match.candidates == []
+
+
+def test_not_loaded_passes_the_reg_through():
+    index = RegIndex(lambda: ["AB12CDE"])
+    match = index.match("AB12CDF")
+    assert match.reg == "AB12CDF"
+    assert match.candidates == []
+
+
+def test_added_reg_matches_straight_away():
+    index = loaded_index("AB12CDE")
+    index.add("ab12 cdf")
+    assert index.match("AB12CDF").reg == "AB12CDF"
@@ -0,0 +1,83 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import toolMemo
+from OEDatabaseDriver import Car
+from prompts import SERVICE_UNAVAILABLE
+
+
+class NoUserdata:
+    @property
+    def userdata(self):
+        raise ValueError("AgentSession userdata is not set")
+
+
+class FakeAgent:
+    def __init__(self, replies):
+        self.session = SimpleNamespace(userdata=Car(reg="AB12CDE"))
+        self.replies = list(replies)
+        self.calls = []
+
+    @toolMemo.memoised
+    async def get_booking(self, reg: str, detail: bool = False):
+        self.calls.append((reg, detail))
+        return self.replies.pop(0)
+
+    @toolMemo.memoised(shared=True)
+    async def get_next_available_booking_date(self, earliest_date: str):
+        self.calls.append((earliest_date,))
+        return self.replies.pop(0)
+
+
+def test_repeated_call_is_answered_from_the_session():
+    agent = FakeAgent(["Booked for Monday", "unused"])
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "Booked for Monday"
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "Booked for Monday"
+    assert agent.calls == [("AB12CDE", False)]
+
+
+def test_different_arguments_are_remembered_apart():
+    agent = FakeAgent(["one", "two"])
+    asyncio.run(agent.get_booking("AB12CDE"))
+    asyncio.run(agent.get_booking("AB12CDE", detail=True))
+    assert len(agent.calls) == 2
+    assert toolMemo.tool_key("get_booking", (), {"b": 1, "a": 2}) == toolMemo.tool_key("get_booking", (), {"a": 2, "b": 1})
+
+
+def test_service_unavailable_is_not_remembered():
+    agent = FakeAgent([SERVICE_UNAVAILABLE, "Booked for Monday"])
+    assert asyncio.run(agent.get_booking("AB12CDE")) == SERVICE_UNAVAILABLE
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "Booked for Monday"
+
+
+def test_forget_clears_the_car_results():
+    agent = FakeAgent(["before", "after"])
+    asyncio.run(agent.get_booking("AB12CDE"))
+    toolMemo.forget(agent.session)
+    assert agent.session.userdata.tool_results == {}
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "after"
+
+
+def test_disabled_or_without_a_car(monkeypatch):
+    key = toolMemo.tool_key("get_booking", ("AB12CDE",))
+    toolMemo.remember(NoUserdata(), key, "ignored")
+    assert toolMemo.recall(NoUserdata(), key) is None
+
+    monkeypatch.setenv("SESSION_MEMO", "0")
+    agent = FakeAgent(["one", "two"])
+    asyncio.run(agent.get_booking("AB12CDE"))
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "two"
+    assert agent.session.userdata.tool_results == {}
+
+
+def test_shared_state_answers_expire(monkeypatch):
+    monkeypatch.setenv("SESSION_MEMO_SHARED_TTL", "30")
+    agent = FakeAgent(["Monday", "Own booking", "Tuesday", "unused"])
+    assert asyncio.run(agent.get_next_available_booking_date("2030-11-01")) == "Monday"
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "Own booking"
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 31)
+    assert asyncio.run(agent.get_next_available_booking_date("2030-11-01")) == "Tuesday"
+    # Answers about the car itself are kept for the call
+    assert asyncio.run(agent.get_booking("AB12CDE")) == "Own booking"
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Text-only chat with the account and booking agents, for web chat and SMS.
+
+The same agents, tools and prompts as the voice agent (main.py), with a
+text LLM (TEXT_LLM_MODEL, default gpt-4o-mini) and no audio at all: no
+LiveKit room, realtime session, VAD or TTS, and no holding phrases. Each
+conversation is an AgentSession driven one message at a time, and one
+process serves many of them side by side on a single event loop, sharing
+the LLM client, the PASOE connections and (in Step 10) the MCP session pool.
+
+Usage:
+    py textChat.py                          # listens on 127.0.0.1:8080
+    py textChat.py --host 0.0.0.0 --port 8081
+
+    POST /chat  {"conversation": "...", "message": "..."}
+                -> {"conversation": "...", "replies": ["...", ...]}
+
+A conversation id the server hasn't seen (or none, and one is made up)
+starts a new conversation, which gets the welcome message first; an SMS
+gateway can use the sender's number. DELETE /chat/<id> ends one, and
+conversations idle for TEXT_CHAT_IDLE_TIMEOUT seconds (default 900) are
+ended automatically. At TEXT_CHAT_MAX_CONVERSATIONS (default 1000) new
+conversations are turned away with 503. GET /stats reports how many are open.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import time
+import uuid
+from typing import Optional
+
+from aiohttp import web
+from dotenv import load_dotenv
+from livekit.agents import AgentSession
+
+import voiceMode
+from prompts import WELCOME_MESSAGE
+from accountAgent import AccountAssistant
+from bookingAgent import BookingAssistant
+from OEDatabaseDriver import Car
+from contextPolicy import ContextBudget, is_summary
+from fillerSpeech import tool_timings
+
+load_dotenv(".env", override=True)
+
+logger = logging.getLogger("user-data")
+logger.setLevel(logging.INFO)
+
+# Before any agent is created
+voiceMode.use_text_only()
+
+SWEEP_INTERVAL = 60
+
+
+def assistant_replies(items) -> list[str]:
+    return [item.text_content for item in items
+            if item.type == "message" and item.role == "assistant" and not is_summary(item) and item.text_content]
+
+
+class Conversation:
+    """One customer's chat: an AgentSession with no room, starting with the account agent"""
+
+    def __init__(self, conversation_id: str):
+        self.id = conversation_id
+        self.session = AgentSession[Car](userdata=Car())
+        # The session runs one turn at a time
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+        # Replies no request has passed back yet, such as the welcome
+        self.unread: list[str] = []
+
+    async def start(self) -> None:
+        # Keeps each agent's conversation under CONTEXT_TOKEN_BUDGET
+        ContextBudget().attach(self.session)
+        await self.session.start(agent=AccountAssistant())
+        welcome = await self.session.generate_reply(instructions=WELCOME_MESSAGE)
+        self.unread = assistant_replies(welcome.chat_items)
+
+    def take_unread(self) -> list[str]:
+        replies, self.unread = self.unread, []
+        return replies
+
+    async def send(self, message: str) -> list[str]:
+        """The agents' replies to one customer message, including a handoff's greeting"""
+        async with self.lock:
+            self.last_active = time.monotonic()
+            result = await self.session.run(user_input=message)
+            self.last_active = time.monotonic()
+            return assistant_replies(event.item for event in result.events)
+
+    async def aclose(self) -> None:
+        await self.session.aclose()
+
+
+class ChatServer:
+    def __init__(self):
+        self.max_conversations = int(os.getenv("TEXT_CHAT_MAX_CONVERSATIONS", "1000"))
+        self.idle_timeout = float(os.getenv("TEXT_CHAT_IDLE_TIMEOUT", "900"))
+        self.conversations: dict[str, Conversation] = {}
+        self._starting: dict[str, asyncio.Task] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.post("/chat", self.handle_chat),
+            web.delete("/chat/{conversation}", self.handle_end),
+            web.get("/stats", self.handle_stats),
+        ])
+        app.on_startup.append(self.on_startup)
+        app.on_cleanup.append(self.on_cleanup)
+        return app
+
+    async def on_startup(self, app: web.Application) -> None:
+        started = time.perf_counter()
+        # The same warm-up as a voice worker's prewarm and job start
+        for warm in (AccountAssistant.prewarm, BookingAssistant.prewarm):
+            try:
+                await asyncio.to_thread(warm)
+            except Exception as e:
+                logger.warning("prewarm failed: %s", e)
+        try:
+            await BookingAssistant.prewarm_job()
+        except Exception as e:
+            logger.warning("job prewarm failed: %s", e)
+        logger.info("text chat ready in %.0f ms", (time.perf_counter() - started) * 1000)
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+        await asyncio.gather(*(self.end(conversation_id) for conversation_id in list(self.conversations)))
+        logger.info("tool timings: %s", tool_timings.summary())
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            idle = [conversation.id for conversation in self.conversations.values()
+                    if not conversation.lock.locked()
+                    and time.monotonic() - conversation.last_active > self.idle_timeout]
+            for conversation_id in idle:
+                await self.end(conversation_id)
+            if idle:
+                logger.info("ended %d idle conversations, %d open", len(idle), len(self.conversations))
+
+    async def conversation(self, conversation_id: str) -> tuple[Conversation, list[str]]:
+        """The conversation, and the welcome if no request has passed it back yet"""
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            # Two messages arriving at once for a new conversation start it once
+            starting = self._starting.get(conversation_id)
+            if starting is None:
+                if len(self.conversations) + len(self._starting) >= self.max_conversations:
+                    raise web.HTTPServiceUnavailable(text="Too many open conversations, try again later")
+                starting = self._starting[conversation_id] = asyncio.create_task(self._start(conversation_id))
+            # Finishes, and is kept or closed, even if this request is cancelled
+            conversation = await asyncio.shield(starting)
+        return conversation, conversation.take_unread()
+
+    async def _start(self, conversation_id: str) -> Conversation:
+        conversation = Conversation(conversation_id)
+        try:
+            await conversation.start()
+        except BaseException:
+            await conversation.aclose()
+            raise
+        finally:
+            del self._starting[conversation_id]
+        self.conversations[conversation_id] = conversation
+        logger.info("conversation %s started, %d open", conversation_id, len(self.conversations))
+        return conversation
+
+    async def end(self, conversation_id: str) -> bool:
+        conversation = self.conversations.pop(conversation_id, None)
+        if conversation is None:
+            return False
+        try:
+            await conversation.aclose()
+        except Exception as e:
+            logger.warning("closing conversation %s failed: %s", conversation_id, e)
+        return True
+
+    async def handle_chat(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="Expected a JSON body")
+        conversation_id = str(body.get("conversation") or uuid.uuid4())
+        message = (body.get("message") or "").strip()
+
+        started = time.perf_counter()
+        conversation, replies = await self.conversation(conversation_id)
+        if message:
+            replies = replies + await conversation.send(message)
+        logger.info("conversation %s replied in %.0f ms", conversation_id, (time.perf_counter() - started) * 1000)
+        return web.json_response({"conversation": conversation_id, "replies": replies})
+
+    async def handle_end(self, request: web.Request) -> web.Response:
+        if not await self.end(request.match_info["conversation"]):
+            raise web.HTTPNotFound(text="No such conversation")
+        return web.json_response({"ended": True})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "conversations": len(self.conversations),
+            "busy": sum(conversation.lock.locked() for conversation in self.conversations.values()),
+            "max_conversations": self.max_conversations,
+            "tools": tool_timings.summary(),
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Text chat with the account and booking agents")
+    parser.add_argument("--host", default=os.getenv("TEXT_CHAT_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("TEXT_CHAT_PORT", "8080")))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    web.run_app(ChatServer().app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Tool results remembered for the rest of the call.
+
+The model often asks the booking agent the same thing more than once in a
+call: the car's details, its booking, the next available date from the same
+day. Each result is kept on the session's Car (AgentSession[Car].userdata),
+keyed by the tool and its arguments, so a repeated question is answered
+without calling PASOE or the MCP server, or even playing a holding phrase.
+
+Every book_appointment, whether it succeeds or not, forgets everything
+remembered for the car: a success changes the booking and the available
+dates, and a failure usually means another caller has just taken the date.
+The diary is shared with every other caller, so answers read from it
+(memoised with shared=True) are also only kept for SESSION_MEMO_SHARED_TTL
+seconds (default 30). Failures (the service being unavailable, an error
+from the MCP server) are never remembered. SESSION_MEMO=0 turns this off.
+"""
+
+import functools
+import logging
+import os
+import time
+from typing import Any, Optional
+
+from prompts import SERVICE_UNAVAILABLE
+
+logger = logging.getLogger("user-data")
+
+
+def enabled() -> bool:
+    return os.getenv("SESSION_MEMO", "1").lower() not in ("0", "false", "no", "off")
+
+
+def shared_ttl() -> float:
+    """How long to keep an answer read from state other callers can change"""
+    return float(os.getenv("SESSION_MEMO_SHARED_TTL", "30"))
+
+
+def session_results(session) -> Optional[dict]:
+    """The results remembered for the session's car, or None if there's nowhere to keep them"""
+    if not enabled():
+        return None
+    try:
+        car = session.userdata
+    except ValueError:
+        # A session started without a Car
+        return None
+    return getattr(car, "tool_results", None)
+
+
+def tool_key(tool: str, args: tuple = (), kwargs: Optional[dict] = None) -> tuple:
+    return (tool, tuple(args), tuple(sorted((kwargs or {}).items())))
+
+
+def recall(session, key: tuple) -> Optional[Any]:
+    results = session_results(session)
+    if not results or key not in results:
+        return None
+    result, expires = results[key]
+    if expires is not None and time.monotonic() >= expires:
+        del results[key]
+        return None
+    logger.info("tool %s answered from this call's results", key[0])
+    return result
+
+
+def remember(session, key: tuple, result: Any, ttl: Optional[float] = None) -> None:
+    """Keep a result for the rest of the call, or for ttl seconds"""
+    results = session_results(session)
+    if results is not None:
+        results[key] = (result, None if ttl is None else time.monotonic() + ttl)
+
+
+def forget(session) -> None:
+    """After anything that changes the car's bookings"""
+    results = session_results(session)
+    if results:
+        logger.info("forgetting %d remembered tool results", len(results))
+        results.clear()
+
+
+def memoised(tool=None, *, shared: bool = False):
+    """
+    Answer an agent's tool from this call's results when it has been called
+    with the same arguments before. Goes under @function_tool, above
+    @with_filler. @memoised(shared=True) for tools that read the shared
+    diary, whose answers are kept for shared_ttl() seconds only.
+    """
+    if tool is None:
+        return functools.partial(memoised, shared=shared)
+
+    @functools.wraps(tool)
+    async def wrapper(self, *args, **kwargs):
+        key = tool_key(tool.__name__, args, kwargs)
+        result = recall(self.session, key)
+        if result is None:
+            result = await tool(self, *args, **kwargs)
+            if result != SERVICE_UNAVAILABLE:
+                remember(self.session, key, result, ttl=shared_ttl() if shared else None)
+        return result
+    return wrapper
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Voice mode benchmark
+
+Times how long a customer waits for the first audio of the account agent's
+reply, from the moment they stop speaking, in each voice mode (see
+voiceMode.py). Each recording is streamed at real-time pace followed by
+silence, as a caller's microphone would send it. Where the customer stops
+speaking is found once per recording with the Silero VAD, so every mode is
+timed from the same point.
+
+  realtime    the audio goes to an OpenAI realtime session; its server-side
+              turn detection decides when to answer
+  pipeline    the Silero VAD ends the turn, the utterance is transcribed,
+              and after the endpointing delay the LLM is asked for a reply
+              whose first sentence is spoken by TTS
+  preemptive  the same, but the LLM starts on the transcript straight away
+              and its first sentence is held until the endpointing delay is
+              up, as preemptive generation does
+
+The transcript comes from one recognize call, where the agent streams its
+audio to the STT, and the semantic turn detector needs a LiveKit job so
+isn't run here; both make the pipeline rows a little pessimistic.
+
+Recordings are 16-bit PCM WAV files, one customer utterance each.
+
+Usage:
+    py voiceBenchmark.py recordings/*.wav
+    py voiceBenchmark.py recordings/*.wav --runs 3 --modes pipeline preemptive
+"""
+
+import argparse
+import asyncio
+import os
+import re
+import time
+import wave
+
+from dotenv import load_dotenv
+from livekit import rtc
+from livekit.agents import ChatContext, utils
+from livekit.agents.vad import VADEventType
+from livekit.plugins import openai
+
+import voiceMode
+from prompts import ACCOUNT_INSTRUCTIONS
+from realtimeHandoff import ACCOUNT_VOICE
+
+load_dotenv()
+
+MODES = ("realtime", "pipeline", "preemptive")
+FRAME_MS = 20
+# Enough for the realtime model's server VAD to end the turn
+TRAILING_SILENCE = 3.0
+# AgentSession's minimum endpointing delay
+ENDPOINTING_DELAY = 0.5
+REPLY_TIMEOUT = 20.0
+SENTENCE_END = re.compile(r"[.!?](\s|$)")
+
+
+def read_wav(path: str) -> list[rtc.AudioFrame]:
+    """A recording as 20 ms frames"""
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        rate, channels = f.getframerate(), f.getnchannels()
+        data = f.readframes(f.getnframes())
+    per_frame = rate * FRAME_MS // 1000
+    size = per_frame * channels * 2
+    frames = []
+    for offset in range(0, len(data), size):
+        chunk = data[offset:offset + size].ljust(size, b"\0")
+        frames.append(rtc.AudioFrame(chunk, rate, channels, per_frame))
+    return frames
+
+
+def silence(like: rtc.AudioFrame, seconds: float) -> list[rtc.AudioFrame]:
+    count = int(seconds * 1000 / FRAME_MS)
+    size = like.samples_per_channel * like.num_channels * 2
+    return [rtc.AudioFrame(bytes(size), like.sample_rate, like.num_channels, like.samples_per_channel)
+            for _ in range(count)]
+
+
+async def speech_end(vad, frames: list[rtc.AudioFrame]) -> float:
+    """Seconds into the recording where the customer stops speaking"""
+    stream = vad.stream()
+    for frame in frames + silence(frames[0], 1.0):
+        stream.push_frame(frame)
+    stream.end_input()
+    end = len(frames) * FRAME_MS / 1000
+    async for event in stream:
+        if event.type == VADEventType.END_OF_SPEECH:
+            end = event.timestamp - event.silence_duration
+    await stream.aclose()
+    return end
+
+
+async def play(push, frames: list[rtc.AudioFrame], end: float, ended: asyncio.Future) -> None:
+    """Push frames at real-time pace, setting ended when the end of speech goes out"""
+    started = time.perf_counter()
+    for i, frame in enumerate(frames):
+        push(frame)
+        position = (i + 1) * FRAME_MS / 1000
+        if position >= end and not ended.done():
+            ended.set_result(time.perf_counter())
+        await asyncio.sleep(max(0.0, started + position - time.perf_counter()))
+
+
+async def time_realtime(model, frames: list[rtc.AudioFrame], end: float) -> float:
+    session = model.session()
+    await session.update_instructions(ACCOUNT_INSTRUCTIONS)
+    loop = asyncio.get_running_loop()
+    ended, first_audio = loop.create_future(), loop.create_future()
+    drains = []
+
+    async def drain(generation) -> None:
+        async for message in generation.message_stream:
+            async for _ in message.audio_stream:
+                if not first_audio.done():
+                    first_audio.set_result(time.perf_counter())
+
+    session.on("generation_created", lambda ev: drains.append(asyncio.create_task(drain(ev))))
+    player = asyncio.create_task(play(session.push_audio, frames + silence(frames[0], TRAILING_SILENCE), end, ended))
+    try:
+        first = await asyncio.wait_for(first_audio, REPLY_TIMEOUT)
+        return first - await ended
+    finally:
+        player.cancel()
+        for task in drains:
+            task.cancel()
+        await session.aclose()
+
+
+async def first_sentence(llm, transcript: str) -> str:
+    chat_ctx = ChatContext()
+    chat_ctx.add_message(role="system", content=ACCOUNT_INSTRUCTIONS)
+    chat_ctx.add_message(role="user", content=transcript)
+    text = ""
+    async with llm.chat(chat_ctx=chat_ctx) as stream:
+        async for chunk in stream:
+            if chunk.delta and chunk.delta.content:
+                text += chunk.delta.content
+                if SENTENCE_END.search(text):
+                    break
+    return text.strip()
+
+
+async def first_audio(tts, text: str) -> None:
+    async with tts.synthesize(text) as stream:
+        async for _ in stream:
+            return
+
+
+async def time_pipeline(models: dict, frames: list[rtc.AudioFrame], end: float, preemptive: bool) -> float:
+    loop = asyncio.get_running_loop()
+    ended = loop.create_future()
+    vad_stream = models["vad"].stream()
+    player = asyncio.create_task(
+        play(vad_stream.push_frame, frames + silence(frames[0], TRAILING_SILENCE), end, ended))
+
+    async def reply() -> None:
+        async for event in vad_stream:
+            if event.type == VADEventType.END_OF_SPEECH:
+                break
+        # The turn is confirmed once the endpointing delay is up
+        confirmed = time.perf_counter() + ENDPOINTING_DELAY
+        speech = await models["stt"].recognize(event.frames)
+        transcript = speech.alternatives[0].text
+        if not preemptive:
+            await asyncio.sleep(max(0.0, confirmed - time.perf_counter()))
+        sentence = await first_sentence(models["llm"], transcript)
+        await asyncio.sleep(max(0.0, confirmed - time.perf_counter()))
+        await first_audio(models["tts"], sentence)
+
+    try:
+        await asyncio.wait_for(reply(), REPLY_TIMEOUT)
+        return time.perf_counter() - await ended
+    finally:
+        player.cancel()
+        await vad_stream.aclose()
+
+
+def report(label: str, timings: list[float]) -> None:
+    if not timings:
+        print(f"{label:>10}: no replies")
+        return
+    timings = sorted(timings)
+    print(f"{label:>10}: median {timings[len(timings) // 2] * 1000:7.1f} ms, "
+          f"best {timings[0] * 1000:7.1f} ms, worst {timings[-1] * 1000:7.1f} ms "
+          f"over {len(timings)} replies")
+
+
+async def run(paths: list[str], runs: int, modes: list[str]) -> None:
+    vad = voiceMode.load_vad()
+    recordings = []
+    for path in paths:
+        frames = read_wav(path)
+        end = await speech_end(vad, frames)
+        print(f"{os.path.basename(path)}: {len(frames) * FRAME_MS / 1000:.1f} s, speech ends at {end:.2f} s")
+        recordings.append((frames, end))
+
+    timings: dict[str, list[float]] = {mode: [] for mode in modes}
+    async with utils.http_context.open():
+        realtime = openai.realtime.RealtimeModel(voice=ACCOUNT_VOICE)
+        pipeline = {
+            "stt": openai.STT(model=voiceMode.STT_MODEL),
+            "llm": openai.LLM(model=voiceMode.LLM_MODEL),
+            "tts": openai.TTS(model=voiceMode.TTS_MODEL, voice=ACCOUNT_VOICE),
+            "vad": vad,
+        }
+        try:
+            for _ in range(runs):
+                for frames, end in recordings:
+                    for mode in modes:
+                        try:
+                            if mode == "realtime":
+                                elapsed = await time_realtime(realtime, frames, end)
+                            else:
+                                elapsed = await time_pipeline(pipeline, frames, end, mode == "preemptive")
+                        except (asyncio.TimeoutError, TimeoutError):
+                            print(f"{mode}: no reply within {REPLY_TIMEOUT:.0f} s")
+                            continue
+                        timings[mode].append(elapsed)
+        finally:
+            await realtime.aclose()
+
+    print(f"time to first audio after the customer stops speaking ({runs} runs of {len(recordings)} recordings):")
+    for mode in modes:
+        report(mode, timings[mode])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voice mode benchmark")
+    parser.add_argument("recordings", nargs="+", help="WAV files, one customer utterance each")
+    parser.add_argument("--runs", type=int, default=1, help="Times to play each recording")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = parser.parse_args()
+    asyncio.run(run(args.recordings, args.runs, args.modes))
+
+
+if __name__ == "__main__":
+    main()
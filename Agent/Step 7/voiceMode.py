@@ -0,0 +1,143 @@
+"""
+How each agent hears and speaks: the OpenAI realtime model, or a pipeline of
+separate speech-to-text, LLM and text-to-speech models.
+
+VOICE_MODE sets the mode for every agent (default realtime);
+ACCOUNT_VOICE_MODE and BOOKING_VOICE_MODE override it for one agent.
+
+  realtime  one speech-to-speech model (see realtimeHandoff.py)
+  pipeline  streaming STT -> LLM -> TTS, with the Silero VAD, LiveKit's
+            semantic turn detector deciding when the customer has finished,
+            and preemptive generation: the reply starts on the final
+            transcript, before the end of turn is confirmed, and is thrown
+            away if the customer carries on
+
+The pipeline models are PIPELINE_STT_MODEL (default gpt-4o-mini-transcribe),
+PIPELINE_LLM_MODEL (default gpt-4o-mini) and PIPELINE_TTS_MODEL (default
+gpt-4o-mini-tts), speaking in the agent's usual voice. The turn detector's
+model files must be downloaded once with `py main.py download-files`.
+
+voiceBenchmark.py compares the two modes' time to first audio.
+
+textChat.py switches every agent to text (use_text_only): no audio at all,
+just a text LLM (TEXT_LLM_MODEL, default gpt-4o-mini), whose connections
+(up to TEXT_LLM_CONNECTIONS, default 100) every conversation in the process
+shares.
+"""
+
+import logging
+import os
+from typing import Optional
+
+from realtimeHandoff import agent_llm, spoken_voice
+
+logger = logging.getLogger("user-data")
+
+VOICE_MODES = ("realtime", "pipeline")
+
+STT_MODEL = os.getenv("PIPELINE_STT_MODEL", "gpt-4o-mini-transcribe")
+LLM_MODEL = os.getenv("PIPELINE_LLM_MODEL", "gpt-4o-mini")
+TTS_MODEL = os.getenv("PIPELINE_TTS_MODEL", "gpt-4o-mini-tts")
+
+TEXT_MODEL = os.getenv("TEXT_LLM_MODEL", "gpt-4o-mini")
+
+# Loaded once per process, by prewarm if pipeline mode is in use
+_vad = None
+_text_only = False
+_text_client = None
+
+
+def voice_mode(agent: str) -> str:
+    """The mode for an agent ("account" or "booking")"""
+    if _text_only:
+        return "text"
+    mode = os.getenv(f"{agent.upper()}_VOICE_MODE") or os.getenv("VOICE_MODE", "realtime")
+    mode = mode.lower()
+    if mode not in VOICE_MODES:
+        logger.warning("unknown voice mode %s for the %s agent, using realtime", mode, agent)
+        return "realtime"
+    return mode
+
+
+def use_text_only() -> None:
+    """Every agent created from now on chats in text, for textChat.py"""
+    global _text_only
+    _text_only = True
+
+
+def text_llm():
+    """
+    A text LLM for one agent. Every session listens to its agents' LLMs for
+    usage metrics, so a single LLM shared by all the conversations would
+    report each call to every one of them; instead each agent has its own,
+    and they share one HTTP client and its connection pool.
+    """
+    global _text_client
+    import httpx
+    from openai import AsyncClient
+    from livekit.plugins import openai
+
+    if _text_client is None:
+        connections = int(os.getenv("TEXT_LLM_CONNECTIONS", "100"))
+        _text_client = AsyncClient(max_retries=0, http_client=httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=15.0, read=5.0, write=5.0, pool=5.0),
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=connections, max_keepalive_connections=connections,
+                                keepalive_expiry=120),
+        ))
+    return openai.LLM(model=TEXT_MODEL, client=_text_client)
+
+
+def pipeline_in_use() -> bool:
+    return "pipeline" in (voice_mode("account"), voice_mode("booking"))
+
+
+def load_vad():
+    """The Silero VAD, loaded on first use; loading takes a few hundred ms"""
+    global _vad
+    if _vad is None:
+        from livekit.plugins import silero
+        _vad = silero.VAD.load()
+    return _vad
+
+
+def prewarm() -> None:
+    """Once per worker process: load the VAD if any agent uses the pipeline"""
+    if pipeline_in_use():
+        load_vad()
+
+
+def pipeline_models(voice: str) -> dict:
+    """Agent arguments for the STT -> LLM -> TTS pipeline"""
+    from livekit.plugins import openai
+    from livekit.plugins.turn_detector.multilingual import MultilingualModel
+
+    return {
+        "stt": openai.STT(model=STT_MODEL),
+        "llm": openai.LLM(model=LLM_MODEL),
+        "tts": openai.TTS(model=TTS_MODEL, voice=voice),
+        "vad": load_vad(),
+        "turn_handling": {
+            "turn_detection": MultilingualModel(),
+            "preemptive_generation": {"enabled": True},
+        },
+    }
+
+
+def agent_voice(agent: str, voice: str) -> Optional[str]:
+    """The voice an agent is actually heard in, or None in text mode"""
+    mode = voice_mode(agent)
+    if mode == "text":
+        return None
+    return voice if mode == "pipeline" else spoken_voice(voice)
+
+
+def agent_models(agent: str, voice: str) -> dict:
+    """The model arguments for an agent's Agent.__init__, per its voice mode"""
+    mode = voice_mode(agent)
+    if mode == "text":
+        return {"llm": text_llm()}
+    if mode == "pipeline":
+        return pipeline_models(voice)
+    # Its own realtime model, or the session's if REALTIME_HANDOFF=shared
+    return {"llm": agent_llm(voice)}
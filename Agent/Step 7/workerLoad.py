@@ -0,0 +1,200 @@
+"""
+Worker load for LiveKit's job dispatch.
+
+LiveKit's default load is CPU alone, so a worker whose PASOE calls are
+backed up keeps being sent new customers. WorkerLoad also counts the
+backend work the worker's jobs are waiting on. It is the highest of:
+
+  cpu      CPU use, averaged over the last few seconds as LiveKit does
+  backend  PASOE and MCP calls in flight across the worker's jobs, over
+           WORKER_MAX_IN_FLIGHT (default 16)
+  queue    calls waiting for a bulkhead slot or a pooled MCP session, over
+           WORKER_MAX_QUEUED (default 4)
+  memory   the job processes' memory plus room for one more job, over
+           WORKER_MEMORY_MB (default 80% of the machine's memory)
+
+Once the load passes WORKER_LOAD_THRESHOLD (LiveKit's default when unset:
+0.7 in production, off in dev) the worker stops taking new jobs and LiveKit
+sends customers to other workers until it drops back.
+
+Jobs run in their own processes, so each job process reports its figures
+(report_job_load) to a small file the worker reads. Anything with calls to
+count registers itself with add_load_source.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Optional
+
+import psutil
+
+logger = logging.getLogger("user-data")
+
+# Set when the worker starts; job processes inherit it, and so know where to report
+WORKER_PID_ENV = "AGENT_WORKER_PID"
+REPORT_INTERVAL = 1.0
+# A report older than this is from a job process that has gone away
+STALE_AFTER = 5.0
+
+# Name -> function returning (calls in flight, calls waiting)
+LoadSource = Callable[[], tuple[int, int]]
+_sources: dict[str, LoadSource] = {}
+_reporter: Optional[threading.Thread] = None
+
+
+def add_load_source(name: str, source: LoadSource) -> None:
+    _sources[name] = source
+
+
+def _report_dir() -> str:
+    worker_pid = os.environ.setdefault(WORKER_PID_ENV, str(os.getpid()))
+    return os.path.join(tempfile.gettempdir(), "pug-agent-load", worker_pid)
+
+
+def job_load() -> dict:
+    """This process's calls in flight and waiting, and its memory"""
+    in_flight = queued = 0
+    for name, source in list(_sources.items()):
+        try:
+            running, waiting = source()
+        except Exception as e:
+            logger.debug("load source %s failed: %s", name, e)
+            continue
+        in_flight += running
+        queued += waiting
+    return {
+        "pid": os.getpid(),
+        "in_flight": in_flight,
+        "queued": queued,
+        "rss_mb": psutil.Process().memory_info().rss / 1024 / 1024,
+        "at": time.time(),
+    }
+
+
+def _write_report(directory: str) -> None:
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    partial = f"{path}.tmp"
+    with open(partial, "w") as f:
+        json.dump(job_load(), f)
+    os.replace(partial, path)
+
+
+def report_job_load() -> None:
+    """In a job process: report its load to the worker every second, from a background thread"""
+    global _reporter
+    if _reporter is not None:
+        return
+
+    directory = _report_dir()
+    os.makedirs(directory, exist_ok=True)
+
+    def report() -> None:
+        while True:
+            try:
+                _write_report(directory)
+            except Exception as e:
+                logger.warning("job load report failed: %s", e)
+            time.sleep(REPORT_INTERVAL)
+
+    _reporter = threading.Thread(target=report, name="job-load-report", daemon=True)
+    _reporter.start()
+
+
+def read_job_loads() -> list[dict]:
+    """The latest report from each live job process, clearing out reports from dead ones"""
+    directory = _report_dir()
+    reports = []
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return reports
+    for name in names:
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            with open(path) as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if time.time() - report["at"] > STALE_AFTER:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        reports.append(report)
+    return reports
+
+
+class WorkerLoad:
+    """The load function for WorkerOptions; see the module docstring"""
+
+    def __init__(self):
+        # Only the worker needs these, so job processes don't import them
+        from livekit.agents.utils import MovingAverage
+        from livekit.agents.utils.hw import get_cpu_monitor
+
+        self.max_in_flight = int(os.getenv("WORKER_MAX_IN_FLIGHT", "16"))
+        self.max_queued = int(os.getenv("WORKER_MAX_QUEUED", "4"))
+        self.memory_mb = float(os.getenv("WORKER_MEMORY_MB", "0")) or \
+            psutil.virtual_memory().total / 1024 / 1024 * 0.8
+        self.threshold = load_threshold()
+        # Creates the report directory name job processes will inherit
+        self.directory = _report_dir()
+        self.components: dict[str, float] = {}
+        self._draining = False
+
+        self._cpu_monitor = get_cpu_monitor()
+        self._cpu = MovingAverage(5)
+        self._cpu_lock = threading.Lock()
+        threading.Thread(target=self._sample_cpu, name="worker-cpu-load", daemon=True).start()
+
+    def _sample_cpu(self) -> None:
+        while True:
+            cpu = self._cpu_monitor.cpu_percent(interval=0.5)
+            with self._cpu_lock:
+                self._cpu.add_sample(cpu)
+
+    def __call__(self) -> float:
+        reports = read_job_loads()
+        with self._cpu_lock:
+            cpu = self._cpu.get_avg()
+
+        rss = [report["rss_mb"] for report in reports]
+        next_job_mb = sum(rss) / len(rss) if rss else 0.0
+        self.components = {
+            "cpu": cpu,
+            "backend": sum(report["in_flight"] for report in reports) / self.max_in_flight,
+            "queue": sum(report["queued"] for report in reports) / self.max_queued,
+            "memory": (sum(rss) + next_job_mb) / self.memory_mb,
+        }
+        load = min(max(self.components.values()), 1.0)
+
+        if self.threshold is not None and (load >= self.threshold) != self._draining:
+            self._draining = not self._draining
+            if self._draining:
+                logger.info("worker load %.2f over %.2f, not taking new jobs: %s", load, self.threshold, self.rounded())
+            else:
+                logger.info("worker load %.2f back under %.2f, taking jobs again", load, self.threshold)
+        return load
+
+    def rounded(self) -> dict[str, float]:
+        return {name: round(value, 2) for name, value in self.components.items()}
+
+
+def load_threshold() -> Optional[float]:
+    threshold = os.getenv("WORKER_LOAD_THRESHOLD")
+    return float(threshold) if threshold else None
+
+
+def worker_options() -> dict:
+    """load_fnc, and load_threshold if WORKER_LOAD_THRESHOLD is set, for WorkerOptions"""
+    options = {"load_fnc": WorkerLoad()}
+    if (threshold := load_threshold()) is not None:
+        options["load_threshold"] = threshold
+    return options
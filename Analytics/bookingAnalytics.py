@@ -0,0 +1,367 @@
+"""
+Booking utilisation and lead-time analytics.
+
+Pulls every booking (and the cars they belong to) from the PASOE
+booking/export endpoint in one request, loads them into columnar NumPy
+arrays and computes capacity-planning reports in vectorised passes:
+
+    - weekly and monthly occupancy (booked working days / working days;
+      bookings on a weekend take no diary capacity and are left out)
+    - lead-time distribution (days between a booking being made and the appointment)
+    - weekday demand
+    - make / model mix (bookings joined with Car)
+
+Reports can be written out as CSV or Parquet.
+
+Usage:
+    py bookingAnalytics.py --start 01-01-2025 --end 31-12-2025 --out reports
+    py bookingAnalytics.py --synthetic 5000000 --format parquet
+"""
+
+import argparse
+import csv
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import requests
+from dotenv import load_dotenv
+
+load_dotenv(".env", override=True)
+
+BASE_URL = os.getenv("OE_SERVICE_URL")
+
+# The workshop diary takes one booking per working day (see bookingHandler.cls)
+BOOKINGS_PER_DAY = 1
+
+WEEKDAYS = np.array(["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"])
+LEAD_TIME_BINS = np.array([0, 1, 2, 3, 7, 14, 28, 56, 91, 182, 365])
+
+NAT = np.datetime64("NaT", "D")
+
+
+@dataclass
+class BookingColumns:
+    """Bookings and cars held column by column rather than as one object per row"""
+    booking_date: np.ndarray    # datetime64[D]
+    created_date: np.ndarray    # datetime64[D], NaT when not recorded
+    reg: np.ndarray             # str
+    description: np.ndarray     # str
+    car_reg: np.ndarray         # str, sorted
+    car_make: np.ndarray        # str, aligned with car_reg
+    car_model: np.ndarray       # str, aligned with car_reg
+    car_year: np.ndarray        # int32, aligned with car_reg
+
+    def __len__(self) -> int:
+        return len(self.booking_date)
+
+
+def parse_dates(values) -> np.ndarray:
+    """
+    Convert a sequence of DD-MM-YYYY strings to datetime64[D] in one pass.
+    Blank values become NaT.
+    """
+    raw = np.asarray(values, dtype="U10")
+    if raw.size == 0:
+        return np.empty(0, dtype="datetime64[D]")
+
+    missing = raw == ""
+    raw = np.where(missing, "01-01-1970", raw)
+
+    # Reorder the characters DD-MM-YYYY -> YYYY-MM-DD, then let NumPy parse ISO dates
+    chars = raw.view("U1").reshape(-1, 10)
+    iso = np.ascontiguousarray(chars[:, [6, 7, 8, 9, 2, 3, 4, 5, 0, 1]]).view("U10").ravel()
+
+    dates = iso.astype("datetime64[D]")
+    dates[missing] = NAT
+    return dates
+
+
+def columns_from_export(data: dict) -> BookingColumns:
+    """Build columnar arrays from a booking/export response body"""
+    bookings = data.get("Bookings", [])
+    cars = data.get("Cars", [])
+
+    car_reg = np.array([c.get("reg", "") for c in cars], dtype=str)
+    order = np.argsort(car_reg, kind="stable")
+
+    return BookingColumns(
+        booking_date=parse_dates([b.get("BookingDate", "") for b in bookings]),
+        created_date=parse_dates([b.get("CreatedDate", "") for b in bookings]),
+        reg=np.array([b.get("Reg", "") for b in bookings], dtype=str),
+        description=np.array([b.get("Description", "") for b in bookings], dtype=str),
+        car_reg=car_reg[order],
+        car_make=np.array([c.get("make", "") for c in cars], dtype=str)[order],
+        car_model=np.array([c.get("model", "") for c in cars], dtype=str)[order],
+        car_year=np.array([c.get("year", 0) or 0 for c in cars], dtype=np.int32)[order],
+    )
+
+
+def load_bookings(start: Optional[str] = None, end: Optional[str] = None) -> BookingColumns:
+    """
+    GET  {BASE_URL}booking/export?startDate=DD-MM-YYYY&endDate=DD-MM-YYYY
+    200 -> {"Bookings":[{"BookingDate":..,"CreatedDate":..,"Reg":..,"Description":..}], "Cars":[...]}
+    """
+    url = f"{BASE_URL}booking/export"
+    params = {}
+    if start:
+        params["startDate"] = start
+    if end:
+        params["endDate"] = end
+
+    r = requests.get(url, params=params, headers={"Accept": "application/json"}, timeout=300)
+    r.raise_for_status()
+    return columns_from_export(r.json())
+
+
+def synthetic_bookings(rows: int, cars: int = 50_000, seed: int = 0, fill: float = 0.8) -> BookingColumns:
+    """
+    Random bookings for sizing runs when a large diary isn't to hand.
+    Like the real diary they take one working day each, with about `fill`
+    of the working days booked, so a large run spans many years.
+    """
+    rng = np.random.default_rng(seed)
+    makes = np.array(["Audi", "BMW", "Ford", "Kia", "Nissan", "Toyota", "Vauxhall", "Volkswagen"])
+    models = np.array(["Hatchback", "Saloon", "Estate", "SUV"])
+
+    car_reg = np.char.add("SY", np.arange(cars).astype(str))
+    order = np.argsort(car_reg)
+    first_day = np.datetime64("2020-01-01")
+
+    # Enough working days that `fill` of them comes to at least `rows`
+    span = int(rows / fill * 1.05) + 100
+    booked = np.flatnonzero(rng.random(span) < fill)
+    while len(booked) < rows:
+        booked = np.append(booked, span + np.flatnonzero(rng.random(span) < fill))
+        span *= 2
+    booking_date = np.busday_offset(first_day, booked[:rows], roll="forward")
+    created_date = booking_date - rng.gamma(2.0, 7.0, rows).astype("timedelta64[D]")
+
+    return BookingColumns(
+        booking_date=booking_date,
+        created_date=created_date,
+        reg=car_reg[rng.integers(0, cars, rows)],
+        description=np.full(rows, "Service"),
+        car_reg=car_reg[order],
+        car_make=makes[rng.integers(0, len(makes), cars)][order],
+        car_model=models[rng.integers(0, len(models), cars)][order],
+        car_year=rng.integers(2005, 2026, cars).astype(np.int32)[order],
+    )
+
+
+def _day_index(dates: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 as plain integers"""
+    return dates.astype("datetime64[D]").astype(np.int64)
+
+
+def _working_day_bookings(cols: BookingColumns) -> np.ndarray:
+    """Booking dates that fall on a working day, the only days with diary capacity"""
+    return cols.booking_date[np.is_busday(cols.booking_date)]
+
+
+def weekly_occupancy(cols: BookingColumns) -> dict[str, np.ndarray]:
+    """Booked working days against working-day capacity for every ISO week in the data"""
+    dates = _working_day_bookings(cols)
+    if len(dates) == 0:
+        return {"week_start": np.empty(0, dtype="datetime64[D]"), "bookings": np.empty(0, dtype=np.int64),
+                "capacity": np.empty(0, dtype=np.int64), "occupancy": np.empty(0)}
+
+    days = _day_index(dates)
+    # 1970-01-01 was a Thursday, so shifting by 3 puts Monday at the start of each 7 day block
+    week = (days + 3) // 7
+    first = week.min()
+    counts = np.bincount(week - first)
+
+    week_start = ((np.arange(first, first + len(counts)) * 7) - 3).astype("datetime64[D]")
+    capacity = np.busday_count(week_start, week_start + np.timedelta64(7, "D")) * BOOKINGS_PER_DAY
+
+    return {
+        "week_start": week_start,
+        "bookings": counts,
+        "capacity": capacity,
+        "occupancy": np.divide(counts, capacity, out=np.zeros(len(counts)), where=capacity > 0),
+    }
+
+
+def monthly_occupancy(cols: BookingColumns) -> dict[str, np.ndarray]:
+    """Booked working days against working-day capacity for every month in the data"""
+    dates = _working_day_bookings(cols)
+    if len(dates) == 0:
+        return {"month": np.empty(0, dtype="datetime64[M]"), "bookings": np.empty(0, dtype=np.int64),
+                "capacity": np.empty(0, dtype=np.int64), "occupancy": np.empty(0)}
+
+    months = dates.astype("datetime64[M]").astype(np.int64)
+    first = months.min()
+    counts = np.bincount(months - first)
+
+    month = np.arange(first, first + len(counts)).astype("datetime64[M]")
+    month_start = month.astype("datetime64[D]")
+    month_end = (month + np.timedelta64(1, "M")).astype("datetime64[D]")
+    capacity = np.busday_count(month_start, month_end) * BOOKINGS_PER_DAY
+
+    return {
+        "month": month,
+        "bookings": counts,
+        "capacity": capacity,
+        "occupancy": np.divide(counts, capacity, out=np.zeros(len(counts)), where=capacity > 0),
+    }
+
+
+def lead_time_distribution(cols: BookingColumns) -> dict[str, np.ndarray]:
+    """
+    Histogram of days between a booking being made and the appointment.
+    Bookings without a CreatedDate are left out.
+    """
+    known = ~np.isnat(cols.created_date)
+    lead = (cols.booking_date[known] - cols.created_date[known]).astype(np.int64)
+    lead = np.clip(lead, 0, None)
+
+    edges = np.append(LEAD_TIME_BINS, max(int(lead.max()) + 1 if lead.size else 0, LEAD_TIME_BINS[-1] + 1))
+    counts, _ = np.histogram(lead, bins=edges)
+    total = max(lead.size, 1)
+
+    return {
+        "from_days": edges[:-1],
+        "to_days": edges[1:] - 1,
+        "bookings": counts,
+        "share": counts / total,
+        "cumulative_share": np.cumsum(counts) / total,
+    }
+
+
+def lead_time_summary(cols: BookingColumns) -> dict[str, float]:
+    """Mean and percentiles of lead time in days"""
+    known = ~np.isnat(cols.created_date)
+    lead = np.clip((cols.booking_date[known] - cols.created_date[known]).astype(np.int64), 0, None)
+    if lead.size == 0:
+        return {"bookings": 0}
+
+    p50, p90, p99 = np.percentile(lead, [50, 90, 99])
+    return {
+        "bookings": int(lead.size),
+        "mean_days": float(lead.mean()),
+        "p50_days": float(p50),
+        "p90_days": float(p90),
+        "p99_days": float(p99),
+        "max_days": int(lead.max()),
+    }
+
+
+def weekday_demand(cols: BookingColumns) -> dict[str, np.ndarray]:
+    """Bookings per day of the week"""
+    weekday = (_day_index(cols.booking_date) + 3) % 7
+    counts = np.bincount(weekday, minlength=7)
+    return {
+        "weekday": WEEKDAYS,
+        "bookings": counts,
+        "share": counts / max(len(cols), 1),
+    }
+
+
+def make_model_mix(cols: BookingColumns) -> dict[str, np.ndarray]:
+    """
+    Bookings per make and model. Bookings are joined to Car with a binary
+    search over the sorted car regs; bookings for unknown regs are reported
+    under "Unknown".
+    """
+    # Encode make and model as integers once per car (the small table), so the
+    # per-booking work is a search, two gathers and one bincount
+    makes, make_code = np.unique(np.append(cols.car_make, "Unknown"), return_inverse=True)
+    models, model_code = np.unique(np.append(cols.car_model, "Unknown"), return_inverse=True)
+    pair_code = make_code.ravel() * len(models) + model_code.ravel()
+
+    if len(cols.car_reg) == 0:
+        pos = np.zeros(len(cols), dtype=np.intp)
+    else:
+        pos = np.minimum(np.searchsorted(cols.car_reg, cols.reg), len(cols.car_reg) - 1)
+        # Bookings for regs with no Car row fall through to the "Unknown" entry on the end
+        pos[cols.car_reg[pos] != cols.reg] = len(cols.car_reg)
+
+    counts = np.bincount(pair_code[pos], minlength=len(makes) * len(models))
+
+    used = np.flatnonzero(counts)
+    used = used[np.argsort(-counts[used], kind="stable")]
+    return {
+        "make": makes[used // len(models)],
+        "model": models[used % len(models)],
+        "bookings": counts[used],
+        "share": counts[used] / max(len(cols), 1),
+    }
+
+
+def build_reports(cols: BookingColumns) -> dict[str, dict[str, np.ndarray]]:
+    """Run every report over the same columns"""
+    return {
+        "weekly_occupancy": weekly_occupancy(cols),
+        "monthly_occupancy": monthly_occupancy(cols),
+        "lead_time": lead_time_distribution(cols),
+        "weekday_demand": weekday_demand(cols),
+        "make_model_mix": make_model_mix(cols),
+    }
+
+
+def write_csv(path: Path, table: dict[str, np.ndarray]) -> None:
+    names = list(table)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        writer.writerows(zip(*(table[n].astype(str) for n in names)))
+
+
+def write_parquet(path: Path, table: dict[str, np.ndarray]) -> None:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+
+    pq.write_table(pa.table({name: pa.array(values) for name, values in table.items()}), path)
+
+
+def export_reports(reports: dict[str, dict[str, np.ndarray]], out_dir: Path, fmt: str = "csv") -> list[Path]:
+    """Write one file per report to out_dir"""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    writer = write_parquet if fmt == "parquet" else write_csv
+
+    written = []
+    for name, table in reports.items():
+        path = out_dir / f"{name}.{fmt}"
+        writer(path, table)
+        written.append(path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking utilisation and lead-time analytics")
+    parser.add_argument("--start", help="First booking date to include (DD-MM-YYYY)")
+    parser.add_argument("--end", help="Last booking date to include (DD-MM-YYYY)")
+    parser.add_argument("--out", default="reports", help="Directory to write reports to")
+    parser.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    parser.add_argument("--synthetic", type=int, metavar="ROWS", help="Use random bookings instead of PASOE")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.synthetic:
+        cols = synthetic_bookings(args.synthetic)
+    else:
+        cols = load_bookings(args.start, args.end)
+    loaded = time.perf_counter()
+
+    reports = build_reports(cols)
+    computed = time.perf_counter()
+
+    written = export_reports(reports, Path(args.out), args.format)
+    finished = time.perf_counter()
+
+    print(f"Loaded {len(cols):,} bookings and {len(cols.car_reg):,} cars in {loaded - started:.2f}s")
+    print(f"Computed reports in {computed - loaded:.2f}s, exported in {finished - computed:.2f}s")
+    print(f"Lead time: {lead_time_summary(cols)}")
+    for path in written:
+        print(f"  {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# bookingAnalytics is imported by name, as when run from "Analytics"
+ANALYTICS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ANALYTICS_DIR not in sys.path:
+    sys.path.insert(0, ANALYTICS_DIR)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from bookingAnalytics import (BookingColumns, monthly_occupancy, synthetic_bookings, weekday_demand,
+                              weekly_occupancy)
+
+
+def bookings(*dates: str) -> BookingColumns:
+    none = np.empty(0, dtype=str)
+    return BookingColumns(
+        booking_date=np.array(dates, dtype="datetime64[D]"),
+        created_date=np.full(len(dates), np.datetime64("NaT", "D")),
+        reg=np.full(len(dates), "AB12CDE"),
+        description=np.full(len(dates), "Service"),
+        car_reg=none, car_make=none, car_model=none, car_year=np.empty(0, dtype=np.int32),
+    )
+
+
+def test_synthetic_bookings_take_one_working_day_each():
+    cols = synthetic_bookings(2000)
+    assert len(np.unique(cols.booking_date)) == 2000
+    assert np.is_busday(cols.booking_date).all()
+    assert weekly_occupancy(cols)["occupancy"].max() <= 1.0
+    assert monthly_occupancy(cols)["occupancy"].max() <= 1.0
+
+
+def test_weekend_bookings_are_not_counted_against_working_days():
+    # Monday 6 and Tuesday 7 January 2025, and the Saturday and Sunday after
+    cols = bookings("2025-01-06", "2025-01-07", "2025-01-11", "2025-01-12")
+    week = weekly_occupancy(cols)
+    assert week["week_start"].tolist() == [np.datetime64("2025-01-06").item()]
+    assert week["bookings"].tolist() == [2]
+    assert week["capacity"].tolist() == [5]
+    assert monthly_occupancy(cols)["bookings"].tolist() == [2]
+    assert weekday_demand(cols)["bookings"].tolist() == [1, 1, 0, 0, 0, 1, 1]
+
+
+def test_weekend_only_bookings_give_empty_occupancy():
+    assert len(weekly_occupancy(bookings("2025-01-11"))["bookings"]) == 0